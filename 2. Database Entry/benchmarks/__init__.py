@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the ingestion side. Run from the "2. Database Entry" directory:
+    python -m benchmarks.bench_vocab
+    python -m benchmarks.bench_startup
+"""
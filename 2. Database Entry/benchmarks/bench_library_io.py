@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import data_handler
+import library_io
+
+# Export/import throughput on a synthetic library (default 100k rows) in a
+# scratch directory; the real video_agent.db and metadata.csv are not touched.
+# Measures: export, import into an empty library, and a merge where half the
+# rows already exist (and some are the same videos under other IDs).
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORTS_DIR = os.path.join(BENCH_DIR, "reports")
+DEFAULT_ROWS = 100_000
+WORDS = ("focus habit money sleep routine discipline market product story risk reward"
+         " mindset team growth energy morning system goal failure lesson").split()
+
+
+def make_library(rows, seed=7):
+    """
+    Fills data_handler.DB_NAME with `rows` transcript-sized fake records.
+    """
+    rng = random.Random(seed)
+    data_handler.init_db()
+    start = datetime(2025, 1, 1)
+    conn = sqlite3.connect(data_handler.DB_NAME)
+    with conn:
+        for offset in range(0, rows, library_io.CHUNK_ROWS):
+            batch = []
+            for i in range(offset, min(rows, offset + library_io.CHUNK_ROWS)):
+                text = " ".join(rng.choices(WORDS, k=rng.randint(80, 400)))
+                batch.append((f"v{i:07d}", f"Title {i}", text[:200], "Mindset", "Focus, Habit", "Advice",
+                              text, text, "Tiktok", "Video", f"All Files/Tiktok/Videos/v{i:07d}.mp4",
+                              f"clip_{i}.mp4", f"{i:064x}",
+                              str(start + timedelta(minutes=i))))
+            conn.executemany("""INSERT INTO videos (id, title, summary, category, tags, types, refined_text,
+                                raw_text, platform, file_type, file_path, original_filename, blob_hash,
+                                analyzed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                               batch)
+    conn.close()
+
+
+def use_library(directory):
+    os.makedirs(directory, exist_ok=True)
+    data_handler.DB_NAME = os.path.join(directory, "video_agent.db")
+    data_handler.CSV_PATH = os.path.join(directory, "metadata.csv")
+
+
+def timed(fn, *args, memory=False, **kwargs):
+    """
+    Returns (result, seconds, peak MB allocated or None). Tracing allocations
+    slows Python down several times, so the time is only meaningful without it.
+    """
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+    return result, round(seconds, 3), peak
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark library export/import.")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--formats", nargs="+", default=["jsonl.gz", "parquet"])
+    parser.add_argument("--memory", action="store_true", help="Measure peak allocations instead of speed")
+    parser.add_argument("--out", help="Report path (default: benchmarks/reports/library_io_<time>_<commit>.json)")
+    args = parser.parse_args()
+
+    workspace = tempfile.mkdtemp(prefix="bench_library_io_")
+    results = {}
+    try:
+        source = os.path.join(workspace, "source")
+        use_library(source)
+        print(f"Building a {args.rows}-row library...")
+        make_library(args.rows)
+        data_handler.write_metadata({"Category": ["Mindset"], "Tags": ["Focus", "Habit"],
+                                     "Types": ["Advice"], "Platform": ["Tiktok"]})
+
+        for fmt in args.formats:
+            path = os.path.join(workspace, f"library.{fmt}")
+            use_library(source)
+            try:
+                _, export_s, export_mb = timed(library_io.export_library, path, memory=args.memory)
+            except RuntimeError as e:
+                print(f"   Skipping {fmt}: {e}")
+                continue
+            size_mb = round(os.path.getsize(path) / (1024 * 1024), 1)
+
+            use_library(os.path.join(workspace, f"empty_{fmt}"))
+            fresh, fresh_s, fresh_mb = timed(library_io.import_library, path, memory=args.memory)
+
+            # Half the rows already present, 1% of the rest are the same videos under new IDs
+            use_library(os.path.join(workspace, f"half_{fmt}"))
+            make_library(args.rows // 2)
+            conn = sqlite3.connect(data_handler.DB_NAME)
+            with conn:
+                conn.execute("UPDATE videos SET id = 'x' || id WHERE rowid % 100 = 0")
+                conn.execute("UPDATE videos SET analyzed_at = '2000-01-01' WHERE rowid % 2 = 0")
+            conn.close()
+            merged, merge_s, merge_mb = timed(library_io.import_library, path, on_conflict="newer",
+                                                memory=args.memory)
+
+            results[fmt] = {
+                "file_mb": size_mb,
+                "export": {"seconds": export_s, "peak_mb": export_mb,
+                           "rows_per_s": round(args.rows / export_s)},
+                "import_empty": {"seconds": fresh_s, "peak_mb": fresh_mb, "counts": fresh,
+                                 "rows_per_s": round(args.rows / fresh_s)},
+                "merge_half": {"seconds": merge_s, "peak_mb": merge_mb, "counts": merged},
+            }
+            if args.memory:
+                print(f"✅ {fmt:<9} {size_mb:>7.1f} MB | peak MB: export {export_mb} | import {fresh_mb}"
+                      f" | merge {merge_mb}")
+            else:
+                print(f"✅ {fmt:<9} {size_mb:>7.1f} MB | export {export_s:.2f}s | import {fresh_s:.2f}s"
+                      f" | merge {merge_s:.2f}s")
+            print(f"      merge: {merged}")
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "rows": args.rows,
+            "chunk_rows": library_io.CHUNK_ROWS,
+            "memory_traced": args.memory,
+        },
+        "formats": results,
+    }
+    out = args.out
+    if not out:
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out = os.path.join(REPORTS_DIR, f"library_io_{stamp}_{report['meta']['commit'] or 'nogit'}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report written to {out}")
+
+
+if __name__ == "__main__":
+    main()
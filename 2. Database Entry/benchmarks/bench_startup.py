@@ -0,0 +1,19 @@
+import os
+
+from benchmarks.startup_budget import main
+
+# Start-up budget for the ingestion CLIs: `--help` (and anything else that
+# never touches media or Gemini) must stay well under a second. The check
+# itself is in startup_budget.py, shared with the web app's bench_startup.py.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "main.py --help": ["main.py", "--help"],
+    "reanalyze.py --help": ["reanalyze.py", "--help"],
+}
+# Only needed once a file is transcribed, OCR'd or analyzed
+LAZY_MODULES = ["google.genai", "moviepy", "assemblyai", "PIL", "pillow_heif", "requests"]
+
+
+if __name__ == "__main__":
+    main(TARGETS, LAZY_MODULES, APP_DIR)
@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import data_handler
+from prompt_registry import estimate_tokens
+from vocab_selector import VocabularySelector
+
+# Compares the pruned tag list (data_handler.select_tags) with the full one.
+# Offline: recall of each row's stored tags (assigned with the full list) in
+# the candidates its batch would be offered, plus prompt sizes. Rows are
+# scored in folds by a selector that never saw them (cross-validation).
+# --live N: also sends N batches to Gemini both ways and compares the answers.
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORTS_DIR = os.path.join(BENCH_DIR, "reports")
+MAX_BATCH_CHARS = 10000  # Same batch budget as main.py
+
+
+def load_rows(limit=None):
+    conn = sqlite3.connect(data_handler.DB_NAME)
+    conn.row_factory = sqlite3.Row
+    sql = ("SELECT id, raw_text, platform, category, tags, types FROM videos "
+           "WHERE raw_text IS NOT NULL AND raw_text != '' AND tags IS NOT NULL AND tags != '' ORDER BY rowid")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    rows = [dict(r) for r in conn.execute(sql)]
+    conn.close()
+    return rows
+
+
+def pack_batches(rows, max_chars=MAX_BATCH_CHARS):
+    batches, current, chars = [], [], 0
+    for row in rows:
+        if current and chars + len(row['raw_text']) > max_chars:
+            batches.append(current)
+            current, chars = [], 0
+        current.append(row)
+        chars += len(row['raw_text'])
+    if current:
+        batches.append(current)
+    return batches
+
+
+def split_tags(value):
+    return {t.replace("(NEW)", "").strip() for t in (value or "").split(",") if t.strip()}
+
+
+def prompt_tokens(prompt, tags):
+    """
+    Estimated prompt tokens apart from the items themselves.
+    """
+    values = {"items_json": ""}
+    if "tags" in prompt.dynamic_keys:
+        values["tags"] = ", ".join(tags)
+    return estimate_tokens(prompt.render(**values))
+
+
+def _compiled(top_k):
+    data_handler.TAG_TOP_K = top_k
+    return data_handler.get_analysis_prompt()
+
+
+def measure_offline(rows, top_k, folds):
+    """
+    Candidate recall and prompt size for one TAG_TOP_K setting (None = full list).
+    """
+    vocabulary = data_handler.load_metadata()['Tags']
+    vocabulary_set = set(vocabulary)
+    prompt = _compiled(top_k)
+
+    recalls, full_rows, prompt_sizes, tag_sizes, select_ms = [], 0, [], [], []
+    for fold in range(folds):
+        selector = None
+        if top_k is not None:
+            train = [(r['raw_text'], r['tags'].split(',')) for i, r in enumerate(rows) if i % folds != fold]
+            selector = VocabularySelector(vocabulary, train, core_count=data_handler.CORE_TAG_COUNT)
+
+        for batch in pack_batches(rows[fold::folds]):
+            start = time.perf_counter()
+            if selector:
+                offered = selector.select([r['raw_text'] for r in batch], top_k, data_handler.MAX_TAG_CHARS)
+            else:
+                offered = vocabulary
+            select_ms.append((time.perf_counter() - start) * 1000)
+            offered_set = set(offered)
+
+            prompt_sizes.append(prompt_tokens(prompt, offered))
+            tag_sizes.append(len(", ".join(offered)))
+            for row in batch:
+                # Tags outside the vocabulary could never be offered either way
+                expected = split_tags(row['tags']) & vocabulary_set
+                if not expected:
+                    continue
+                hit = len(expected & offered_set) / len(expected)
+                recalls.append(hit)
+                full_rows += hit == 1.0
+
+    return {
+        "top_k": top_k,
+        "rows": len(recalls),
+        "tag_recall": round(statistics.mean(recalls), 4) if recalls else None,
+        "rows_fully_covered": round(full_rows / len(recalls), 4) if recalls else None,
+        "prompt_tokens_excl_items": {
+            "mean": round(statistics.mean(prompt_sizes)),
+            "max": max(prompt_sizes),
+        },
+        "tag_list_chars_max": max(tag_sizes),
+        "select_ms_mean": round(statistics.mean(select_ms), 2),
+    }
+
+
+def _analyze(batch, top_k):
+    data_handler.TAG_TOP_K = top_k
+    items = [{"id": r['id'], "raw_text": r['raw_text'], "platform": r['platform']} for r in batch]
+    return {r.get('id'): r for r in data_handler.analyze_batch(items) or [] if isinstance(r, dict)}
+
+
+def measure_live(batches, top_k):
+    """
+    Sends each batch with the full list and with pruning; agreement of the answers.
+    """
+    category = types = 0
+    jaccard = []
+    for batch in batches:
+        full = _analyze(batch, None)
+        pruned = _analyze(batch, top_k)
+        for row in batch:
+            a, b = full.get(row['id']), pruned.get(row['id'])
+            if not a or not b:
+                continue
+            category += a.get("Category", "").strip() == b.get("Category", "").strip()
+            types += a.get("Types", "").strip() == b.get("Types", "").strip()
+            ta, tb = split_tags(a.get("Tags")), split_tags(b.get("Tags"))
+            jaccard.append(len(ta & tb) / len(ta | tb) if ta | tb else 1.0)
+    n = len(jaccard)
+    return {
+        "top_k": top_k,
+        "rows": n,
+        "category_agreement": round(category / n, 4) if n else None,
+        "types_agreement": round(types / n, 4) if n else None,
+        "tag_jaccard": round(statistics.mean(jaccard), 4) if n else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=BENCH_DIR).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pruned tag vocabulary against the full list.")
+    parser.add_argument("--top-k", default="10,25,40", help="Comma-separated TAG_TOP_K values to try")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds for the offline scores")
+    parser.add_argument("--limit", type=int, help="Only the first N tagged rows")
+    parser.add_argument("--live", type=int, default=0, help="Also send this many batches to Gemini both ways")
+    parser.add_argument("--out", help="Report path (default: benchmarks/reports/vocab_<time>_<commit>.json)")
+    args = parser.parse_args()
+
+    original_top_k = data_handler.TAG_TOP_K
+    rows = load_rows(args.limit)
+    batches = pack_batches(rows)
+    print(f"Rows: {len(rows)} | Batches: {len(batches)} | Vocabulary: {len(data_handler.load_metadata()['Tags'])} tags"
+          f" | Core: {data_handler.CORE_TAG_COUNT} | Max tag chars: {data_handler.MAX_TAG_CHARS}\n")
+
+    settings = [None] + [int(k) for k in args.top_k.split(",") if k.strip()]
+    offline = []
+    for top_k in settings:
+        result = measure_offline(rows, top_k, args.folds)
+        offline.append(result)
+        label = "full" if top_k is None else f"top {top_k}"
+        print(f"   {label:<9} recall {result['tag_recall']:.3f}   fully covered {result['rows_fully_covered']:.3f}"
+              f"   prompt ~{result['prompt_tokens_excl_items']['mean']} tok (max {result['prompt_tokens_excl_items']['max']})"
+              f"   tags ≤{result['tag_list_chars_max']} chars   select {result['select_ms_mean']} ms")
+
+    live = None
+    if args.live:
+        live = measure_live(batches[:args.live], original_top_k)
+        print(f"\n   Live ({live['rows']} rows, top {original_top_k}): category {live['category_agreement']}"
+              f" | types {live['types_agreement']} | tag Jaccard {live['tag_jaccard']}")
+    data_handler.TAG_TOP_K = original_top_k
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "rows": len(rows),
+        "batches": len(batches),
+        "folds": args.folds,
+        "top_k_per_item": True,
+        "core_tags": data_handler.CORE_TAG_COUNT,
+        "max_tag_chars": data_handler.MAX_TAG_CHARS,
+        "offline": offline,
+        "live": live,
+    }
+    out = args.out or os.path.join(REPORTS_DIR, f"vocab_{datetime.now():%Y%m%d_%H%M%S}_{report['commit']}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report written to {out}")
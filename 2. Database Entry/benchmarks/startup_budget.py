@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Shared start-up budget check behind both apps' benchmarks/bench_startup.py,
+# which only list what to start and which modules must load lazily. Each run
+# is a fresh interpreter with -X importtime, so the report also names the
+# slowest imports. Exits 1 if the budget is exceeded or a lazy module shows up.
+STARTUP_BUDGET_SECONDS = 0.5
+DEFAULT_RUNS = 5
+TOP_IMPORTS = 10
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def parse_importtime(stderr):
+    """
+    Returns (total seconds, {module: cumulative seconds}) from -X importtime output.
+    """
+    total = 0.0
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        seconds = int(cumulative) / 1e6
+        modules[name] = seconds
+        if len(indent) == 1:
+            total += seconds
+    return total, modules
+
+
+def measure(args, runs, app_dir, lazy_modules=()):
+    """
+    Runs `python -X importtime <args>` `runs` times from `app_dir`.
+    Returns wall-clock and import-time stats plus the slowest imports of the median run.
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=app_dir,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - start
+        if result.returncode != 0:
+            errors = [l for l in result.stderr.splitlines() if not l.startswith("import time:")]
+            raise RuntimeError(f"{' '.join(args)} failed:\n" + "\n".join(errors[-10:]))
+        imports, modules = parse_importtime(result.stderr)
+        samples.append((wall, imports, modules))
+
+    samples.sort(key=lambda s: s[0])
+    wall, imports, modules = samples[len(samples) // 2]
+    top = sorted(modules.items(), key=lambda kv: -kv[1])
+    # Only the outermost entry of each chain (a module's cumulative includes its children)
+    roots = [name for name, _ in top if "." not in name][:TOP_IMPORTS]
+    return {
+        "wall_s": {
+            "median": round(wall, 4),
+            "min": round(samples[0][0], 4),
+            "max": round(samples[-1][0], 4),
+            "mean": round(statistics.mean(s[0] for s in samples), 4),
+        },
+        "imports_s": round(imports, 4),
+        "slowest_imports": [{"module": name, "seconds": round(modules[name], 4)} for name in roots],
+        "lazy_modules_loaded": [m for m in lazy_modules if m in modules],
+    }
+
+
+def _git_commit(cwd):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(targets, lazy_modules, app_dir):
+    """
+    targets: {label: interpreter arguments}, each run from `app_dir`.
+    lazy_modules: Modules that must not be imported by any target.
+    Reports go to <app_dir>/benchmarks/reports/.
+    """
+    parser = argparse.ArgumentParser(description="Check start-up time against its budget.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS, help="Seconds per start-up (median)")
+    parser.add_argument("--out", help="Report path (default: benchmarks/reports/startup_<time>_<commit>.json)")
+    args = parser.parse_args()
+
+    results = {}
+    failed = False
+    for label, target in targets.items():
+        result = measure(target, args.runs, app_dir, lazy_modules)
+        results[label] = result
+        over = result["wall_s"]["median"] > args.budget
+        failed |= over or bool(result["lazy_modules_loaded"])
+        mark = "⚠️" if over or result["lazy_modules_loaded"] else "✅"
+        print(f"{mark} {label:<20} {result['wall_s']['median']:.3f}s (imports {result['imports_s']:.3f}s,"
+              f" budget {args.budget:.2f}s)")
+        for entry in result["slowest_imports"][:5]:
+            print(f"      {entry['seconds']:.3f}s  {entry['module']}")
+        if result["lazy_modules_loaded"]:
+            print(f"      Imported at start-up but should load lazily: {', '.join(result['lazy_modules_loaded'])}")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(app_dir),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "runs": args.runs,
+            "budget_s": args.budget,
+        },
+        "targets": results,
+        "passed": not failed,
+    }
+    out = args.out
+    if not out:
+        reports_dir = os.path.join(app_dir, "benchmarks", "reports")
+        os.makedirs(reports_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out = os.path.join(reports_dir, f"startup_{stamp}_{report['meta']['commit'] or 'nogit'}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report written to {out}")
+
+    if failed:
+        sys.exit(1)
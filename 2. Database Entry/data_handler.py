@@ -2,10 +2,18 @@ import sqlite3
 import csv
 import os
 import json
-from google import genai
+import hashlib
 import itertools
+import threading
+import time
 import uuid
+from datetime import datetime
 from dotenv import load_dotenv
+from prompt_registry import PromptRegistry, PrefixCache
+import migrate
+from passage_index import index_missing, index_passages
+from vocab_selector import VocabularySelector
+import profiler
 
 # Load environment variables
 load_dotenv()
@@ -14,56 +22,129 @@ load_dotenv()
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_NAME = os.path.join(SCRIPT_DIR, "video_agent.db")
 CSV_PATH = os.path.join(SCRIPT_DIR, "metadata.csv")
-PROMPT_PATH = os.path.join(SCRIPT_DIR, "Prompts/analysis_prompt.txt")
+PROMPTS_DIR = os.path.join(SCRIPT_DIR, "Prompts")
+PROMPT_PATH = os.path.join(PROMPTS_DIR, "analysis_prompt.txt")
+MODEL_NAME = "gemini-3-flash-preview"
+
+# Per-batch tag pruning (vocab_selector.py): only the most-used tags plus the
+# best matches for each item are sent. TAG_TOP_K = None sends the full list.
+TAG_TOP_K = 25        # Candidates per item
+CORE_TAG_COUNT = 40
+MAX_TAG_CHARS = 2500  # Hard bound on the tag list in any one prompt
+MAX_TAG_EXAMPLES = 5000
+
+# Gemini answers in JSON mode against this schema (one object per item)
+ANALYSIS_FIELDS = ["Title", "Summary", "Category", "Tags", "Types", "Refined Text", "Niche"]
+REQUIRED_FIELDS = ["Title", "Category", "Tags", "Types"]
+ANALYSIS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {key: {"type": "STRING"} for key in ["id"] + ANALYSIS_FIELDS},
+        "required": ["id"] + ANALYSIS_FIELDS,
+    },
+}
+ANALYSIS_CONFIG = {"response_mime_type": "application/json", "response_schema": ANALYSIS_SCHEMA}
+# Extra calls for items missing/invalid in a response
+ANALYSIS_RETRIES = 1
+# Consecutive responses with no usable result before a batch is split in half
+# (the two halves are themselves the retry)
+BISECT_AFTER_FAILURES = 1
+# Journal error for an item that breaks the call even on its own
+ISOLATED_ERROR = "No usable response even when sent alone"
+# Calls that fail outright (network/server error, 429) say nothing about the
+# items: the same batch is sent again after 2s, 4s, 8s
+CALL_RETRIES = 3
+CALL_BACKOFF_SECONDS = 2
+CALL_FAILED_ERROR = "AI call failed"
 
 # Load API keys from environment
 raw_keys = os.getenv("GEMINI_API_KEYS", "")
 API_KEYS = [k.strip() for k in raw_keys.split(",") if k.strip()]
 
-# Initialize AI Clients
-clients = [genai.Client(api_key=key) for key in API_KEYS]
-client_rotator = itertools.cycle(clients)
+# AI clients are built on first use: importing google.genai alone takes
+# ~0.5s, which every import of this module (CLI --help, tools) used to pay.
+# Assign `clients` beforehand to use others (the load test's fakes).
+clients = None
+client_rotator = None
+_clients_lock = threading.Lock()
+
+# Analysis prompt is compiled once per vocabulary version; its static prefix
+# (instructions + vocabulary) is served from Gemini's context cache per key.
+prompts = PromptRegistry(PROMPTS_DIR)
+prefix_cache = PrefixCache()
+
+def get_clients():
+    global clients, client_rotator
+    with _clients_lock:
+        if clients is None:
+            from google import genai
+            clients = [genai.Client(api_key=key) for key in API_KEYS]
+        if client_rotator is None:
+            client_rotator = itertools.cycle(clients)
+    return clients
+
+def next_client():
+    """
+    The next client in rotation (one per API key).
+    """
+    get_clients()
+    with _clients_lock:
+        return next(client_rotator)
 
 def get_unique_id():
     return str(uuid.uuid4())[:8]
 
 # --- Database ---
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("""CREATE TABLE IF NOT EXISTS videos (
-        id TEXT PRIMARY KEY,
-        title TEXT,
-        summary TEXT,
-        category TEXT,
-        tags TEXT,
-        types TEXT,
-        refined_text TEXT,
-        raw_text TEXT,
-        platform TEXT,
-        file_type TEXT,
-        file_path TEXT,
-        original_filename TEXT
-    )""")
-    # Migration: Add original_filename column if it doesn't exist
+    # The schema lives in migrations/; this applies any that are pending
+    migrate.upgrade(DB_NAME)
+    # Rows from before the passage index (or an interrupted backfill) get their passages
+    conn = sqlite3.connect(DB_NAME, timeout=30, isolation_level=None)
     try:
-        c.execute("ALTER TABLE videos ADD COLUMN original_filename TEXT")
-    except sqlite3.OperationalError:
-        # Column already exists
-        pass
-    conn.commit()
-    conn.close()
+        indexed = index_missing(conn)
+    finally:
+        conn.close()
+    if indexed:
+        print(f"   📚 Indexed passages of {indexed} rows")
 
+@profiler.timed("db")
 def insert_record(record):
+    """
+    Inserts or updates a row. Columns missing from `record` keep their
+    current values (e.g. the source_* fields written once at extraction).
+    """
     conn = sqlite3.connect(DB_NAME)
     c = conn.cursor()
     placeholders = ', '.join(['?'] * len(record))
     columns = ', '.join(record.keys())
-    sql = f"INSERT OR REPLACE INTO videos ({columns}) VALUES ({placeholders})"
+    updates = ', '.join(f"{col} = excluded.{col}" for col in record if col != 'id')
+    action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+    sql = f"INSERT INTO videos ({columns}) VALUES ({placeholders}) ON CONFLICT(id) {action}"
     c.execute(sql, list(record.values()))
+    if 'refined_text' in record:
+        index_passages(conn, record['id'], record['refined_text'])
+    conn.commit()
+    conn.close()
+
+@profiler.timed("db")
+def update_analysis(uid, result):
+    """
+    Overwrites the AI-derived fields of an existing row in place.
+    raw_text, file paths and blobs are left alone.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("""UPDATE videos SET title = ?, summary = ?, category = ?, tags = ?, types = ?,
+                 refined_text = ?, analysis_version = ?, analyzed_at = ? WHERE id = ?""",
+              (result.get("Title", ""), result.get("Summary", ""), result.get("Category", ""),
+               result.get("Tags", ""), result.get("Types", ""), result.get("Refined Text", ""),
+               result.get("analysis_version"), datetime.now(), uid))
+    index_passages(conn, uid, result.get("Refined Text", ""))
     conn.commit()
     conn.close()
 
+@profiler.timed("db")
 def check_filename_exists(filename):
     """
     Checks if a record with the same original_filename already exists.
@@ -78,6 +159,7 @@ def check_filename_exists(filename):
     conn.close()
     return result[0] if result else None
 
+@profiler.timed("db")
 def check_text_exists(raw_text):
     """
     Checks if a record with the same raw_text already exists.
@@ -93,6 +175,7 @@ def check_text_exists(raw_text):
     return result[0] if result else None
 
 
+@profiler.timed("db")
 def get_existing_data(uid):
     """
     Returns (raw_text, refined_text) for a given ID.
@@ -107,6 +190,188 @@ def get_existing_data(uid):
     conn.close()
     return result
 
+# --- Scan Manifest ---
+@profiler.timed("db")
+def load_library_index():
+    """
+    Bulk-loads what the folder scanner needs about existing records in one query.
+    Returns (names, ids):
+        names: {original_filename: id}
+        ids: {id: (has_raw_text, has_refined_text)}
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("""SELECT id, original_filename,
+                        raw_text IS NOT NULL AND raw_text != '',
+                        refined_text IS NOT NULL AND refined_text != ''
+                 FROM videos""")
+    rows = c.fetchall()
+    conn.close()
+
+    names = {}
+    ids = {}
+    for uid, filename, has_raw, has_refined in rows:
+        if filename and filename.strip():
+            names.setdefault(filename, uid)
+        ids[uid] = (bool(has_raw), bool(has_refined))
+    return names, ids
+
+@profiler.timed("db")
+def load_source_index():
+    """
+    Returns {source_video_id: id} for every record that came from a download.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT source_video_id, id FROM videos WHERE source_video_id IS NOT NULL")
+    rows = c.fetchall()
+    conn.close()
+    return dict(rows)
+
+@profiler.timed("db")
+def load_scan_manifest():
+    """
+    Returns {path: (size, mtime_ns, content_hash, id)} for every previously handled file.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT path, size, mtime_ns, content_hash, id FROM scan_manifest")
+    rows = c.fetchall()
+    conn.close()
+    return {r[0]: (r[1], r[2], r[3], r[4]) for r in rows}
+
+@profiler.timed("db")
+def save_scan_entries(entries):
+    """
+    Upserts manifest rows: [(path, size, mtime_ns, content_hash, id), ...]
+    """
+    if not entries:
+        return
+    now = datetime.now()
+    conn = sqlite3.connect(DB_NAME)
+    conn.executemany("""INSERT OR REPLACE INTO scan_manifest (path, size, mtime_ns, content_hash, id, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?)""", [tuple(e) + (now,) for e in entries])
+    conn.commit()
+    conn.close()
+
+@profiler.timed("db")
+def delete_scan_entries(paths):
+    """
+    Forgets manifest rows, so those files are checked again on the next scan.
+    """
+    if not paths:
+        return
+    conn = sqlite3.connect(DB_NAME)
+    conn.executemany("DELETE FROM scan_manifest WHERE path = ?", [(p,) for p in paths])
+    conn.commit()
+    conn.close()
+
+# --- Job Journal ---
+# Stages in order; 'skipped' marks duplicates that should never be retried.
+JOB_STAGES = ["scanned", "extracted", "analyzed", "committed"]
+DONE_STAGES = ("committed", "skipped")
+
+def _job_row(row):
+    keys = ["id", "source_path", "dest_path", "original_filename", "platform", "file_type",
+            "stage", "attempts", "last_error", "result"]
+    job = dict(zip(keys, row))
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+@profiler.timed("journal")
+def record_job(uid, source_path, dest_path, original_filename, platform, file_type):
+    """
+    Journals a newly scanned file (stage 'scanned'). No-op if the ID is already journaled.
+    """
+    now = datetime.now()
+    conn = sqlite3.connect(DB_NAME)
+    conn.execute("""INSERT OR IGNORE INTO jobs
+                    (id, source_path, dest_path, original_filename, platform, file_type, stage, attempts, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, 'scanned', 0, ?, ?)""",
+                 (uid, source_path, dest_path, original_filename, platform, file_type, now, now))
+    conn.commit()
+    conn.close()
+
+@profiler.timed("journal")
+def update_job_stage(uid, stage, result=None, note=None):
+    """
+    Moves a job to `stage`. `result` (the AI analysis) is kept so a crash
+    between analysis and commit does not cost another Gemini call.
+    `note` is stored in last_error (e.g. why a file was skipped).
+    """
+    conn = sqlite3.connect(DB_NAME)
+    if result is not None:
+        conn.execute("UPDATE jobs SET stage = ?, result = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                     (stage, json.dumps(result), note, datetime.now(), uid))
+    else:
+        conn.execute("UPDATE jobs SET stage = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                     (stage, note, datetime.now(), uid))
+    conn.commit()
+    conn.close()
+
+@profiler.timed("journal")
+def record_job_error(uid, error):
+    """
+    Counts a failed attempt at the job's next stage and keeps the error message.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    conn.execute("UPDATE jobs SET attempts = attempts + 1, last_error = ?, updated_at = ? WHERE id = ?",
+                 (str(error)[:500], datetime.now(), uid))
+    conn.commit()
+    conn.close()
+
+def get_job_by_source(source_path):
+    """
+    Returns the most recent job for a source file, or None.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("""SELECT id, source_path, dest_path, original_filename, platform, file_type,
+                        stage, attempts, last_error, result
+                 FROM jobs WHERE source_path = ? ORDER BY created_at DESC LIMIT 1""", (source_path,))
+    row = c.fetchone()
+    conn.close()
+    return _job_row(row) if row else None
+
+@profiler.timed("journal")
+def get_pending_jobs(max_attempts=None):
+    """
+    Returns unfinished jobs (oldest first), optionally only those with
+    fewer than `max_attempts` failed attempts.
+    """
+    sql = """SELECT id, source_path, dest_path, original_filename, platform, file_type,
+                    stage, attempts, last_error, result
+             FROM jobs WHERE stage NOT IN (?, ?)"""
+    params = list(DONE_STAGES)
+    if max_attempts is not None:
+        sql += " AND attempts < ?"
+        params.append(max_attempts)
+    sql += " ORDER BY created_at"
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute(sql, params)
+    rows = c.fetchall()
+    conn.close()
+    return [_job_row(r) for r in rows]
+
+def get_job_summary(max_attempts):
+    """
+    Returns ({stage: count}, exhausted_count, recent_errors) for the status command.
+    recent_errors: [(id, stage, attempts, last_error)] of the latest failing jobs.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT stage, count(*) FROM jobs GROUP BY stage")
+    counts = dict(c.fetchall())
+    c.execute("SELECT count(*) FROM jobs WHERE stage NOT IN (?, ?) AND attempts >= ?", (*DONE_STAGES, max_attempts))
+    exhausted = c.fetchone()[0]
+    c.execute("""SELECT id, stage, attempts, last_error FROM jobs
+                 WHERE stage NOT IN (?, ?) AND attempts > 0
+                 ORDER BY updated_at DESC LIMIT 10""", DONE_STAGES)
+    recent_errors = c.fetchall()
+    conn.close()
+    return counts, exhausted, recent_errors
+
 # --- CSV Metadata (Columnar) ---
 def load_metadata():
     """
@@ -143,53 +408,163 @@ def save_new_metadata(col_name, value):
 
     # Add new val
     current_data[col_name].append(clean_val)
+    write_metadata(current_data)
 
-    # Rewrite CSV
+def write_metadata(data):
+    """
+    Rewrites the CSV from {column: [values]}; shorter columns are padded with blanks.
+    """
     # 1. Determine max rows
-    max_len = max(len(v) for v in current_data.values())
+    max_len = max(len(v) for v in data.values())
     
     with open(CSV_PATH, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         # Header
-        headers = list(current_data.keys())
+        headers = list(data.keys())
         writer.writerow(headers)
         
         # Rows
         for i in range(max_len):
             row = []
             for h in headers:
-                if i < len(current_data[h]):
-                    row.append(current_data[h][i])
+                if i < len(data[h]):
+                    row.append(data[h][i])
                 else:
                     row.append("")
             writer.writerow(row)
 
+@profiler.timed("metadata")
+def save_new_values(result):
+    """
+    Adds any "(NEW)" Category/Tags/Types values from an AI result to metadata.csv.
+    """
+    check_map = {'Category': 'Category', 'Tags': 'Tags', 'Types': 'Types'}
+    for csv_key, json_key in check_map.items():
+        val = str(result.get(json_key, ""))
+        if "(NEW)" in val:
+            clean_val = val.replace("(NEW)", "").strip()
+
+            # Double check against latest CSV
+            current_meta = load_metadata()
+            col_list = current_meta.get(csv_key, [])
+
+            def is_val_new(v, existing_list):
+                return not any(ex.lower() == v.lower().strip() for ex in existing_list)
+
+            if csv_key == 'Tags':
+                for tag in clean_val.split(','):
+                    t = tag.strip()
+                    if t and is_val_new(t, col_list):
+                        print(f"✨ New Tag Detected: {t} ✨")
+                        save_new_metadata('Tags', t)
+            else:
+                if is_val_new(clean_val, col_list):
+                    print(f"✨ New {csv_key} Detected: {clean_val} ✨")
+                    save_new_metadata(csv_key, clean_val)
+
 # --- AI Integration ---
+def _metadata_version():
+    if not os.path.exists(CSV_PATH):
+        return None
+    st = os.stat(CSV_PATH)
+    return (st.st_mtime_ns, st.st_size)
+
+def _vocabulary_values():
+    meta = load_metadata()
+    # Key in CSV is 'Tags'/'Types', prompt uses {tags}/{types}
+    values = {
+        "categories": ", ".join(meta['Category']),
+        "tags": ", ".join(meta['Tags']),
+        "types": ", ".join(meta['Types']),
+    }
+    if TAG_TOP_K is not None:
+        # Filled per batch by select_tags()
+        del values["tags"]
+    return values
+
+# Tag selector, rebuilt when metadata.csv changes
+_selector_cache = {
+    'version': None,
+    'selector': None,
+    'tags_hash': None
+}
+
+def _tag_examples(limit=MAX_TAG_EXAMPLES):
+    """
+    (raw_text, [tags]) of the most recent tagged rows, which teach the
+    selector which words go with which tag.
+    """
+    if not os.path.exists(DB_NAME):
+        return []
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    try:
+        c.execute("""SELECT raw_text, tags FROM videos
+                     WHERE raw_text IS NOT NULL AND raw_text != '' AND tags IS NOT NULL AND tags != ''
+                     ORDER BY rowid DESC LIMIT ?""", (limit,))
+        return [(text, tags.split(',')) for text, tags in c.fetchall()]
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+
+def get_tag_selector():
+    version = _metadata_version()
+    if _selector_cache['selector'] is None or _selector_cache['version'] != version:
+        tags = load_metadata()['Tags']
+        _selector_cache['selector'] = VocabularySelector(tags, _tag_examples(), core_count=CORE_TAG_COUNT)
+        _selector_cache['tags_hash'] = hashlib.sha256(", ".join(tags).encode("utf-8")).hexdigest()
+        _selector_cache['version'] = version
+    return _selector_cache['selector']
+
+def select_tags(texts):
+    """
+    Tags to offer Gemini for a batch with these raw texts.
+    """
+    return get_tag_selector().select(texts, TAG_TOP_K, MAX_TAG_CHARS)
+
+def get_analysis_prompt():
+    """
+    Returns the compiled analysis prompt. The vocabulary is only re-joined
+    when metadata.csv changes (e.g. after a "(NEW)" tag is saved).
+    """
+    return prompts.get(os.path.basename(PROMPT_PATH), static=_vocabulary_values,
+                       version=(_metadata_version(), TAG_TOP_K is None))
+
+def get_analysis_version(prompt=None):
+    """
+    Version of the current prompt + vocabulary. Rows whose analysis_version
+    differs were analyzed with an older prompt or vocabulary.
+    """
+    prompt = prompt or get_analysis_prompt()
+    if TAG_TOP_K is None:
+        return prompt.version
+    # Tags are picked per batch, so the prompt alone doesn't pin the vocabulary
+    get_tag_selector()
+    key = f"{prompt.version}|{_selector_cache['tags_hash']}|{TAG_TOP_K}|{CORE_TAG_COUNT}|{MAX_TAG_CHARS}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
 def analyze_batch(items):
     """
     items: List of dicts [{'id':..., 'raw_text':..., 'platform':...}]
+    Returns the results parsed from the response ([] if it was unreadable),
+    or None if no response came back. Raises RuntimeError("QUOTA_EXCEEDED") on a 429.
     """
-    # 1. Load context
-    meta = load_metadata()
-    
-    # Check prompt file exists
-    if not os.path.exists(PROMPT_PATH):
-        print(f"[Error] Prompt file not found at {PROMPT_PATH}")
-        return []
+    # 1. Load compiled prompt (re-read only when the prompt or metadata.csv changes)
+    ids = [item.get("id") for item in items]
+    with profiler.stage("analyze.prompt", items=ids):
+        try:
+            prompt = get_analysis_prompt()
+        except FileNotFoundError:
+            print(f"[Error] Prompt file not found at {PROMPT_PATH}")
+            return None
 
-    with open(PROMPT_PATH, 'r', encoding='utf-8') as f:
-        prompt_template = f.read()
-    
-    # 2. Construct Prompt
-    # Map the lists to the prompt placeholders
-    # Note: Prompt template uses {categories}, {tags} etc. Need to match keys.
-    prompt = prompt_template.replace("{categories}", ", ".join(meta['Category']))
-    prompt = prompt.replace("{tags}", ", ".join(meta['Tags'])) # Key in CSV is 'Tags', Prompt uses {tags}
-    prompt = prompt.replace("{types}", ", ".join(meta['Types'])) # Key in CSV is 'Types'
-    prompt = prompt.replace("{items_json}", json.dumps(items, indent=2))
-
-    # 3. Call AI (Using rotated client)
-    current_client = next(client_rotator)
+        values = {"items_json": json.dumps(items, indent=2)}
+        if TAG_TOP_K is not None:
+            values["tags"] = ", ".join(select_tags([item.get("raw_text") or "" for item in items]))
+
+    # 2. Call AI (Using rotated client)
+    current_client = next_client()
     # For logging, find which index it is
     try:
         key_idx = clients.index(current_client) + 1
@@ -198,11 +573,17 @@ def analyze_batch(items):
         pass
 
     try:
-        response = current_client.models.generate_content(
-            model="gemini-3-flash-preview", 
-            contents=prompt
-        )
-        
+        sent = sum(len(v.encode("utf-8")) for v in values.values())
+        with profiler.stage("analyze.gemini", nbytes=sent, service="gemini", items=ids):
+            response = prefix_cache.generate(current_client, MODEL_NAME, prompt, config=ANALYSIS_CONFIG, **values)
+    except Exception as e:
+        error_msg = str(e)
+        if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
+             raise RuntimeError("QUOTA_EXCEEDED")
+        print(f"   [Error] AI Analysis failed: {e}")
+        return None
+
+    try:
         # Extract text parts only to avoid 'thought_signature' warning
         text_parts = []
         if response.candidates and response.candidates[0].content.parts:
@@ -212,14 +593,113 @@ def analyze_batch(items):
         
         text = "".join(text_parts).strip()
         
-        # Clean markdown
+        # Clean markdown (JSON mode shouldn't add any, but older models do)
         if text.startswith("```json"): text = text[7:]
         if text.endswith("```"): text = text[:-3]
         
-        return json.loads(text)
-    except Exception as e:
-        error_msg = str(e)
-        if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-             raise RuntimeError("QUOTA_EXCEEDED")
-        print(f"   [Error] AI Analysis failed: {e}")
+        results = json.loads(text)
+    except (ValueError, AttributeError, IndexError) as e:
+        # Parse errors are not quota errors, even if "429" appears in the message
+        print(f"   [Error] Unreadable AI response: {e}")
         return []
+
+    if isinstance(results, dict):
+        results = [results]
+    if not isinstance(results, list):
+        print(f"   [Error] Unexpected AI response type: {type(results).__name__}")
+        return []
+    # Remember which prompt/vocabulary produced each result
+    version = get_analysis_version(prompt)
+    for result in results:
+        if isinstance(result, dict):
+            result["analysis_version"] = version
+    return results
+
+def validate_result(result, expected_ids):
+    """
+    Returns None if result is a usable analysis of one of expected_ids,
+    otherwise the reason it isn't.
+    """
+    if not isinstance(result, dict):
+        return "Result is not an object"
+    if result.get("id") not in expected_ids:
+        return f"Unexpected id {result.get('id')!r}"
+    for field in REQUIRED_FIELDS:
+        value = result.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return f"Missing {field}"
+    return None
+
+def _analyze_with_backoff(items, wait=None):
+    """
+    analyze_batch, sent again with exponential backoff while the call itself
+    fails. Returns its results, or None if every attempt failed.
+    Raises RuntimeError("QUOTA_EXCEEDED") if the last attempt still hit a 429.
+    """
+    for attempt in range(CALL_RETRIES + 1):
+        if attempt:
+            delay = CALL_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            print(f"      ⏳ AI call failed, sending the batch again in {delay}s")
+            time.sleep(delay)
+        if wait:
+            wait()
+        try:
+            with profiler.stage("analyze", items=[item['id'] for item in items]):
+                returned = analyze_batch(items)
+        except RuntimeError as e:
+            if str(e) != "QUOTA_EXCEEDED" or attempt == CALL_RETRIES:
+                raise
+            continue
+        if returned is not None:
+            return returned
+    return None
+
+def analyze_items(items, on_result, retries=ANALYSIS_RETRIES, wait=None):
+    """
+    Analyzes items, calling on_result(item, result) as soon as an item has a
+    valid result. Only items missing or invalid in a response are sent again.
+    A call that fails outright (network, server, quota) is repeated for the
+    whole batch with backoff. A batch whose responses repeatedly hold nothing
+    usable is split in half (and so on) to isolate the item that breaks the
+    call without losing the rest.
+    wait: Optional callable run before every Gemini call (rate limiting).
+    Returns {id: error} for items that never got a valid result.
+    Raises RuntimeError("QUOTA_EXCEEDED") if the quota stays exhausted.
+    """
+    errors = {}
+    pending = list(items)
+    attempts = failures = 0
+    while pending:
+        waiting = {item['id']: item for item in pending}
+        reasons = {}
+        returned = _analyze_with_backoff(pending, wait)
+        if returned is None:
+            for item in pending:
+                errors[item['id']] = CALL_FAILED_ERROR
+            break
+        attempts += 1
+        for result in returned:
+            reason = validate_result(result, waiting)
+            if reason:
+                if isinstance(result, dict) and result.get("id") in waiting:
+                    reasons[result["id"]] = reason
+                continue
+            on_result(waiting.pop(result["id"]), result)
+
+        failures = failures + 1 if len(waiting) == len(pending) else 0
+        pending = list(waiting.values())
+        if not pending:
+            break
+        if len(pending) > 1 and failures >= BISECT_AFTER_FAILURES:
+            print(f"      ✂️ No usable results for {len(pending)} items, splitting the batch")
+            middle = len(pending) // 2
+            errors.update(analyze_items(pending[:middle], on_result, retries, wait))
+            errors.update(analyze_items(pending[middle:], on_result, retries, wait))
+            break
+        if attempts > retries:
+            isolated = len(pending) == 1 and failures
+            for item in pending:
+                errors[item['id']] = reasons.get(item['id']) or (ISOLATED_ERROR if isolated else "Missing from AI results")
+            break
+        print(f"      🔁 Retrying {len(pending)} item(s) missing or invalid in the response")
+    return errors
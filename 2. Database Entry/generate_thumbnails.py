@@ -0,0 +1,42 @@
+import sqlite3
+import os
+from media_handler import create_thumbnails, thumbnail_paths
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = os.path.join(SCRIPT_DIR, "video_agent.db")
+
+def backfill_thumbnails():
+    """
+    Generates missing thumbnails/poster frames for every image and video in the DB.
+    Safe to re-run: records that already have both files are skipped.
+    """
+    if not os.path.exists(DB_NAME):
+        print("Database not found. Nothing to do.")
+        return
+
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT id, file_path, file_type FROM videos WHERE file_type IN ('Image', 'Video')")
+    rows = c.fetchall()
+    conn.close()
+
+    created, skipped, failed = 0, 0, 0
+    for index, (uid, file_path, file_type) in enumerate(rows, 1):
+        if all(os.path.exists(p) for p in thumbnail_paths(uid)):
+            skipped += 1
+            continue
+        if not file_path or not os.path.exists(file_path):
+            print(f"[{index}/{len(rows)}] ⚠️ Missing media for ID {uid}: {file_path}")
+            failed += 1
+            continue
+
+        if create_thumbnails(uid, file_path, file_type):
+            print(f"[{index}/{len(rows)}] ✅ Thumbnail created for ID {uid}")
+            created += 1
+        else:
+            failed += 1
+
+    print(f"\nDone. Created: {created} | Already present: {skipped} | Failed: {failed}")
+
+if __name__ == "__main__":
+    backfill_thumbnails()
@@ -0,0 +1,329 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import data_handler
+from data_handler import init_db, load_metadata, write_metadata
+from passage_index import index_passages
+
+# Bulk export/import of the library: the videos table plus the metadata.csv
+# vocabulary, streamed in chunks so memory stays flat however big the table is.
+# Formats (picked from the file name):
+#   .parquet        columnar, zstd; needs pyarrow
+#   .jsonl[.gz]     one header line (columns + vocabulary), then one row per line
+# Media files are not included; file_path/blob_hash still point at the store.
+EXPORT_VERSION = 1
+CHUNK_ROWS = 5000
+# gzip level 3 writes ~3x faster than the default 6 for ~30% more bytes
+GZIP_LEVEL = 3
+BUSY_TIMEOUT_SECONDS = 30
+CONFLICT_POLICIES = ("skip", "replace", "newer")
+VOCABULARY_COLUMNS = ["Category", "Tags", "Types", "Platform"]
+
+
+def file_format(path):
+    name = path.lower()
+    if name.endswith(".parquet"):
+        return "parquet"
+    if name.endswith(".jsonl") or name.endswith(".jsonl.gz"):
+        return "jsonl"
+    raise ValueError(f"Unknown export format for {path} (use .parquet, .jsonl or .jsonl.gz)")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet needs pyarrow (pip install pyarrow); .jsonl.gz works without it")
+    return pyarrow
+
+
+def _open_text(path, mode):
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=GZIP_LEVEL)
+    return open(path, mode, encoding="utf-8")
+
+
+def table_columns(conn):
+    """
+    Returns [(name, declared type)] of the videos table.
+    """
+    return [(row[1], (row[2] or "").upper()) for row in conn.execute("PRAGMA table_info(videos)")]
+
+
+def _arrow_schema(columns, vocabulary):
+    pa = _pyarrow()
+    fields = []
+    for name, declared in columns:
+        if "INT" in declared:
+            kind = pa.int64()
+        elif "REAL" in declared or "FLOA" in declared:
+            kind = pa.float64()
+        else:
+            kind = pa.string()
+        fields.append(pa.field(name, kind))
+    metadata = {"library_export": str(EXPORT_VERSION), "vocabulary": json.dumps(vocabulary)}
+    return pa.schema(fields, metadata=metadata)
+
+
+def _as_text(value):
+    # SQLite columns are loosely typed (e.g. analyzed_at holds datetime strings)
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+# --- Export ---
+
+def export_library(path, chunk_rows=CHUNK_ROWS):
+    """
+    Streams every row of videos (one consistent snapshot) and the vocabulary to `path`.
+    Returns the number of rows written.
+    """
+    fmt = file_format(path)
+    conn = sqlite3.connect(data_handler.DB_NAME, timeout=BUSY_TIMEOUT_SECONDS)
+    columns = table_columns(conn)
+    names = [name for name, _ in columns]
+    text_columns = {name for name, declared in columns if "INT" not in declared and "REAL" not in declared}
+    vocabulary = load_metadata()
+
+    cursor = conn.execute(f"SELECT {', '.join(names)} FROM videos ORDER BY rowid")
+    written = 0
+    try:
+        if fmt == "parquet":
+            pa = _pyarrow()
+            schema = _arrow_schema(columns, vocabulary)
+            with pa.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+                while True:
+                    rows = cursor.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    data = {name: [_as_text(r[i]) if name in text_columns else r[i] for r in rows]
+                            for i, name in enumerate(names)}
+                    writer.write_table(pa.Table.from_pydict(data, schema=schema))
+                    written += len(rows)
+        else:
+            with _open_text(path, "w") as f:
+                header = {"library_export": EXPORT_VERSION, "columns": names, "vocabulary": vocabulary,
+                          "exported_at": datetime.now().isoformat(timespec="seconds")}
+                f.write(json.dumps(header, ensure_ascii=False) + "\n")
+                while True:
+                    rows = cursor.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    f.writelines(json.dumps(dict(zip(names, map(_as_text, r))), ensure_ascii=False) + "\n"
+                                 for r in rows)
+                    written += len(rows)
+    finally:
+        conn.close()
+    return written
+
+
+# --- Import ---
+
+def read_export(path, chunk_rows=CHUNK_ROWS):
+    """
+    Returns (columns, vocabulary, chunks) where chunks yields lists of row dicts.
+    """
+    if file_format(path) == "parquet":
+        pa = _pyarrow()
+        parquet = pa.parquet.ParquetFile(path)
+        metadata = parquet.schema_arrow.metadata or {}
+        if b"library_export" not in metadata:
+            raise ValueError(f"{path} is not a library export")
+        vocabulary = json.loads(metadata.get(b"vocabulary", b"{}"))
+
+        def chunks():
+            for batch in parquet.iter_batches(batch_size=chunk_rows):
+                yield batch.to_pylist()
+
+        return parquet.schema_arrow.names, vocabulary, chunks()
+
+    f = _open_text(path, "r")
+    header = json.loads(f.readline() or "{}")
+    if "library_export" not in header:
+        f.close()
+        raise ValueError(f"{path} is not a library export")
+
+    def chunks():
+        with f:
+            chunk = []
+            for line in f:
+                if line.strip():
+                    chunk.append(json.loads(line))
+                if len(chunk) >= chunk_rows:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    return header["columns"], header.get("vocabulary", {}), chunks()
+
+
+def content_keys(blob_hash, raw_text):
+    """
+    What makes two rows the same video whatever their IDs: the stored media
+    blob and, for rows without one, the transcript.
+    """
+    keys = []
+    if blob_hash:
+        keys.append("blob:" + blob_hash)
+    if raw_text and raw_text.strip():
+        keys.append("text:" + hashlib.sha1(raw_text.encode("utf-8")).hexdigest())
+    return keys
+
+
+def _load_existing(conn, chunk_rows):
+    """
+    Returns ({id: analyzed_at}, {content key: id}) for the rows already in the
+    library. Only digests are kept, not the transcripts themselves.
+    """
+    analyzed = {}
+    content = {}
+    cursor = conn.execute("SELECT id, analyzed_at, blob_hash, raw_text FROM videos")
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        for uid, analyzed_at, blob_hash, raw_text in rows:
+            analyzed[uid] = _as_text(analyzed_at)
+            for key in content_keys(blob_hash, raw_text):
+                content.setdefault(key, uid)
+    return analyzed, content
+
+
+def _is_newer(incoming, current):
+    # analyzed_at is an ISO-style timestamp string; rows never analyzed lose
+    return bool(incoming) and (not current or str(incoming) > current)
+
+
+def merge_vocabulary(vocabulary):
+    """
+    Adds values missing from metadata.csv (case-insensitive) and rewrites it once.
+    Returns the number of values added.
+    """
+    current = load_metadata()
+    added = 0
+    for column in VOCABULARY_COLUMNS:
+        seen = {v.lower() for v in current[column]}
+        for value in vocabulary.get(column, []):
+            value = (value or "").strip()
+            if value and value.lower() not in seen:
+                current[column].append(value)
+                seen.add(value.lower())
+                added += 1
+    if added:
+        write_metadata(current)
+    return added
+
+
+def import_library(path, on_conflict="skip", vocabulary=True, chunk_rows=CHUNK_ROWS):
+    """
+    Merges an export into the library, one transaction per chunk.
+    Rows whose id exists are handled per `on_conflict`:
+        skip     keep the local row
+        replace  overwrite it with the exported values
+        newer    overwrite it only if the export's analyzed_at is later
+    New ids whose media or transcript is already in the library are skipped
+    as duplicates. Written rows get their passages re-indexed in the same
+    transaction. Returns a dict of counts.
+    """
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"on_conflict must be one of {CONFLICT_POLICIES}")
+    init_db()  # The target gets every column the export may carry
+    columns, export_vocabulary, chunks = read_export(path, chunk_rows)
+
+    conn = sqlite3.connect(data_handler.DB_NAME, timeout=BUSY_TIMEOUT_SECONDS)
+    local_columns = {name for name, _ in table_columns(conn)}
+    if "id" not in columns:
+        conn.close()
+        raise ValueError(f"{path} has no id column")
+    used = [c for c in columns if c in local_columns]
+    ignored = [c for c in columns if c not in local_columns]
+    if ignored:
+        print(f"   Note: Ignoring columns this library doesn't have: {', '.join(ignored)}")
+
+    insert_sql = f"INSERT INTO videos ({', '.join(used)}) VALUES ({', '.join('?' * len(used))})"
+    updated_columns = [c for c in used if c != "id"]
+    update_sql = f"UPDATE videos SET {', '.join(f'{c} = ?' for c in updated_columns)} WHERE id = ?"
+
+    reindex = "refined_text" in used
+    analyzed, content = _load_existing(conn, chunk_rows)
+    counts = {"inserted": 0, "updated": 0, "skipped": 0, "duplicates": 0, "vocabulary_added": 0}
+    try:
+        for chunk in chunks:
+            inserts, updates, written = [], [], []
+            for row in chunk:
+                uid = row.get("id")
+                if not uid:
+                    counts["skipped"] += 1
+                    continue
+                if uid in analyzed:
+                    if on_conflict == "skip" or (on_conflict == "newer"
+                                                 and not _is_newer(row.get("analyzed_at"), analyzed[uid])):
+                        counts["skipped"] += 1
+                        continue
+                    updates.append([row.get(c) for c in updated_columns] + [uid])
+                    written.append((uid, row.get("refined_text")))
+                    analyzed[uid] = _as_text(row.get("analyzed_at"))
+                    continue
+
+                keys = content_keys(row.get("blob_hash"), row.get("raw_text"))
+                if any(key in content for key in keys):
+                    counts["duplicates"] += 1
+                    continue
+                inserts.append([row.get(c) for c in used])
+                written.append((uid, row.get("refined_text")))
+                analyzed[uid] = _as_text(row.get("analyzed_at"))
+                for key in keys:
+                    content[key] = uid
+
+            with conn:
+                if inserts:
+                    conn.executemany(insert_sql, inserts)
+                if updates and updated_columns:
+                    conn.executemany(update_sql, updates)
+                if reindex:
+                    for uid, text in written:
+                        index_passages(conn, uid, text)
+            counts["inserted"] += len(inserts)
+            counts["updated"] += len(updates)
+    finally:
+        conn.close()
+
+    if vocabulary:
+        counts["vocabulary_added"] = merge_vocabulary(export_vocabulary)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or merge the library (videos table + vocabulary).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="Write the library to a .parquet or .jsonl.gz file")
+    export_parser.add_argument("path")
+    import_parser = sub.add_parser("import", help="Merge an export into this library")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--on-conflict", choices=CONFLICT_POLICIES, default="skip",
+                               help="What to do with rows whose id already exists (default: skip)")
+    import_parser.add_argument("--no-vocabulary", action="store_true", help="Leave metadata.csv untouched")
+    for p in (export_parser, import_parser):
+        p.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "export":
+        init_db()
+        rows = export_library(args.path, chunk_rows=args.chunk_rows)
+        size_mb = os.path.getsize(args.path) / (1024 * 1024)
+        print(f"📦 Exported {rows} rows to {args.path} ({size_mb:.1f} MB) in {time.perf_counter() - start:.1f}s")
+    else:
+        counts = import_library(args.path, on_conflict=args.on_conflict, vocabulary=not args.no_vocabulary,
+                                chunk_rows=args.chunk_rows)
+        print(f"📥 Imported {args.path} in {time.perf_counter() - start:.1f}s. Inserted: {counts['inserted']}"
+              f" | Updated: {counts['updated']} | Skipped (existing id): {counts['skipped']}"
+              f" | Duplicates (same media/text): {counts['duplicates']}"
+              f" | New vocabulary: {counts['vocabulary_added']}")
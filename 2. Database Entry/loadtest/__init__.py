@@ -0,0 +1,9 @@
+"""
+Offline end-to-end load test for the ingestion pipeline.
+
+AssemblyAI, OCR.space and Gemini are replaced by in-process fakes with
+configurable latency, error rate and 429 injection, so throughput can be
+measured without spending quota. Run from the "2. Database Entry" directory:
+    python -m loadtest.run_loadtest --files 100
+    python -m loadtest.run_loadtest --files 100 --compare loadtest/reports/<old>.json
+"""
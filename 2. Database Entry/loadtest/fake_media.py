@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import subprocess
+
+from preview_handler import find_ffmpeg
+
+# Share of each kind in a generated folder (roughly our library's mix)
+DEFAULT_MIX = {"mp4": 0.8, "mp3": 0.05, "jpg": 0.1, "heic": 0.05}
+VIDEO_SECONDS = 2
+VIDEO_SIZE = "180x320"
+
+
+def _ffmpeg(ffmpeg, args):
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error"] + args, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def _image(index, size=(360, 640)):
+    """
+    A small image that differs per index, so OCR text and hashes differ too.
+    """
+    from PIL import Image, ImageDraw
+    rng = random.Random(index)
+    img = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.rectangle([x, y, x + 40, y + 40], fill=tuple(rng.randrange(256) for _ in range(3)))
+    draw.text((10, 10), f"Sample {index}", fill=(255, 255, 255))
+    return img
+
+
+def generate_media_folder(folder, count, mix=None, seed=0):
+    """
+    Fills `folder` with `count` tiny media files: MP4 (test pattern + tone),
+    MP3 (tone), JPG and HEIC. Kinds that need a missing tool are skipped
+    (MP4/MP3 need ffmpeg, HEIC needs pillow-heif).
+    Returns {kind: files written}.
+    """
+    os.makedirs(folder, exist_ok=True)
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=count)
+
+    ffmpeg = find_ffmpeg()
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+        has_heif = True
+    except ImportError:
+        has_heif = False
+
+    written = {}
+    for index, kind in enumerate(kinds):
+        path = os.path.join(folder, f"sample_{seed}_{index:05d}.{kind}")
+        if os.path.exists(path):
+            written[kind] = written.get(kind, 0) + 1
+            continue
+
+        # Vary the tone per file so audio (and any content hash) differs
+        frequency = 200 + rng.randrange(800)
+        if kind == "mp4" and ffmpeg:
+            _ffmpeg(ffmpeg, [
+                "-f", "lavfi", "-i", f"testsrc=size={VIDEO_SIZE}:rate=15:duration={VIDEO_SECONDS}",
+                "-f", "lavfi", "-i", f"sine=frequency={frequency}:duration={VIDEO_SECONDS}",
+                "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+                "-c:a", "aac", "-shortest", path
+            ])
+        elif kind == "mp3" and ffmpeg:
+            _ffmpeg(ffmpeg, ["-f", "lavfi", "-i", f"sine=frequency={frequency}:duration={VIDEO_SECONDS}",
+                             "-c:a", "libmp3lame", "-b:a", "32k", path])
+        elif kind == "jpg":
+            _image(index + seed * 100000).save(path, format="JPEG", quality=80)
+        elif kind == "heic" and has_heif:
+            _image(index + seed * 100000).save(path, format="HEIF", quality=60)
+        else:
+            continue
+        written[kind] = written.get(kind, 0) + 1
+
+    skipped = count - sum(written.values())
+    if skipped:
+        print(f"   Note: Skipped {skipped} files (ffmpeg: {'yes' if ffmpeg else 'no'}, HEIC: {'yes' if has_heif else 'no'})")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a folder of tiny fake media files.")
+    parser.add_argument("folder")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate_media_folder(args.folder, args.count, seed=args.seed))
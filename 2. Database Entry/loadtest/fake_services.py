@@ -0,0 +1,244 @@
+import json
+import random
+import threading
+import time
+import zlib
+from collections import defaultdict
+from types import SimpleNamespace
+
+
+class FaultProfile:
+    """
+    Latency and failure behaviour of one fake service.
+    latency_ms: Base latency per call (plus up to jitter_ms, uniformly).
+    error_rate: Fraction of calls that fail with a generic server error.
+    rate_limit_rate: Fraction of calls that fail with a 429.
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, rate_limit_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+
+
+class CallStats:
+    """
+    Thread-safe per-service counters: calls, errors, 429s and time spent waiting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = defaultdict(lambda: {"calls": 0, "errors": 0, "rate_limited": 0, "seconds": 0.0})
+
+    def record(self, service, outcome, seconds):
+        with self._lock:
+            entry = self.counts[service]
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            if outcome == "error":
+                entry["errors"] += 1
+            elif outcome == "rate_limited":
+                entry["rate_limited"] += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {service: dict(entry, seconds=round(entry["seconds"], 3))
+                    for service, entry in self.counts.items()}
+
+
+class _FakeService:
+    def __init__(self, name, profile, stats, seed):
+        self.name = name
+        self.profile = profile
+        self.stats = stats
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _roll(self):
+        """
+        Sleeps for the configured latency and returns the call outcome:
+        'ok', 'error' or 'rate_limited'.
+        """
+        with self._lock:
+            delay = self.profile.latency_ms + self.rng.uniform(0, self.profile.jitter_ms)
+            roll = self.rng.random()
+        start = time.perf_counter()
+        time.sleep(delay / 1000.0)
+        if roll < self.profile.rate_limit_rate:
+            outcome = "rate_limited"
+        elif roll < self.profile.rate_limit_rate + self.profile.error_rate:
+            outcome = "error"
+        else:
+            outcome = "ok"
+        self.stats.record(self.name, outcome, time.perf_counter() - start)
+        return outcome
+
+
+# --- Gemini (google.genai Client) ---
+
+class FakeGeminiClient(_FakeService):
+    """
+    Stands in for genai.Client. Supports models.generate_content and
+    caches.create as used by PrefixCache / analyze_batch. Replies with an
+    analysis for every item found in the prompt's items JSON, except:
+    malformed_rate: Fraction of replies cut off mid-JSON.
+    drop_rate: Chance each item is left out of a reply.
+    poison_rate: Fraction of items (fixed per id) that make every reply
+                 containing them malformed.
+    """
+
+    def __init__(self, profile, stats, vocabulary, seed=0, new_tag_rate=0.0,
+                 malformed_rate=0.0, drop_rate=0.0, poison_rate=0.0):
+        super().__init__("gemini", profile, stats, seed)
+        self.vocabulary = vocabulary
+        self.new_tag_rate = new_tag_rate
+        self.malformed_rate = malformed_rate
+        self.drop_rate = drop_rate
+        self.poison_rate = poison_rate
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+        self.caches = SimpleNamespace(create=self.create_cache)
+        self._cache_count = 0
+
+    def create_cache(self, model, config):
+        self.stats.record("gemini_cache", "ok", 0.0)
+        self._cache_count += 1
+        return SimpleNamespace(name=f"cachedContents/fake-{self._cache_count}")
+
+    @staticmethod
+    def _items_from(contents):
+        # items_json (json.dumps(items, indent=2)) is the last thing in the prompt
+        start = contents.rfind("[\n  {")
+        if start == -1:
+            return []
+        try:
+            items, _ = json.JSONDecoder().raw_decode(contents[start:])
+            return items
+        except json.JSONDecodeError:
+            return []
+
+    def _pick(self, key, k=1):
+        values = self.vocabulary.get(key) or [f"{key} A", f"{key} B"]
+        with self._lock:
+            picked = self.rng.sample(values, min(k, len(values)))
+            if self.rng.random() < self.new_tag_rate:
+                picked.append(f"Synthetic {key} {self.rng.randint(1, 10 ** 6)} (NEW)")
+        return ", ".join(picked)
+
+    def _is_poison(self, item_id):
+        return zlib.crc32(str(item_id).encode("utf-8")) % 10000 < self.poison_rate * 10000
+
+    def generate_content(self, model, contents, config=None):
+        outcome = self._roll()
+        if outcome == "rate_limited":
+            raise Exception("429 RESOURCE_EXHAUSTED. Fake quota exceeded.")
+        if outcome == "error":
+            raise Exception("500 INTERNAL. Fake server error.")
+
+        items = self._items_from(contents)
+        with self._lock:
+            malformed = self.rng.random() < self.malformed_rate
+            dropped = {i for i, _ in enumerate(items) if self.rng.random() < self.drop_rate}
+        malformed = malformed or any(self._is_poison(item.get("id")) for item in items)
+
+        results = []
+        for index, item in enumerate(items):
+            if index in dropped:
+                continue
+            text = item.get("raw_text") or ""
+            words = text.split()
+            results.append({
+                "id": item.get("id"),
+                "Title": " ".join(words[:6]) or "Untitled",
+                "Summary": " ".join(words[:25]),
+                "Category": self._pick("Category"),
+                "Tags": self._pick("Tags", 5),
+                "Types": self._pick("Types"),
+                "Refined Text": text,
+                "Niche": "Self-improvement",
+            })
+        body = json.dumps(results)
+        if malformed:
+            body = body[:len(body) // 2]
+        # JSON mode replies are bare JSON, free-form ones come fenced
+        if not (config and config.get("response_mime_type") == "application/json"):
+            body = "```json\n" + body + "\n```"
+        part = SimpleNamespace(text=body)
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+# --- AssemblyAI (assemblyai module) ---
+
+class FakeAssemblyAI(_FakeService):
+    """
+    Stands in for the `assemblyai` module as used by media_handler.transcribe_audio.
+    """
+
+    TranscriptStatus = SimpleNamespace(error="error", completed="completed")
+
+    def __init__(self, profile, stats, seed=0, words_per_file=(20, 250)):
+        super().__init__("assemblyai", profile, stats, seed)
+        self.words_per_file = words_per_file
+        self.settings = SimpleNamespace(api_key=None)
+
+    def TranscriptionConfig(self, **kwargs):
+        return SimpleNamespace(**kwargs)
+
+    def Transcriber(self, config=None):
+        return SimpleNamespace(transcribe=self._transcribe)
+
+    def _transcribe(self, path):
+        outcome = self._roll()
+        if outcome == "rate_limited":
+            raise Exception("429 Too Many Requests: fake AssemblyAI rate limit")
+        if outcome == "error":
+            return SimpleNamespace(status="error", error="Fake transcription failure", text=None)
+        with self._lock:
+            # Videos arrive as the shared temp MP3, so text comes from the service seed
+            text = fake_text(self.rng, self.rng.randint(*self.words_per_file))
+        return SimpleNamespace(status="completed", error=None, text=text)
+
+
+# --- OCR.space (requests module) ---
+
+class _FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        if self._payload is None:
+            raise ValueError("Expecting value: line 1 column 1 (char 0)")
+        return self._payload
+
+
+class FakeOCRRequests(_FakeService):
+    """
+    Stands in for the `requests` module as used by media_handler.process_image.
+    """
+
+    def __init__(self, profile, stats, seed=0, words_per_image=(5, 60)):
+        super().__init__("ocr", profile, stats, seed)
+        self.words_per_image = words_per_image
+
+    def post(self, url, files=None, data=None, **kwargs):
+        outcome = self._roll()
+        if outcome == "rate_limited":
+            # OCR.space answers 429 with an HTML page, not JSON
+            return _FakeResponse(429, None)
+        if outcome == "error":
+            return _FakeResponse(200, {"OCRExitCode": 3, "ErrorMessage": ["Fake OCR failure"]})
+        body = b"".join(f.read() for f in (files or {}).values())
+        with self._lock:
+            n = self.rng.randint(*self.words_per_image)
+        text = fake_text(random.Random(zlib.crc32(body)), n)
+        return _FakeResponse(200, {"OCRExitCode": 1, "ParsedResults": [{"ParsedText": text}]})
+
+
+WORDS = ("discipline focus habit work idea result action mindset growth learn build "
+         "patience risk reward fear courage time energy system process craft practice "
+         "consistency attention leverage compound decision clarity").split()
+
+
+def fake_text(rng, n_words):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
@@ -0,0 +1,349 @@
+import argparse
+import builtins
+import contextlib
+import functools
+import itertools
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import data_handler
+import main
+import media_handler
+import media_store
+import preview_handler
+import profiler
+from prompt_registry import PrefixCache
+from loadtest.fake_media import generate_media_folder
+from loadtest.fake_services import CallStats, FakeAssemblyAI, FakeGeminiClient, FakeOCRRequests, FaultProfile
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(LOADTEST_DIR, "data")
+REPORTS_DIR = os.path.join(LOADTEST_DIR, "reports")
+REGRESSION_THRESHOLD = 1.2
+
+FALLBACK_VOCABULARY = "Category,Tags,Types,Platform\nPhilosophy & Mindset,Effort,Advice,Tiktok\nAction & Execution,Focus,Quote,Instagram\n"
+
+# Functions main.py calls, grouped into pipeline stages
+STAGES = {
+    "transcribe": ["transcribe_audio"],
+    "ocr": ["process_image"],
+    "analyze": ["analyze_items"],
+    "db": ["insert_record", "check_filename_exists", "get_existing_data", "check_text_exists", "get_unique_id"],
+    "journal": ["record_job", "update_job_stage", "record_job_error", "get_pending_jobs"],
+    "scan": ["load_library_index", "load_scan_manifest", "save_scan_entries", "content_hash"],
+    "metadata": ["load_metadata", "save_new_metadata"],
+    "thumbnails": ["create_thumbnails"],
+}
+
+
+class StageTimer:
+    """
+    Accumulates wall time and call counts per stage (thread-safe).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def wrap(self, stage, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.seconds[stage] += time.perf_counter() - start
+                    self.calls[stage] += 1
+        return timed
+
+
+def prepare_workspace(workspace):
+    """
+    Points every module at a throwaway library inside `workspace`
+    (DB, metadata.csv, All Files, Thumbnails, Previews) so the real one is untouched.
+    """
+    os.makedirs(workspace, exist_ok=True)
+    csv_path = os.path.join(workspace, "metadata.csv")
+    if os.path.exists(data_handler.CSV_PATH):
+        shutil.copy2(data_handler.CSV_PATH, csv_path)
+    else:
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write(FALLBACK_VOCABULARY)
+
+    data_handler.DB_NAME = os.path.join(workspace, "video_agent.db")
+    data_handler.CSV_PATH = csv_path
+    main.ALL_FILES_DIR = os.path.join(workspace, "All Files")
+    media_store.DB_NAME = data_handler.DB_NAME
+    media_store.ALL_FILES_DIR = main.ALL_FILES_DIR
+    media_store.STORE_DIR = os.path.join(workspace, "Store")
+    media_handler.THUMBS_DIR = os.path.join(workspace, "Thumbnails")
+    preview_handler.PREVIEWS_DIR = os.path.join(workspace, "Previews")
+    preview_handler.MANIFEST_PATH = os.path.join(preview_handler.PREVIEWS_DIR, "manifest.json")
+
+
+def install_fakes(args, stats):
+    """
+    Swaps the Gemini clients, AssemblyAI and OCR.space for in-process fakes.
+    """
+    def profile(latency):
+        return FaultProfile(latency, args.jitter, args.error_rate, args.rate_limit_rate)
+
+    vocabulary = data_handler.load_metadata()
+    clients = [FakeGeminiClient(profile(args.gemini_latency), stats, vocabulary,
+                                seed=args.seed + i, new_tag_rate=args.new_tag_rate,
+                                malformed_rate=args.malformed_rate, drop_rate=args.drop_rate,
+                                poison_rate=args.poison_rate)
+               for i in range(args.gemini_keys)]
+    data_handler.clients = clients
+    data_handler.client_rotator = itertools.cycle(clients)
+    data_handler.prefix_cache = PrefixCache()
+    media_handler.aai = FakeAssemblyAI(profile(args.aai_latency), stats, seed=args.seed)
+    media_handler.requests = FakeOCRRequests(profile(args.ocr_latency), stats, seed=args.seed)
+
+
+def instrument(timer, skip_previews):
+    """
+    Wraps the stage functions as main.py sees them. Returns nothing; the
+    timer collects everything.
+    """
+    for stage, names in STAGES.items():
+        for name in names:
+            if hasattr(main, name):
+                setattr(main, name, timer.wrap(stage, getattr(main, name)))
+    main.store_file = timer.wrap("store", main.store_file)
+    if skip_previews:
+        main.preview_queue.submit = lambda uid, source_path: None
+    else:
+        main.preview_queue.submit = timer.wrap("preview_submit", main.preview_queue.submit)
+        main.preview_queue.wait = timer.wrap("preview_wait", main.preview_queue.wait)
+
+
+def run_pipeline(media_folder, platform_choice, quiet, resume_passes=0):
+    """
+    Runs main.process_workflow() with scripted answers to its prompts, then up
+    to `resume_passes` rounds of main.resume_workflow() while jobs are pending.
+    Returns the exit reason ('completed' or 'exit:<code>').
+    """
+    answers = iter([media_folder, platform_choice])
+    original_input = builtins.input
+    builtins.input = lambda prompt="": next(answers)
+    sink = open(os.devnull, 'w') if quiet else None
+    try:
+        with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+            data_handler.init_db()
+            main.process_workflow()
+            for _ in range(resume_passes):
+                if not data_handler.get_pending_jobs(main.MAX_JOB_ATTEMPTS):
+                    break
+                main.resume_workflow()
+        return "completed"
+    except SystemExit as e:
+        # process_batch exits on a Gemini 429, just like a real run would
+        return f"exit:{e.code}"
+    finally:
+        builtins.input = original_input
+        if sink:
+            sink.close()
+
+
+def count_records():
+    conn = sqlite3.connect(data_handler.DB_NAME)
+    try:
+        total, analyzed = conn.execute(
+            "SELECT count(*), count(NULLIF(refined_text, '')) FROM videos").fetchone()
+    finally:
+        conn.close()
+    return total, analyzed
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=LOADTEST_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_loadtest(args):
+    media_folder = args.media_dir or os.path.join(DATA_DIR, f"media_{args.files}_s{args.seed}")
+    print(f"🎬 Preparing {args.files} fake media files in {media_folder}")
+    mix = generate_media_folder(media_folder, args.files, seed=args.seed)
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    workspace = tempfile.mkdtemp(prefix="loadtest_", dir=DATA_DIR if args.keep else None)
+    stats = CallStats()
+    timer = StageTimer()
+    cwd = os.getcwd()
+    try:
+        prepare_workspace(workspace)
+        install_fakes(args, stats)
+        instrument(timer, args.skip_previews)
+
+        # Anything the pipeline writes to the working directory stays in the workspace
+        os.chdir(workspace)
+        print("🚀 Running ingestion pipeline against fake services...")
+        # One profile across the scan and any resume passes
+        profiler.start("loadtest", mode=args.profile)
+        start = time.perf_counter()
+        try:
+            exit_reason = run_pipeline(media_folder, args.platform, not args.verbose, args.resume_passes)
+        finally:
+            elapsed = time.perf_counter() - start
+            profile = profiler.finish()
+        total, analyzed = count_records()
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    files = sum(mix.values())
+    api = stats.as_dict()
+    stage_total = sum(timer.seconds.values())
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "media_mix": mix,
+            "services": {
+                "gemini_latency_ms": args.gemini_latency,
+                "aai_latency_ms": args.aai_latency,
+                "ocr_latency_ms": args.ocr_latency,
+                "jitter_ms": args.jitter,
+                "error_rate": args.error_rate,
+                "rate_limit_rate": args.rate_limit_rate,
+                "gemini_keys": args.gemini_keys,
+                "malformed_rate": args.malformed_rate,
+                "drop_rate": args.drop_rate,
+                "poison_rate": args.poison_rate,
+            },
+            "resume_passes": args.resume_passes,
+            "workspace": workspace if args.keep else None,
+        },
+        "exit": exit_reason,
+        "files": files,
+        "records": total,
+        "analyzed": analyzed,
+        "elapsed_s": round(elapsed, 3),
+        "files_per_minute": round(analyzed / elapsed * 60, 2) if elapsed else 0,
+        "stages": {
+            stage: {
+                "seconds": round(seconds, 3),
+                "calls": timer.calls[stage],
+                "share": round(seconds / elapsed, 3) if elapsed else 0,
+            } for stage, seconds in sorted(timer.seconds.items(), key=lambda kv: -kv[1])
+        },
+        "other_s": round(max(0.0, elapsed - stage_total), 3),
+        "api": api,
+        "api_calls_per_file": {
+            service: round(entry["calls"] / files, 3) if files else 0 for service, entry in api.items()
+        },
+        # Calls that did not end in a saved analysis show up here
+        "gemini_calls_per_analyzed": round(api.get("gemini", {}).get("calls", 0) / analyzed, 3) if analyzed else None,
+        # The pipeline's own stage timings (profiler.py): p50/p95, bytes, per item
+        "profile": profile.summary(),
+    }
+    return report
+
+
+def print_report(report):
+    print(f"\n📊 {report['analyzed']}/{report['files']} files analyzed in {report['elapsed_s']:.1f}s "
+          f"({report['files_per_minute']:.1f} files/min, {report['exit']})")
+    print("\n   Stage            seconds    calls   share")
+    for stage, entry in report["stages"].items():
+        print(f"   {stage:<15} {entry['seconds']:>8.2f} {entry['calls']:>8} {entry['share'] * 100:>6.1f}%")
+    print(f"   {'other':<15} {report['other_s']:>8.2f}")
+    print("\n   Service          calls   errors   429s   per file")
+    for service, entry in report["api"].items():
+        print(f"   {service:<15} {entry['calls']:>6} {entry['errors']:>8} {entry['rate_limited']:>6}"
+              f"   {report['api_calls_per_file'][service]:>8.2f}")
+    if report.get("gemini_calls_per_analyzed") is not None:
+        print(f"\n   Gemini calls per analyzed file: {report['gemini_calls_per_analyzed']:.3f}")
+    if report.get("profile"):
+        print("\n" + profiler.format_summary(report["profile"]))
+
+
+def compare_reports(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Returns True if throughput dropped, or API calls per file grew, beyond `threshold`.
+    """
+    regressed = False
+    old_fpm, new_fpm = baseline.get("files_per_minute") or 0, current["files_per_minute"]
+    print(f"\nComparing against {baseline['meta'].get('commit')} ({baseline['meta'].get('created_at')})")
+    if old_fpm:
+        ratio = new_fpm / old_fpm
+        print(f"   files/min   {old_fpm:.1f} -> {new_fpm:.1f} (x{ratio:.2f})")
+        if ratio < 1 / threshold:
+            print("   ⚠️ Throughput regression")
+            regressed = True
+    for service, per_file in current["api_calls_per_file"].items():
+        old = baseline.get("api_calls_per_file", {}).get(service)
+        if old and per_file > old * threshold:
+            print(f"   ⚠️ {service} calls per file {old:.2f} -> {per_file:.2f}")
+            regressed = True
+    return regressed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Offline ingestion load test with fake AssemblyAI/OCR/Gemini.")
+    parser.add_argument("--files", type=int, default=50, help="Number of fake media files")
+    parser.add_argument("--media-dir", help="Use (or fill) this media folder instead of loadtest/data")
+    parser.add_argument("--platform", default="1", help="Platform menu choice passed to main.py")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-latency", type=float, default=1500, help="ms per Gemini call")
+    parser.add_argument("--aai-latency", type=float, default=3000, help="ms per transcription")
+    parser.add_argument("--ocr-latency", type=float, default=800, help="ms per OCR request")
+    parser.add_argument("--jitter", type=float, default=0, help="Extra random ms per call")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--gemini-keys", type=int, default=3, help="Number of fake Gemini API keys")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of Gemini replies cut off mid-JSON")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Chance Gemini leaves an item out of its reply")
+    parser.add_argument("--poison-rate", type=float, default=0.0,
+                        help="Fraction of items that break every Gemini reply containing them")
+    parser.add_argument("--new-tag-rate", type=float, default=0.02, help="Chance a fake analysis invents a (NEW) value")
+    parser.add_argument("--resume-passes", type=int, default=0,
+                        help="Follow the scan with up to this many --resume rounds while jobs are pending")
+    parser.add_argument("--profile", choices=profiler.PROFILE_MODES, help="Also profile Python code in the pipeline")
+    parser.add_argument("--skip-previews", action="store_true", help="Do not transcode preview renditions")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary library for inspection")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    parser.add_argument("--out", help="Report path (default: loadtest/reports/<time>_<commit>.json)")
+    parser.add_argument("--compare", help="Baseline report; exits 1 on regression")
+    args = parser.parse_args()
+
+    report = run_loadtest(args)
+    print_report(report)
+
+    out = args.out
+    if not out:
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out = os.path.join(REPORTS_DIR, f"{stamp}_{report['meta']['commit'] or 'nogit'}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report written to {out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare_reports(baseline, report):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
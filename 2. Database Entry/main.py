@@ -1,10 +1,15 @@
 import os
-import shutil
-import uuid
-import glob
-from data_handler import init_db, insert_record, analyze_batch, save_new_metadata, get_unique_id, check_text_exists, get_existing_data, load_metadata, check_filename_exists
-from media_handler import transcribe_audio, process_image
-import time
+import sys
+import argparse
+import hashlib
+from datetime import datetime
+from data_handler import init_db, insert_record, analyze_items, ISOLATED_ERROR, save_new_values, get_unique_id, check_text_exists, get_existing_data
+from data_handler import record_job, update_job_stage, record_job_error, get_pending_jobs, get_job_summary, JOB_STAGES, DONE_STAGES
+from data_handler import load_library_index, load_scan_manifest, save_scan_entries, delete_scan_entries
+from media_handler import transcribe_audio, process_image, create_thumbnails
+from preview_handler import PreviewTranscoder
+from media_store import store_file
+import profiler
 
 # Configuration
 # Path to "All Files" relative to this script
@@ -23,6 +28,22 @@ PLATFORM_MAP = {
 
 MAX_BATCH_CHARS = 10000
 
+# Jobs that failed this many times are left for manual inspection (see --status)
+MAX_JOB_ATTEMPTS = 3
+
+# Content hash = size + first/last chunk; enough to spot renamed or moved copies
+HASH_CHUNK_BYTES = 1024 * 1024
+MANIFEST_FLUSH_EVERY = 500
+
+VIDEO_EXTS = {'.mp4', '.mov'} # Using set for O(1) lookup
+AUDIO_EXTS = {'.mp3'}
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.heic', '.webp'}
+VALID_EXTS = VIDEO_EXTS | AUDIO_EXTS | IMAGE_EXTS
+
+# Web previews are transcoded in the background while ingestion continues
+PREVIEW_WORKERS = 2
+preview_queue = PreviewTranscoder(max_workers=PREVIEW_WORKERS)
+
 def get_dest_folder(platform, file_type):
     """
     Returns the nested path: All Files / [Platform] / [type]
@@ -36,100 +57,338 @@ def get_dest_folder(platform, file_type):
     return path
 
 
+def iter_media_files(folder):
+    """
+    Yields (path, stat) for every media file under `folder`, recursively.
+    Uses os.scandir so stat results come with the directory listing.
+    Hidden files and folders are skipped.
+    """
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"   [Error] Cannot read folder {current}: {e}")
+            continue
+
+        subfolders = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subfolders.append(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in VALID_EXTS and entry.is_file():
+                yield entry.path, entry.stat()
+        stack.extend(reversed(subfolders))
+
+
+@profiler.timed("hash")
+def content_hash(path, size=None):
+    """
+    Fast content fingerprint: SHA-256 of the size plus the first and last
+    HASH_CHUNK_BYTES of the file. Returns None if the file can't be read.
+    """
+    try:
+        if size is None:
+            size = os.path.getsize(path)
+        h = hashlib.sha256(str(size).encode())
+        with open(path, 'rb') as f:
+            h.update(f.read(HASH_CHUNK_BYTES))
+            if size > HASH_CHUNK_BYTES:
+                f.seek(-HASH_CHUNK_BYTES, os.SEEK_END)
+                h.update(f.read(HASH_CHUNK_BYTES))
+        return h.hexdigest()
+    except OSError:
+        return None
+
+
+def manifest_entry(path, uid, file_hash=None):
+    """
+    Builds a scan manifest row for a handled source file (None if it is gone).
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_size, st.st_mtime_ns, file_hash or content_hash(path, st.st_size), uid)
+
+
+def remember_files(*entries):
+    save_scan_entries([e for e in entries if e])
+
+
+def make_item(uid, dest_path, source_path, raw_text, platform, file_type, original_name, file_hash=None):
+    return {
+        "id": uid,
+        "file_path": dest_path,
+        "source_path": source_path,
+        "raw_text": raw_text,
+        "char_count": len(raw_text),
+        "platform": platform,
+        "file_type": file_type,
+        "original_filename": original_name,
+        "content_hash": file_hash
+    }
+
+
+class BatchBuffer:
+    """
+    Collects items for Gemini until MAX_BATCH_CHARS would be exceeded.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.chars = 0
+
+    def add(self, item):
+        if self.chars + item['char_count'] > MAX_BATCH_CHARS:
+            self.flush()
+        self.items.append(item)
+        self.chars += item['char_count']
+
+    def flush(self):
+        process_batch(self.items)
+        self.items = []
+        self.chars = 0
+
+
+def commit_item(item, result):
+    """
+    Stores the file in the library and saves the final record for one analyzed item.
+    """
+    # Final destination check/store (content-addressed blob + readable link)
+    dest_path = item['file_path']
+    source_path = item['source_path']
+    blob_hash = item.get('blob_hash')
+
+    if not blob_hash or not os.path.exists(dest_path):
+        try:
+            with profiler.stage("store", nbytes=os.path.getsize(source_path)):
+                blob_hash = store_file(source_path, dest_path)
+        except Exception as e:
+            print(f"   [Error] Final file store failed for {item['id']}: {e}")
+            record_job_error(item['id'], f"Store failed: {e}")
+            return
+
+    save_new_values(result)
+
+    record = {
+        "id": item['id'],
+        "title": result.get("Title", ""),
+        "summary": result.get("Summary", ""),
+        "category": result.get("Category", ""),
+        "tags": result.get("Tags", ""),
+        "types": result.get("Types", ""),
+        "refined_text": result.get("Refined Text", ""),
+        "raw_text": item['raw_text'],
+        "platform": item['platform'],
+        "file_type": item['file_type'],
+        "file_path": item['file_path'],
+        "original_filename": item.get('original_filename'),
+        "blob_hash": blob_hash,
+        "analysis_version": result.get("analysis_version"),
+        "analyzed_at": datetime.now()
+    }
+    insert_record(record)
+    create_thumbnails(item['id'], dest_path, item['file_type'])
+    if item['file_type'] == "Video":
+        preview_queue.submit(item['id'], dest_path)
+    update_job_stage(item['id'], "committed")
+    remember_files(manifest_entry(source_path, item['id'], item.get('content_hash')))
+    print(f"   ✅ Saved ID {item['id']}")
+
+
 def process_batch(batch):
     """
     Processes a list of items (batch) using Gemini AI.
     Handles rotation and atomic saving (copy + DB).
+    Items that never get a valid result stay at 'extracted' in the journal
+    with the error recorded, so --resume retries them.
     """
     if not batch:
         return
     
     print(f"\n--- Processing Batch ({len(batch)} items) ---")
     
-    # Analyze_batch expects a list of: {'id':..., 'raw_text':..., 'platform':...}
+    # Analyze_items expects a list of: {'id':..., 'raw_text':..., 'platform':...}
     ai_inputs = [{"id": x["id"], "raw_text": x["raw_text"], "platform": x["platform"]} for x in batch]
-    
+    items_by_id = {x["id"]: x for x in batch}
+
+    def on_result(ai_input, result):
+        item = items_by_id[ai_input["id"]]
+        with profiler.item(item['id']):
+            update_job_stage(item['id'], "analyzed", result=result)
+            commit_item(item, result)
+
     try:
-        ai_results = analyze_batch(ai_inputs)
+        errors = analyze_items(ai_inputs, on_result)
     except RuntimeError as e:
         if str(e) == "QUOTA_EXCEEDED":
             print(f"\n🚨 CRITICAL: Gemini API Quota Exceeded (429)! Stopping process.")
-            import sys
+            print("   Unfinished files are journaled; continue later with: python main.py --resume")
             sys.exit(0)
-        else:
-            print(f"   [Error] Unexpected error: {e}")
-            ai_results = []
+        raise
+
+    for uid, error in errors.items():
+        print(f"   [Error] No valid AI result for item {uid}: {error}")
+        record_job_error(uid, error)
+
+
+def extract_item(uid, source_path, dest_path, platform, file_type, original_name, file_hash=None, source=None):
+    """
+    Transcribes/OCRs a journaled file, saves the partial record and copies it.
+    source: Optional extra columns for the record (source_url, source_author, ...).
+    Returns the batch item, or None if it turned out to be a duplicate.
+    """
+    # 5. Extract Text (Delay copying)
+    raw_text = ""
+    if file_type == "Audio" or file_type == "Video":
+        raw_text = transcribe_audio(source_path)
+    elif file_type == "Image":
+        raw_text = process_image(source_path)
+    
+    if not raw_text: raw_text = ""
+
+    # 6. Check for Content Duplicates (DO THIS BEFORE SAVING)
+    matching_id = check_text_exists(raw_text)
+    if matching_id:
+        print(f"⚠️ Skipped: Duplicate content detected (Matches existing ID: {matching_id})")
+        update_job_stage(uid, "skipped", note=f"Duplicate content of {matching_id}")
+        remember_files(manifest_entry(source_path, matching_id, file_hash))
+        return None
+
+    # 5.5 Store File and Save Partial Record (EAGER SAVE)
+    # This ensures we don't lose the transcription if Gemini fails
+    blob_hash = None
+    try:
+        with profiler.stage("store", nbytes=os.path.getsize(source_path)):
+            blob_hash = store_file(source_path, dest_path)
+    except Exception as e:
+        print(f"   [Error] Eager file store failed: {e}")
+
+    partial_record = {
+        "id": uid,
+        "raw_text": raw_text,
+        "platform": platform,
+        "file_type": file_type,
+        "file_path": dest_path,
+        "original_filename": original_name,
+        "blob_hash": blob_hash
+    }
+    partial_record.update(source or {})
+    insert_record(partial_record)
     
-    if not ai_results:
-        print(f"   [Error] No AI results for this batch. Skipping.")
+    update_job_stage(uid, "extracted")
+    item = make_item(uid, dest_path, source_path, raw_text, platform, file_type, original_name, file_hash)
+    item['blob_hash'] = blob_hash
+    return item
+
+
+def resume_job(job, batch):
+    """
+    Continues a journaled job from the stage after the last one it completed.
+    """
+    uid = job['id']
+    source_path = job['source_path']
+    dest_path = job['dest_path']
+    # The library copy is as good as the original once it exists
+    if not os.path.exists(source_path) and os.path.exists(dest_path):
+        source_path = dest_path
+
+    with profiler.item(uid):
+        data = get_existing_data(uid)
+    raw_text = (data[0] or "") if data else None
+
+    # Analyzed but not saved: reuse the stored analysis, no new Gemini call
+    if job['stage'] == "analyzed" and job['result'] and raw_text is not None:
+        with profiler.item(uid):
+            commit_item(make_item(uid, dest_path, source_path, raw_text, job['platform'],
+                                  job['file_type'], job['original_filename']), job['result'])
         return
 
-    # Process each result in the batch mapping it back to the original items
-    for item in batch:
-        # Find corresponding AI result
-        result = next((r for r in ai_results if r.get('id') == item['id']), None)
-        
-        if not result:
-            print(f"   [Error] No results found for item {item['id']}")
-            continue
+    # Text already extracted: only the analysis is missing
+    if job['stage'] in ("extracted", "analyzed") and raw_text is not None:
+        item = make_item(uid, dest_path, source_path, raw_text, job['platform'],
+                         job['file_type'], job['original_filename'])
+        if job['last_error'] == ISOLATED_ERROR:
+            # Broke every batch it was in last time; don't let it sink others again
+            process_batch([item])
+        else:
+            batch.add(item)
+        return
+
+    if not os.path.exists(source_path):
+        print(f"   [Error] Source file missing for {uid}: {job['source_path']}")
+        record_job_error(uid, "Source file missing")
+        return
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with profiler.item(uid):
+        item = extract_item(uid, source_path, dest_path, job['platform'], job['file_type'], job['original_filename'])
+    if item:
+        batch.add(item)
+
+
+def finish_previews():
+    # Let queued preview renditions finish
+    with profiler.stage("previews"):
+        done, failed = preview_queue.wait()
+    preview_queue.shutdown()
+    if done or failed:
+        print(f"\nPreviews transcoded: {done} | Failed: {failed}")
 
-        # Final destination check/copy (ATOMIC MOVE)
-        dest_path = item['file_path']
-        source_path = item['source_path']
-        
-        if not os.path.exists(dest_path):
-            try:
-                shutil.copy2(source_path, dest_path)
-            except Exception as e:
-                print(f"   [Error] Final file copy failed for {item['id']}: {e}")
-                continue
 
-        # Check for New Metadata
-        check_map = {'Category': 'Category', 'Tags': 'Tags', 'Types': 'Types'}
-        for csv_key, json_key in check_map.items():
-            val = str(result.get(json_key, ""))
-            if "(NEW)" in val:
-                clean_val = val.replace("(NEW)", "").strip()
-                
-                # Double check against latest CSV
-                current_meta = load_metadata()
-                col_list = current_meta.get(csv_key, [])
-                
-                def is_val_new(v, existing_list):
-                    return not any(ex.lower() == v.lower().strip() for ex in existing_list)
-
-                if csv_key == 'Tags':
-                    for tag in clean_val.split(','):
-                        t = tag.strip()
-                        if t and is_val_new(t, col_list):
-                            print(f"✨ New Tag Detected: {t} ✨")
-                            save_new_metadata('Tags', t)
-                else:
-                    if is_val_new(clean_val, col_list):
-                        print(f"✨ New {csv_key} Detected: {clean_val} ✨")
-                        save_new_metadata(csv_key, clean_val)
-                    
-        record = {
-            "id": item['id'],
-            "title": result.get("Title", ""),
-            "summary": result.get("Summary", ""),
-            "category": result.get("Category", ""),
-            "tags": result.get("Tags", ""),
-            "types": result.get("Types", ""),
-            "refined_text": result.get("Refined Text", ""),
-            "raw_text": item['raw_text'],
-            "platform": item['platform'],
-            "file_type": item['file_type'],
-            "file_path": item['file_path'],
-            "original_filename": item.get('original_filename')
-        }
-        insert_record(record)
-        print(f"   ✅ Saved ID {item['id']}")
-
-
-def process_workflow():
+def resume_workflow(max_attempts=MAX_JOB_ATTEMPTS, profile_mode=None):
+    """
+    Continues every unfinished journaled job without redoing completed stages.
+    profile_mode: see profiler.PROFILE_MODES.
+    """
+    jobs = get_pending_jobs(max_attempts)
+    if not jobs:
+        print("Nothing to resume. All journaled files are committed.")
+        return
+
+    print(f"Resuming {len(jobs)} unfinished files.\n")
+    profiler.start("resume", mode=profile_mode)
+    batch = BatchBuffer()
+    for index, job in enumerate(jobs, 1):
+        print(f"\n--- Resuming {index}/{len(jobs)}: {os.path.basename(job['source_path'])} [{job['stage']}] ---")
+        resume_job(job, batch)
+
+    batch.flush()
+    finish_previews()
+    print("\nResume Complete!")
+
+
+def print_status(max_attempts=MAX_JOB_ATTEMPTS):
+    """
+    Summarizes the ingestion journal: files per stage, retries exhausted, recent errors.
+    """
+    counts, exhausted, recent_errors = get_job_summary(max_attempts)
+    total = sum(counts.values())
+    if not total:
+        print("No journaled files yet.")
+        return
+
+    print(f"📋 Ingestion journal: {total} files")
+    for stage in JOB_STAGES + ["skipped"]:
+        print(f"   {stage:<10} {counts.get(stage, 0)}")
+    pending = sum(n for stage, n in counts.items() if stage not in DONE_STAGES)
+    print(f"\n   Backlog: {pending} files ({exhausted} gave up after {max_attempts} attempts)")
+    if recent_errors:
+        print("\n   Recent errors:")
+        for uid, stage, attempts, error in recent_errors:
+            print(f"   - {uid} [{stage}, {attempts} attempts]: {error}")
+    if pending:
+        print("\n   Run: python main.py --resume")
+
+
+def process_workflow(profile_mode=None):
     # 1. Inputs
     input_folder = input("Enter the full path to the source folder: ").strip('"').strip("'")
+    input_folder = os.path.abspath(os.path.expanduser(input_folder))
     if not os.path.exists(input_folder):
         print(f"[Error] Folder '{input_folder}' not found.")
         return
@@ -142,41 +401,68 @@ def process_workflow():
 
     print(f"\nScanning: {input_folder}")
     print(f"Platform: {platform}")
+    profiler.start("scan", mode=profile_mode)
     
-    # 2. Gather Files
-    video_exts = {'.mp4', '.mov'} # Using set for O(1) lookup
-    audio_exts = {'.mp3'}
-    image_exts = {'.jpg', '.jpeg', '.png', '.heic', '.webp'}
-    valid_exts = video_exts | audio_exts | image_exts
+    # 2. Gather Files (recursive). Everything the per-file checks need is
+    # preloaded once, so unchanged files cost a dict lookup, not DB queries.
+    manifest = load_scan_manifest()
+    known_names, known_ids = load_library_index()
+    # Manifest rows whose video was deleted since no longer vouch for anything
+    stale = [path for path, entry in manifest.items() if entry[3] not in known_ids]
+    if stale:
+        delete_scan_entries(stale)
+        for path in stale:
+            del manifest[path]
+    known_hashes = {entry[2]: entry[3] for entry in manifest.values() if entry[2]}
+    pending_jobs = {job['source_path']: job for job in get_pending_jobs()}
 
     files_to_process = []
-    for f in os.listdir(input_folder):
-        ext = os.path.splitext(f)[1].lower()
-        if ext in valid_exts:
-            full_path = os.path.join(input_folder, f)
-            if os.path.isfile(full_path):
-                files_to_process.append(full_path)
+    unchanged = 0
+    with profiler.stage("scan"):
+        for full_path, st in iter_media_files(input_folder):
+            entry = manifest.get(full_path)
+            if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns and full_path not in pending_jobs:
+                unchanged += 1
+                continue
+            files_to_process.append((full_path, st))
     
-    if not files_to_process:
+    if not files_to_process and not unchanged:
         print("No valid files found.")
         return
     
-    print(f"Found {len(files_to_process)} files.\n")
+    print(f"Found {len(files_to_process) + unchanged} files ({unchanged} unchanged since last scan).\n")
+    if not files_to_process:
+        print("Nothing new to process.")
+        return
+
+    # Manifest rows for files skipped during this scan, written in bulk
+    manifest_updates = []
+
+    def remember_skip(path, st, file_hash, uid):
+        manifest_updates.append((path, st.st_size, st.st_mtime_ns, file_hash, uid))
+        if len(manifest_updates) >= MANIFEST_FLUSH_EVERY:
+            save_scan_entries(manifest_updates)
+            manifest_updates.clear()
 
     # 3. Processing Loop (Batching)
-    current_batch = []
-    current_chars = 0
+    batch = BatchBuffer()
 
-    for index, file_path in enumerate(files_to_process, 1):
+    for index, (file_path, st) in enumerate(files_to_process, 1):
         filename = os.path.basename(file_path)
         file_ext = os.path.splitext(filename)[1].lower()
         
         print(f"\n--- Scanning {index}/{len(files_to_process)}: {filename} ---")
+
+        # 0. Journaled but unfinished (e.g. a previous run crashed): continue where it stopped
+        job = pending_jobs.get(file_path)
+        if job:
+            print(f"🔄 Resuming: Journaled at stage '{job['stage']}' (ID: {job['id']})")
+            resume_job(job, batch)
+            continue
         
         # 1. Robust Extraction: Determine ID and Original Name
         uid = None
         original_name = filename # Default if not already prefixed
-        file_ext = os.path.splitext(filename)[1].lower()
 
         # Check for {8 chars}_ pattern
         if len(filename) > 9 and filename[8] == '_':
@@ -186,20 +472,27 @@ def process_workflow():
                 original_name = filename[9:] # Everything after the first '_'
 
         # 2. Early Duplicate Checks
-        # A) Check by Original Name (The text after the ID_ or the raw filename)
-        match_id = check_filename_exists(original_name)
+        # A) Same bytes as a file handled before (renamed or moved copy)
+        file_hash = content_hash(file_path, st.st_size)
+        match_id = known_hashes.get(file_hash) if file_hash else None
+        if match_id:
+            print(f"⚠️ Skipped: Same file as existing ID: {match_id}")
+            remember_skip(file_path, st, file_hash, match_id)
+            continue
+
+        # B) Check by Original Name (The text after the ID_ or the raw filename)
+        match_id = known_names.get(original_name)
         if match_id:
             print(f"⚠️ Skipped: Filename duplicate detected (Matches existing ID: {match_id})")
+            remember_skip(file_path, st, file_hash, match_id)
             continue
         
-        # B) Check by ID (If we extracted one from the filename)
-        if uid:
-            data = get_existing_data(uid)
-            if data:
-                # If fully processed, skip
-                if data[0] and data[1]:
-                    print(f"⚠️ Skipped: Already processed (Matches existing ID: {uid})")
-                    continue
+        # C) Check by ID (If we extracted one from the filename)
+        status = known_ids.get(uid) if uid else None
+        if status and status[0] and status[1]:
+            print(f"⚠️ Skipped: Already processed (Matches existing ID: {uid})")
+            remember_skip(file_path, st, file_hash, uid)
+            continue
         
         # 3. Generate ID if new
         if not uid:
@@ -209,122 +502,69 @@ def process_workflow():
 
         # 4. Determine Type
         file_type = "Unknown"
-        video_exts = {'.mp4', '.mov'}
-        audio_exts = {'.mp3'}
-        image_exts = {'.jpg', '.jpeg', '.png', '.heic', '.webp'}
-
-        if file_ext in video_exts:
+        if file_ext in VIDEO_EXTS:
             file_type = "Video"
-        elif file_ext in audio_exts:
+        elif file_ext in AUDIO_EXTS:
             file_type = "Audio"
-        elif file_ext in image_exts:
+        elif file_ext in IMAGE_EXTS:
             file_type = "Image"
         
         dest_folder = get_dest_folder(platform, file_type)
         dest_path = os.path.join(dest_folder, new_filename)
 
-        # 3. Smart Resume Logic (Condition A)
-        raw_text = ""
-        
-        if uid:
+        # 3. Smart Resume Logic (Condition B: Has raw but no refined)
+        if status and status[0]:
             data = get_existing_data(uid)
-            if data:
-                existing_raw_text, existing_refined_text = data
-                
-                # Condition A: Already fully processed
-                if existing_raw_text and existing_refined_text:
-                    print(f"⚠️ Skipped: Already processed (Matches existing ID: {uid})")
-                    if not os.path.exists(dest_path):
-                         try:
-                            shutil.copy2(file_path, dest_path)
-                         except:
-                            pass 
-                    continue
-                
-                # Condition B: Resume AI (Has raw but no refined)
-                if existing_raw_text:
-                    print(f"🔄 Resuming: Has text, adding to queue (ID: {uid})")
-                    raw_text = existing_raw_text
-                    
-                    item = {
-                        "id": uid,
-                        "file_path": dest_path,
-                        "source_path": file_path,
-                        "raw_text": raw_text,
-                        "char_count": len(raw_text),
-                        "platform": platform,
-                        "file_type": file_type,
-                        "original_filename": original_name
-                    }
-                    
-                    # Batch Management
-                    if current_chars + item['char_count'] > MAX_BATCH_CHARS:
-                        process_batch(current_batch)
-                        current_batch = []
-                        current_chars = 0
-                    
-                    current_batch.append(item)
-                    current_chars += item['char_count']
-                    continue 
+            if data and data[0]:
+                print(f"🔄 Resuming: Has text, adding to queue (ID: {uid})")
+                record_job(uid, file_path, dest_path, original_name, platform, file_type)
+                update_job_stage(uid, "extracted")
+                batch.add(make_item(uid, dest_path, file_path, data[0], platform, file_type, original_name, file_hash))
+                continue 
 
         # Condition C: New File (Transcription needed)
-        # 5. Extract Text (Delay copying)
-        if file_type == "Audio" or file_type == "Video":
-            raw_text = transcribe_audio(file_path)
-        elif file_type == "Image":
-            raw_text = process_image(file_path)
-        
-        if not raw_text: raw_text = ""
-
-        # 6. Check for Content Duplicates (DO THIS BEFORE SAVING)
-        matching_id = check_text_exists(raw_text)
-        if matching_id:
-            print(f"⚠️ Skipped: Duplicate content detected (Matches existing ID: {matching_id})")
-            continue
-
-        # 5.5 Save Partial Record and Copy File (EAGER SAVE)
-        # This ensures we don't lose the transcription if Gemini fails
-        partial_record = {
-            "id": uid,
-            "raw_text": raw_text,
-            "platform": platform,
-            "file_type": file_type,
-            "file_path": dest_path,
-            "original_filename": original_name
-        }
-        insert_record(partial_record)
-        
-        if not os.path.exists(dest_path):
-            try:
-                shutil.copy2(file_path, dest_path)
-            except Exception as e:
-                print(f"   [Error] Eager file copy failed: {e}")
-        
-        item = {
-            "id": uid,
-            "file_path": dest_path,
-            "source_path": file_path,
-            "raw_text": raw_text,
-            "char_count": len(raw_text),
-            "platform": platform,
-            "file_type": file_type,
-            "original_filename": original_name
-        }
-        
-        # Batch Management
-        if current_chars + item['char_count'] > MAX_BATCH_CHARS:
-            process_batch(current_batch)
-            current_batch = []
-            current_chars = 0
-        
-        current_batch.append(item)
-        current_chars += item['char_count']
+        with profiler.item(uid):
+            record_job(uid, file_path, dest_path, original_name, platform, file_type)
+            item = extract_item(uid, file_path, dest_path, platform, file_type, original_name, file_hash)
+        if item:
+            # Later files in this scan see it as known, as the DB checks did
+            known_names.setdefault(original_name, uid)
+            known_ids[uid] = (bool(item['raw_text']), False)
+            if file_hash:
+                known_hashes[file_hash] = uid
+            batch.add(item)
 
     # Final batch
-    process_batch(current_batch)
+    batch.flush()
+    save_scan_entries(manifest_updates)
+    finish_previews()
 
     print("\nWorkflow Complete!")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest media files into the video library.")
+    parser.add_argument("--resume", action="store_true", help="Continue unfinished files from the job journal")
+    parser.add_argument("--status", action="store_true", help="Summarize the ingestion backlog and exit")
+    parser.add_argument("--max-attempts", type=int, default=MAX_JOB_ATTEMPTS,
+                        help="Skip jobs that already failed this many times")
+    parser.add_argument("--profile", choices=profiler.PROFILE_MODES,
+                        help="Also profile Python code: 'sample' (low overhead) or 'cprofile' (exact, slower)")
+    parser.add_argument("--no-report", action="store_true", help="Don't write a run report to 'Run Reports'")
+    args = parser.parse_args()
+
     init_db()
-    process_workflow()
+    if args.status:
+        print_status(args.max_attempts)
+        raise SystemExit(0)
+
+    # Stage timings cost microseconds per file, so every run gets a report
+    try:
+        if args.resume:
+            resume_workflow(args.max_attempts, profile_mode=args.profile)
+        else:
+            process_workflow(profile_mode=args.profile)
+    finally:
+        # Also after a quota stop (sys.exit) or Ctrl+C: a cut-short run is worth a report too
+        run = profiler.finish()
+        if run and run.durations and not args.no_report:
+            profiler.write_report(run)
@@ -1,34 +1,253 @@
 import os
+import re
 import shutil
-import assemblyai as aai
-from moviepy import VideoFileClip
-from PIL import Image
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from pillow_heif import register_heif_opener
-import requests
 from dotenv import load_dotenv
+from preview_handler import find_ffmpeg
+import profiler
 
 # Load environment variables
 load_dotenv()
 
-# Register HEIF opener
-register_heif_opener()
-
 # API Keys from environment
 AAI_API_KEY = os.getenv("AAI_API_KEY")
 OCR_API_KEY = os.getenv("OCR_API_KEY")
 
-if AAI_API_KEY:
-    aai.settings.api_key = AAI_API_KEY
+# moviepy, Pillow (+ HEIF), AssemblyAI and requests take ~0.7s to import, so
+# they are loaded on first use; `main.py --help`/--status never need them.
+# aai/requests stay module attributes so the load test can swap in fakes.
+aai = None
+requests = None
+_heif_registered = False
+
+# Thumbnails live next to "All Files", named by record ID
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+THUMBS_DIR = os.path.join(SCRIPT_DIR, "Thumbnails")
+THUMB_SIZE = (320, 320)     # Gallery grid cards
+POSTER_SIZE = (720, 1280)   # Poster frame for the full-screen viewer
+THUMB_QUALITY = 70
+POSTER_QUALITY = 80
+
+# Long recordings are split at silences and the chunks transcribed in parallel
+LONG_AUDIO_SECONDS = 180      # Shorter media goes to AssemblyAI as one job
+TARGET_CHUNK_SECONDS = 120    # Preferred chunk length (speech time)
+MAX_CHUNK_SECONDS = 240       # Hard cut if nobody pauses for this long
+SILENCE_NOISE_DB = -35        # Below this level counts as silence
+MIN_SILENCE_SECONDS = 0.6     # Shorter pauses are neither trimmed nor split on
+KEEP_SILENCE_SECONDS = 0.25   # Padding left around speech when trimming
+TRANSCRIBE_WORKERS = 4
+
+def _assemblyai():
+    global aai
+    if aai is None:
+        import assemblyai
+        if AAI_API_KEY:
+            assemblyai.settings.api_key = AAI_API_KEY
+        aai = assemblyai
+    return aai
+
+def _requests():
+    global requests
+    if requests is None:
+        import requests as requests_module
+        requests = requests_module
+    return requests
+
+def _pil():
+    """
+    Returns (Image, ImageOps), with the HEIF opener registered on first use.
+    """
+    global _heif_registered
+    from PIL import Image, ImageOps
+    if not _heif_registered:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+        _heif_registered = True
+    return Image, ImageOps
+
+def _open_video(file_path):
+    from moviepy import VideoFileClip
+    return VideoFileClip(file_path)
+
+@profiler.timed("transcribe.probe")
+def media_duration(ffmpeg, file_path):
+    """
+    Reads the container duration (seconds) from ffmpeg's header probe. None if unknown.
+    """
+    result = subprocess.run([ffmpeg, "-hide_banner", "-i", file_path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr)
+    if not match:
+        return None
+    h, m, sec = match.groups()
+    return int(h) * 3600 + int(m) * 60 + float(sec)
+
+@profiler.timed("transcribe.vad", path_arg=1)
+def detect_speech(ffmpeg, file_path, duration):
+    """
+    Voice-activity detection with ffmpeg's silencedetect filter.
+    Returns [(start, end)] speech segments, padded by KEEP_SILENCE_SECONDS.
+    """
+    result = subprocess.run([
+        ffmpeg, "-hide_banner", "-nostats", "-i", file_path, "-vn",
+        "-af", f"silencedetect=noise={SILENCE_NOISE_DB}dB:d={MIN_SILENCE_SECONDS}",
+        "-f", "null", "-"
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError("silencedetect failed")
+
+    silences = []
+    start = None
+    for line in result.stderr.splitlines():
+        m = re.search(r"silence_start: (-?[\d.]+)", line)
+        if m:
+            start = max(0.0, float(m.group(1)))
+            continue
+        m = re.search(r"silence_end: ([\d.]+)", line)
+        if m and start is not None:
+            silences.append((start, float(m.group(1))))
+            start = None
+    if start is not None:
+        silences.append((start, duration))
+
+    segments = []
+    cursor = 0.0
+    for s_start, s_end in silences + [(duration, duration)]:
+        if s_start > cursor:
+            segments.append((max(0.0, cursor - KEEP_SILENCE_SECONDS),
+                             min(duration, s_start + KEEP_SILENCE_SECONDS)))
+        cursor = s_end
+    return segments
+
+def plan_chunks(segments):
+    """
+    Groups speech segments into chunks of about TARGET_CHUNK_SECONDS of speech,
+    only cutting at silences (or hard-cutting segments over MAX_CHUNK_SECONDS).
+    Returns [[(start, end), ...], ...] in timeline order.
+    """
+    pieces = []
+    for start, end in segments:
+        while end - start > MAX_CHUNK_SECONDS:
+            pieces.append((start, start + MAX_CHUNK_SECONDS))
+            start += MAX_CHUNK_SECONDS
+        pieces.append((start, end))
+
+    chunks = []
+    current = []
+    speech = 0.0
+    for start, end in pieces:
+        if current and speech + (end - start) > TARGET_CHUNK_SECONDS:
+            chunks.append(current)
+            current = []
+            speech = 0.0
+        current.append((start, end))
+        speech += end - start
+    if current:
+        chunks.append(current)
+    return chunks
+
+def export_chunk(ffmpeg, file_path, segments, out_path):
+    """
+    Writes only the given speech segments of file_path (silences trimmed) as
+    a small mono MP3, ready for upload.
+    """
+    offset = segments[0][0]
+    # Input seeking (-ss before -i) restarts timestamps at 0, so segments are made relative
+    keep = "+".join(f"between(t,{start - offset:.3f},{end - offset:.3f})" for start, end in segments)
+    subprocess.run([
+        ffmpeg, "-y", "-loglevel", "error",
+        "-ss", f"{offset:.3f}", "-t", f"{segments[-1][1] - offset:.3f}", "-i", file_path, "-vn",
+        "-af", f"aselect='{keep}',asetpts=N/SR/TB",
+        "-ac", "1", "-ar", "16000", "-b:a", "48k", out_path
+    ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+@profiler.timed("transcribe.api", service="assemblyai", path_arg=0)
+def transcribe_chunk(path):
+    """
+    One AssemblyAI job. Returns the text ("" if silent); raises on API errors.
+    """
+    aai = _assemblyai()
+    config = aai.TranscriptionConfig(speech_model='nano', language_code='en')
+    transcript = aai.Transcriber(config=config).transcribe(path)
+    if transcript.status == aai.TranscriptStatus.error:
+        raise RuntimeError(transcript.error)
+    return transcript.text or ""
+
+def transcribe_long_audio(file_path, ffmpeg, duration):
+    """
+    VAD + chunked parallel transcription for long media.
+    Long silences are trimmed, the audio is split at silence boundaries, the
+    chunks are transcribed concurrently and stitched back in timeline order.
+    Returns the transcript, "" if there is no speech, or None on failure
+    (the caller then falls back to a single job).
+    """
+    try:
+        segments = detect_speech(ffmpeg, file_path, duration)
+    except Exception as e:
+        print(f"   [Error] Voice activity detection failed: {e}")
+        return None
+    if not segments:
+        print("   Note: No speech detected, skipping transcription.")
+        return ""
+
+    chunks = plan_chunks(segments)
+    speech = sum(end - start for start, end in segments)
+    print(f"   Note: {duration / 60:.1f} min of media, {speech / 60:.1f} min of speech -> {len(chunks)} chunks")
 
+    work_dir = tempfile.mkdtemp(prefix="chunks_")
+    try:
+        paths = []
+        for i, chunk in enumerate(chunks):
+            out_path = os.path.join(work_dir, f"chunk_{i:03d}.mp3")
+            with profiler.stage("transcribe.export") as timing:
+                export_chunk(ffmpeg, file_path, chunk, out_path)
+                timing.nbytes = os.path.getsize(out_path)
+            paths.append(out_path)
+
+        uid = profiler.current_item()
+
+        def run(path):
+            # One retry per chunk before giving up on the chunked route
+            with profiler.item(uid):
+                try:
+                    return transcribe_chunk(path)
+                except Exception:
+                    return transcribe_chunk(path)
+
+        with ThreadPoolExecutor(max_workers=min(TRANSCRIBE_WORKERS, len(paths))) as pool:
+            texts = list(pool.map(run, paths))
+
+        # Chunk offsets are kept for ordering; texts are stitched in timeline order
+        ordered = sorted(zip((chunk[0][0] for chunk in chunks), texts))
+        return " ".join(text.strip() for _, text in ordered if text and text.strip())
+    except Exception as e:
+        print(f"   [Error] Chunked transcription failed: {e}")
+        return None
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+@profiler.timed("transcribe", path_arg=0)
 def transcribe_audio(file_path):
     """
     Handles Audio/Video transcription.
+    0. Long media (>= LONG_AUDIO_SECONDS): silence-trimmed chunks transcribed in parallel.
     1. If MP4, convert to temporary MP3.
     2. Transcribe using AssemblyAI (Nano model).
     3. Return text.
     """
-    temp_audio_path = "temp_converted_audio.mp3"
+    ffmpeg = find_ffmpeg()
+    if ffmpeg:
+        duration = media_duration(ffmpeg, file_path)
+        if duration and duration >= LONG_AUDIO_SECONDS:
+            text = transcribe_long_audio(file_path, ffmpeg, duration)
+            if text is not None:
+                return text or "[No audio text found]"
+            print("   Note: Falling back to a single transcription job...")
+
+    temp_audio_path = None
     target_path = file_path
     video_exts = {'.mp4', '.mov', '.avi', '.mkv', '.webm'}
     is_video = any(file_path.lower().endswith(ext) for ext in video_exts)
@@ -39,20 +258,24 @@ def transcribe_audio(file_path):
         if is_video:
             print(f"   Note: Converting video to audio...")
             try:
-                # Use a random temp name to avoid collisions in threading (though we are single threaded mostly)
-                # But kept simple as per original
-                video = VideoFileClip(file_path)
-                video.audio.write_audiofile(temp_audio_path, logger=None)
-                video.close()
+                # Unique name: stream_ingest.py transcribes several files at once
+                fd, temp_audio_path = tempfile.mkstemp(prefix="temp_converted_", suffix=".mp3")
+                os.close(fd)
+                with profiler.stage("transcribe.convert", nbytes=os.path.getsize(file_path)):
+                    video = _open_video(file_path)
+                    video.audio.write_audiofile(temp_audio_path, logger=None)
+                    video.close()
                 target_path = temp_audio_path
             except Exception as e:
                 print(f"   [Error] Video conversion failed: {e}")
                 return None
 
         # Transcribe
+        aai = _assemblyai()
         config = aai.TranscriptionConfig(speech_model='nano', language_code='en')
         transcriber = aai.Transcriber(config=config)
-        transcript = transcriber.transcribe(target_path)
+        with profiler.stage("transcribe.api", nbytes=os.path.getsize(target_path), service="assemblyai"):
+            transcript = transcriber.transcribe(target_path)
 
         if transcript.status == aai.TranscriptStatus.error:
             print(f"   [Error] Transcription API: {transcript.error}")
@@ -63,7 +286,7 @@ def transcribe_audio(file_path):
         print(f"   [Error] Transcription exception: {e}")
     finally:
         # Cleanup temp file
-        if is_video and os.path.exists(temp_audio_path):
+        if temp_audio_path and os.path.exists(temp_audio_path):
             try:
                 os.remove(temp_audio_path)
             except OSError:
@@ -71,6 +294,7 @@ def transcribe_audio(file_path):
 
     return transcript_text or "[No audio text found]"
 
+@profiler.timed("ocr", path_arg=0)
 def process_image(file_path):
     """
     Handles Image OCR.
@@ -86,37 +310,40 @@ def process_image(file_path):
         return size
 
     try:
-        img = Image.open(file_path)
-        # Convert to RGB
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Save to buffer
-        buffer = BytesIO()
-        img.save(buffer, format='JPEG', quality=95, optimize=True)
-        buffer.seek(0)
-
-        # Compress if needed
-        size_kb = get_file_size_kb(buffer)
-        if size_kb > 1024:
-            print(f"   Note: Compressing image ({size_kb:.1f} KB)...")
-            quality = 90
-            while size_kb > 1024 and quality > 10:
-                buffer = BytesIO()
-                img.save(buffer, format='JPEG', quality=quality, optimize=True)
-                size_kb = get_file_size_kb(buffer)
-                quality -= 10
-        
-        buffer.seek(0)
+        with profiler.stage("ocr.compress", nbytes=os.path.getsize(file_path)):
+            Image, _ = _pil()
+            img = Image.open(file_path)
+            # Convert to RGB
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+
+            # Save to buffer
+            buffer = BytesIO()
+            img.save(buffer, format='JPEG', quality=95, optimize=True)
+            buffer.seek(0)
+
+            # Compress if needed
+            size_kb = get_file_size_kb(buffer)
+            if size_kb > 1024:
+                print(f"   Note: Compressing image ({size_kb:.1f} KB)...")
+                quality = 90
+                while size_kb > 1024 and quality > 10:
+                    buffer = BytesIO()
+                    img.save(buffer, format='JPEG', quality=quality, optimize=True)
+                    size_kb = get_file_size_kb(buffer)
+                    quality -= 10
+
+            buffer.seek(0)
         
         # API Request
         payload = {'apikey': OCR_API_KEY, 'language': 'eng'}
-        response = requests.post(
-            'https://api.ocr.space/parse/image',
-            files={'image.jpg': buffer},
-            data=payload,
-        )
-        result = response.json()
+        with profiler.stage("ocr.api", nbytes=int(size_kb * 1024), service="ocr"):
+            response = _requests().post(
+                'https://api.ocr.space/parse/image',
+                files={'image.jpg': buffer},
+                data=payload,
+            )
+            result = response.json()
         
         if result.get('OCRExitCode') == 1:
             return result['ParsedResults'][0]['ParsedText']
@@ -127,3 +354,50 @@ def process_image(file_path):
     except Exception as e:
         print(f"   [Error] Image processing exception: {e}")
         return None
+
+def thumbnail_paths(uid):
+    """
+    Returns (thumb_path, poster_path) for a record ID.
+    """
+    return (os.path.join(THUMBS_DIR, f"{uid}.webp"),
+            os.path.join(THUMBS_DIR, f"{uid}_poster.webp"))
+
+@profiler.timed("thumbnails", path_arg=1)
+def create_thumbnails(uid, file_path, file_type):
+    """
+    Writes a small WebP thumbnail and a larger WebP poster frame for an image or video.
+    Videos use a frame ~1s in (or the midpoint of very short clips).
+    Returns True if both files exist afterwards.
+    """
+    thumb_path, poster_path = thumbnail_paths(uid)
+    if os.path.exists(thumb_path) and os.path.exists(poster_path):
+        return True
+    if file_type not in ("Image", "Video"):
+        return False
+
+    try:
+        Image, ImageOps = _pil()
+        if file_type == "Image":
+            img = ImageOps.exif_transpose(Image.open(file_path))
+        else:
+            video = _open_video(file_path)
+            try:
+                t = min(1.0, (video.duration or 0) / 2)
+                img = Image.fromarray(video.get_frame(t))
+            finally:
+                video.close()
+
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        os.makedirs(THUMBS_DIR, exist_ok=True)
+        poster = img.copy()
+        poster.thumbnail(POSTER_SIZE)
+        poster.save(poster_path, format='WEBP', quality=POSTER_QUALITY, method=4)
+
+        img.thumbnail(THUMB_SIZE)
+        img.save(thumb_path, format='WEBP', quality=THUMB_QUALITY, method=4)
+        return True
+    except Exception as e:
+        print(f"   [Error] Thumbnail generation failed: {e}")
+        return False
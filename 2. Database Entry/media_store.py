@@ -0,0 +1,290 @@
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+
+# Content-addressed media store. Every ingested file is kept once as
+#   Store/<first 2 hex>/<sha256><ext>
+# and the human-readable "All Files/<Platform>/<type>/<id>_<name>" path is a
+# hardlink (or symlink) to that blob. Identical files share one blob.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = os.path.join(SCRIPT_DIR, "video_agent.db")
+STORE_DIR = os.path.join(SCRIPT_DIR, "Store")
+ALL_FILES_DIR = os.path.join(SCRIPT_DIR, "All Files")
+
+HASH_BUFFER_BYTES = 1024 * 1024
+# Blobs newer than this are never collected (an ingestion may be mid-flight)
+GC_GRACE_HOURS = 24
+# Hardlinking the source into the store avoids any copy, but the blob then
+# shares the source's inode: editing the source in place would silently
+# change the blob's content. Off by default; reflink or copy keeps them apart.
+LINK_SOURCE_FILES = False
+
+FICLONE = 0x40049409  # Linux ioctl for reflinks (btrfs, XFS, ...)
+
+
+def file_digest(path):
+    """
+    Full SHA-256 of a file, streamed.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_BUFFER_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def blob_path(digest, ext=""):
+    return os.path.join(STORE_DIR, digest[:2], digest + ext.lower())
+
+
+def _reflink(src, dst):
+    """
+    Copy-on-write clone of src at dst. Returns False if the filesystem can't.
+    """
+    if sys.platform == "darwin":
+        # APFS clonefile via cp -c
+        result = subprocess.run(["cp", "-c", src, dst], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return result.returncode == 0
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+def _place_blob(source_path, blob):
+    """
+    Puts source_path's bytes at `blob`: reflink, then hardlink, then copy.
+    Returns the method used.
+    """
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    tmp = f"{blob}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    method = None
+    if _reflink(source_path, tmp):
+        method = "reflink"
+    elif LINK_SOURCE_FILES:
+        try:
+            os.link(source_path, tmp)
+            method = "hardlink"
+        except OSError:
+            pass
+    if not method:
+        shutil.copy2(source_path, tmp)
+        method = "copy"
+    if method != "hardlink":
+        # Clones and copies keep the source's mtime; the GC grace period counts
+        # from placement. (A hardlink shares the source's inode, so it is left
+        # alone; linking already bumped its ctime, which the GC also checks.)
+        os.utime(tmp)
+
+    os.replace(tmp, blob)
+    return method
+
+
+def _link_name(blob, dest_path):
+    """
+    Makes dest_path point at blob: hardlink, then relative symlink, then copy.
+    """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp = f"{dest_path}.{os.getpid()}.tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(blob, tmp)
+    except OSError:
+        try:
+            os.symlink(os.path.relpath(blob, os.path.dirname(dest_path)), tmp)
+        except OSError:
+            shutil.copy2(blob, tmp)
+    os.replace(tmp, dest_path)
+
+
+def _same_file(a, b):
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def adopt_file(path):
+    """
+    Moves an existing library file into the store (if it isn't already) and
+    leaves `path` as a link to its blob. Duplicates collapse onto one blob.
+    Returns the digest.
+    """
+    digest = file_digest(path)
+    blob = blob_path(digest, os.path.splitext(path)[1])
+    if not os.path.exists(blob):
+        _place_blob(path, blob)
+    if not _same_file(path, blob):
+        _link_name(blob, path)
+    return digest
+
+
+def store_file(source_path, dest_path):
+    """
+    Stores source_path in the content-addressed store and makes dest_path
+    (the human-readable library path) a link to the blob.
+    If dest_path already exists it is adopted instead.
+    Returns the blob digest.
+    """
+    if os.path.lexists(dest_path) and os.path.exists(dest_path):
+        return adopt_file(dest_path)
+
+    digest = file_digest(source_path)
+    blob = blob_path(digest, os.path.splitext(source_path)[1])
+    if not os.path.exists(blob):
+        _place_blob(source_path, blob)
+    _link_name(blob, dest_path)
+    return digest
+
+
+def _iter_blobs():
+    if not os.path.isdir(STORE_DIR):
+        return
+    for shard in os.scandir(STORE_DIR):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                yield entry
+
+
+def _referenced():
+    """
+    Returns (digests, paths) referenced by videos rows.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT blob_hash, file_path FROM videos")
+    rows = c.fetchall()
+    conn.close()
+    return {r[0] for r in rows if r[0]}, {r[1] for r in rows if r[1]}
+
+
+def collect_garbage(dry_run=False, grace_hours=GC_GRACE_HOURS):
+    """
+    Deletes blobs that no videos row references, plus the orphaned library
+    links that still point at them (a hardlinked blob only frees space once
+    every link is gone). Blobs younger than `grace_hours` are kept.
+    """
+    if not os.path.exists(DB_NAME):
+        print("Database not found. Nothing to do.")
+        return
+
+    digests, paths = _referenced()
+    cutoff = time.time() - grace_hours * 3600
+
+    # Library files by inode, to find the links of an orphaned blob
+    links_by_inode = {}
+    for root, _, files in os.walk(ALL_FILES_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            links_by_inode.setdefault((st.st_dev, st.st_ino), []).append(path)
+
+    removed = freed = kept_young = 0
+    for entry in _iter_blobs():
+        digest = os.path.splitext(entry.name)[0]
+        if digest in digests:
+            continue
+        st = entry.stat()
+        if max(st.st_mtime, st.st_ctime) > cutoff:
+            kept_young += 1
+            continue
+
+        links = links_by_inode.get((st.st_dev, st.st_ino), [])
+        if any(p in paths for p in links):
+            # A row still points at this content under a path (blob_hash not backfilled yet)
+            continue
+
+        print(f"   🗑️ {'Would remove' if dry_run else 'Removing'} {entry.name} ({st.st_size // 1024} KB, {len(links)} links)")
+        if not dry_run:
+            for link in links:
+                os.remove(link)
+            os.remove(entry.path)
+        removed += 1
+        freed += st.st_size
+
+    print(f"\nBlobs {'to remove' if dry_run else 'removed'}: {removed} | Freed: {freed / (1024 * 1024):.1f} MB"
+          f" | Kept (younger than {grace_hours}h): {kept_young}")
+
+
+def migrate_library():
+    """
+    Moves existing "All Files" media into the store and records blob_hash on
+    each row. Files with identical content end up sharing one blob.
+    """
+    if not os.path.exists(DB_NAME):
+        print("Database not found. Nothing to do.")
+        return
+
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT id, file_path FROM videos WHERE blob_hash IS NULL OR blob_hash = ''")
+    rows = c.fetchall()
+
+    done = missing = failed = 0
+    for uid, file_path in rows:
+        if not file_path or not os.path.exists(file_path):
+            missing += 1
+            continue
+        try:
+            digest = adopt_file(file_path)
+        except OSError as e:
+            print(f"   [Error] Could not store {file_path}: {e}")
+            failed += 1
+            continue
+        c.execute("UPDATE videos SET blob_hash = ? WHERE id = ?", (digest, uid))
+        done += 1
+        if done % 100 == 0:
+            conn.commit()
+            print(f"   Stored {done}/{len(rows)}...")
+    conn.commit()
+    conn.close()
+    print(f"\nDone. Stored: {done} | Missing files: {missing} | Failed: {failed}")
+
+
+def print_stats():
+    blobs = list(_iter_blobs())
+    size = sum(e.stat().st_size for e in blobs)
+    print(f"Store: {len(blobs)} blobs, {size / (1024 * 1024):.1f} MB in {STORE_DIR}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-addressed media store maintenance.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gc_parser = sub.add_parser("gc", help="Remove blobs no database row references")
+    gc_parser.add_argument("--dry-run", action="store_true")
+    gc_parser.add_argument("--grace-hours", type=float, default=GC_GRACE_HOURS)
+    sub.add_parser("migrate", help="Move existing All Files media into the store")
+    sub.add_parser("stats", help="Show store size")
+    args = parser.parse_args()
+
+    if args.command in ("gc", "migrate"):
+        from data_handler import init_db
+        init_db()  # Adds the blob_hash column if missing
+    if args.command == "gc":
+        collect_garbage(dry_run=args.dry_run, grace_hours=args.grace_hours)
+    elif args.command == "migrate":
+        migrate_library()
+    else:
+        print_stats()
@@ -0,0 +1,255 @@
+import argparse
+import importlib.util
+import os
+import re
+import sqlite3
+import time
+
+# Schema migrations for video_agent.db, keyed on PRAGMA user_version.
+# Each migrations/NNNN_name.py defines upgrade(m) using the Migrator below;
+# the database's user_version is the last migration applied.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = os.path.join(SCRIPT_DIR, "video_agent.db")
+MIGRATIONS_DIR = os.path.join(SCRIPT_DIR, "migrations")
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+# Large copies run in short transactions so the web app's readers keep going
+CHUNK_ROWS = 2000
+CHUNK_PAUSE_SECONDS = 0.05
+BUSY_TIMEOUT_SECONDS = 30
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        self._module = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            spec = importlib.util.spec_from_file_location(f"migrations.m{self.version:04d}_{self.name}", self.path)
+            self._module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._module)
+        return self._module
+
+    @property
+    def description(self):
+        doc = (self.module.__doc__ or "").strip()
+        return doc.splitlines()[0] if doc else self.name
+
+
+def load_migrations():
+    """
+    Returns the migrations in migrations/, ordered by version.
+    """
+    found = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            found.append(Migration(int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    versions = [m.version for m in found]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return found
+
+
+class Migrator:
+    """
+    Schema operations available to a migration's upgrade(m).
+    Every operation must be safe to repeat: a migration interrupted halfway
+    is simply run again, and chunked copies pick up where they stopped.
+    In dry-run mode nothing is applied; operations only add to the estimate.
+    """
+
+    def __init__(self, conn, dry_run=False, chunk_rows=CHUNK_ROWS, pause=CHUNK_PAUSE_SECONDS):
+        self.conn = conn
+        self.dry_run = dry_run
+        self.chunk_rows = chunk_rows
+        self.pause = pause
+        self.estimate_seconds = 0.0
+        self.planned = []
+
+    # --- Inspection ---
+
+    def table_exists(self, table):
+        row = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        return row is not None
+
+    def columns(self, table):
+        return [r[1] for r in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def count(self, table, where="1", params=()):
+        if not self.table_exists(table):
+            return 0
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+
+    # --- Small changes (one statement each) ---
+
+    def execute(self, sql, params=()):
+        if self.dry_run:
+            self.planned.append(" ".join(sql.split())[:90])
+            return
+        self.conn.execute(sql, params)
+
+    def add_column(self, table, column, decl):
+        if column not in self.columns(table):
+            self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    # --- Chunked changes ---
+
+    def _time_sample(self, statements):
+        """
+        Runs statements [(sql, params)] in a transaction that is rolled back.
+        Returns (seconds, rows affected by the last statement).
+        """
+        start = time.perf_counter()
+        self.conn.execute("BEGIN")
+        try:
+            cur = None
+            for sql, params in statements:
+                cur = self.conn.execute(sql, params)
+            return time.perf_counter() - start, max(cur.rowcount, 0) if cur else 0
+        finally:
+            self.conn.execute("ROLLBACK")
+
+    def _estimate(self, label, total, statements):
+        seconds, sampled = self._time_sample(statements)
+        per_row = seconds / sampled if sampled else 0.0
+        chunks = -(-total // self.chunk_rows)
+        estimate = per_row * total + chunks * self.pause
+        self.estimate_seconds += estimate
+        self.planned.append(f"{label}: {total:,} rows in {chunks} chunks (~{estimate:.1f}s)")
+
+    def rebuild_table(self, table, create_sql, columns, indexes=()):
+        """
+        Recreates `table` from create_sql ("CREATE TABLE {table} (...)"),
+        copying `columns` across in rowid order, CHUNK_ROWS per transaction.
+        The half-built copy is the checkpoint, so an interrupted rebuild
+        resumes from its last row. Old and new are swapped in one short final
+        transaction, which also picks up rows inserted meanwhile; run it while
+        ingestion is stopped so copied rows are not edited behind its back.
+        """
+        tmp = f"{table}_rebuild"
+        cols = ", ".join(columns)
+        copy_sql = (f"INSERT INTO {{dest}} (rowid, {cols}) SELECT rowid, {cols} FROM {table} "
+                    f"WHERE rowid > ? ORDER BY rowid LIMIT ?")
+        total = self.count(table)
+
+        if self.dry_run:
+            sample = f"{table}_estimate"
+            self._estimate(f"rebuild {table}", total, [
+                (create_sql.format(table=sample), ()),
+                (copy_sql.format(dest=sample), (0, self.chunk_rows)),
+            ])
+            return
+
+        if not self.table_exists(tmp):
+            self.conn.execute(create_sql.format(table=tmp))
+        last = self.conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {tmp}").fetchone()[0]
+        done = self.count(tmp)
+        if done:
+            print(f"      Resuming rebuild of {table} at {done:,}/{total:,} rows")
+
+        while True:
+            self.conn.execute("BEGIN")
+            copied = self.conn.execute(copy_sql.format(dest=tmp), (last, self.chunk_rows)).rowcount
+            if copied:
+                last = self.conn.execute(f"SELECT MAX(rowid) FROM {tmp}").fetchone()[0]
+            self.conn.execute("COMMIT")
+            done += copied
+            if copied < self.chunk_rows:
+                break
+            print(f"      Copied {done:,}/{total:,} rows...")
+            time.sleep(self.pause)
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(copy_sql.format(dest=tmp), (last, -1))
+            self.conn.execute(f"DROP TABLE {table}")
+            self.conn.execute(f"ALTER TABLE {tmp} RENAME TO {table}")
+            for index_sql in indexes:
+                self.conn.execute(index_sql)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+
+def connect(db_path):
+    # Autocommit: the Migrator opens its own (short) transactions
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def upgrade(db_path=DB_NAME, target=None, dry_run=False, chunk_rows=CHUNK_ROWS, pause=CHUNK_PAUSE_SECONDS):
+    """
+    Applies (or, with dry_run, estimates) the migrations newer than the
+    database's user_version, up to `target`. Returns the resulting version.
+    """
+    conn = connect(db_path)
+    try:
+        current = get_version(conn)
+        pending = [m for m in load_migrations() if m.version > current and (target is None or m.version <= target)]
+        if not pending:
+            return current
+
+        total_estimate = 0.0
+        for migration in pending:
+            m = Migrator(conn, dry_run=dry_run, chunk_rows=chunk_rows, pause=pause)
+            label = f"{migration.version:04d} {migration.description}"
+            if dry_run:
+                migration.module.upgrade(m)
+                total_estimate += m.estimate_seconds
+                print(f"   📝 {label}")
+                for step in m.planned:
+                    print(f"      - {step}")
+                continue
+
+            print(f"   🛠️ Migrating {label}")
+            start = time.perf_counter()
+            migration.module.upgrade(m)
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+            print(f"      Done in {time.perf_counter() - start:.1f}s")
+
+        if dry_run:
+            print(f"\nPending: {len(pending)} | Estimated time: {total_estimate:.1f}s"
+                  " (later steps are estimated against the current schema)")
+            return current
+        return get_version(conn)
+    finally:
+        conn.close()
+
+
+def print_status(db_path=DB_NAME):
+    conn = connect(db_path)
+    current = get_version(conn)
+    conn.close()
+    migrations = load_migrations()
+    print(f"Schema version: {current} (latest: {migrations[-1].version if migrations else 0})")
+    for migration in migrations:
+        mark = "✅" if migration.version <= current else "⏳"
+        print(f"   {mark} {migration.version:04d} {migration.description}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations to video_agent.db.")
+    parser.add_argument("--dry-run", action="store_true", help="List pending steps and estimate their time")
+    parser.add_argument("--status", action="store_true", help="Show applied and pending migrations")
+    parser.add_argument("--target", type=int, help="Stop after this version")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--db", default=DB_NAME)
+    args = parser.parse_args()
+
+    if args.status:
+        print_status(args.db)
+    else:
+        version = upgrade(args.db, target=args.target, dry_run=args.dry_run, chunk_rows=args.chunk_rows)
+        if not args.dry_run:
+            print(f"Schema version: {version}")
@@ -0,0 +1,20 @@
+"""Create the videos table."""
+
+
+def upgrade(m):
+    m.execute("""CREATE TABLE IF NOT EXISTS videos (
+        id TEXT PRIMARY KEY,
+        title TEXT,
+        summary TEXT,
+        category TEXT,
+        tags TEXT,
+        types TEXT,
+        refined_text TEXT,
+        raw_text TEXT,
+        platform TEXT,
+        file_type TEXT,
+        file_path TEXT,
+        original_filename TEXT
+    )""")
+    # Early databases predate original_filename
+    m.add_column("videos", "original_filename", "TEXT")
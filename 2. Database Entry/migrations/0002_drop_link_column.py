@@ -0,0 +1,13 @@
+"""Rebuild videos without the legacy link column."""
+
+
+def upgrade(m):
+    if "link" not in m.columns("videos"):
+        return
+
+    info = m.conn.execute("PRAGMA table_info(videos)").fetchall()
+    # (cid, name, type, notnull, default, pk); keep every column but link as declared
+    kept = [row for row in info if row[1] != "link"]
+    definitions = [f"{name} {decl}{' PRIMARY KEY' if pk else ''}" for _, name, decl, _, _, pk in kept]
+    create_sql = "CREATE TABLE {table} (" + ", ".join(definitions) + ")"
+    m.rebuild_table("videos", create_sql, [row[1] for row in kept])
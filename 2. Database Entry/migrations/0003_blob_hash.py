@@ -0,0 +1,6 @@
+"""Add videos.blob_hash (SHA-256 of the media in the content-addressed store)."""
+
+
+def upgrade(m):
+    # Filled by ingestion and by `python media_store.py migrate` for older rows
+    m.add_column("videos", "blob_hash", "TEXT")
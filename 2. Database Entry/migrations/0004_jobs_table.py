@@ -0,0 +1,21 @@
+"""Create the ingestion jobs journal."""
+
+
+def upgrade(m):
+    # One row per source file and the last stage it completed
+    m.execute("""CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        source_path TEXT,
+        dest_path TEXT,
+        original_filename TEXT,
+        platform TEXT,
+        file_type TEXT,
+        stage TEXT,
+        attempts INTEGER DEFAULT 0,
+        last_error TEXT,
+        result TEXT,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP
+    )""")
+    m.execute("CREATE INDEX IF NOT EXISTS idx_jobs_source_path ON jobs(source_path)")
+    m.execute("CREATE INDEX IF NOT EXISTS idx_jobs_stage ON jobs(stage)")
@@ -0,0 +1,13 @@
+"""Create the scan manifest used to skip unchanged source files."""
+
+
+def upgrade(m):
+    m.execute("""CREATE TABLE IF NOT EXISTS scan_manifest (
+        path TEXT PRIMARY KEY,
+        size INTEGER,
+        mtime_ns INTEGER,
+        content_hash TEXT,
+        id TEXT,
+        updated_at TIMESTAMP
+    )""")
+    m.execute("CREATE INDEX IF NOT EXISTS idx_scan_manifest_hash ON scan_manifest(content_hash)")
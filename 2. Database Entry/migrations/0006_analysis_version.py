@@ -0,0 +1,7 @@
+"""Record which analysis prompt/vocabulary version produced each row."""
+
+
+def upgrade(m):
+    # Rows analyzed before this have NULL and count as stale for reanalyze.py
+    m.add_column("videos", "analysis_version", "TEXT")
+    m.add_column("videos", "analyzed_at", "TIMESTAMP")
@@ -0,0 +1,9 @@
+"""Add where a downloaded video came from (URL, author, platform video ID)."""
+
+
+def upgrade(m):
+    # Filled by stream_ingest.py; NULL for files ingested from a folder
+    m.add_column("videos", "source_url", "TEXT")
+    m.add_column("videos", "source_author", "TEXT")
+    m.add_column("videos", "source_video_id", "TEXT")
+    m.execute("CREATE INDEX IF NOT EXISTS idx_videos_source_video_id ON videos(source_video_id)")
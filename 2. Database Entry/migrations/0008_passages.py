@@ -0,0 +1,27 @@
+"""Add the refined_text passage index (passages + passages_fts).
+
+Schema only: the rows are split by data_handler.init_db() (or
+passage_index.py), so this file never depends on the current splitter.
+"""
+
+
+def upgrade(m):
+    # Passages of each row's refined_text; see passage_index.py
+    m.execute("""CREATE TABLE IF NOT EXISTS passages (
+        id INTEGER PRIMARY KEY,
+        video_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        tokens INTEGER NOT NULL
+    )""")
+    m.execute("CREATE INDEX IF NOT EXISTS idx_passages_video_id ON passages(video_id, seq)")
+    # External-content FTS5 index; the triggers keep it in step with passages
+    m.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+        text, content='passages', content_rowid='id', tokenize='porter unicode61')""")
+    m.execute("""CREATE TRIGGER IF NOT EXISTS passages_ai AFTER INSERT ON passages BEGIN
+        INSERT INTO passages_fts(rowid, text) VALUES (new.id, new.text);
+    END""")
+    m.execute("""CREATE TRIGGER IF NOT EXISTS passages_ad AFTER DELETE ON passages BEGIN
+        INSERT INTO passages_fts(passages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""")
+
@@ -0,0 +1,9 @@
+"""
+Ordered schema migrations for video_agent.db, applied by migrate.py.
+
+Each NNNN_name.py has a one-line docstring (shown in --status and --dry-run)
+and an upgrade(m) function that changes the schema through the Migrator.
+Migrations never change once released; a schema change is a new file with
+the next number. Each must be safe to re-run, because databases created
+before the runner existed start at version 0 with most tables present.
+"""
@@ -0,0 +1,132 @@
+import argparse
+import re
+import sqlite3
+import time
+
+from prompt_registry import estimate_tokens
+
+# Passage index over refined_text: each transcript is split into passages of
+# about PASSAGE_TOKENS on sentence boundaries and stored in `passages`, with
+# the passages_fts full-text index kept in sync by triggers (migration 0008).
+# The chat app scores passages against the question and sends the best ones
+# instead of whole transcripts. Rows are re-indexed whenever refined_text is
+# written (insert_record, update_analysis, library_io import); rows without
+# passages yet are indexed by data_handler.init_db().
+PASSAGE_TOKENS = 120
+MAX_PASSAGE_TOKENS = 200  # A single longer sentence is cut at word boundaries
+CHUNK_ROWS = 500
+CHUNK_PAUSE_SECONDS = 0.05
+
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def _wrap(sentence, max_chars):
+    """
+    Cuts an over-long sentence into pieces of at most max_chars at word boundaries.
+    """
+    pieces, current = [], ""
+    for word in sentence.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_passages(text, target_tokens=PASSAGE_TOKENS, max_tokens=MAX_PASSAGE_TOKENS):
+    """
+    Returns the passages of `text` in order. Sentences are packed greedily up
+    to target_tokens; a passage only exceeds it when a sentence does (and
+    never exceeds max_tokens).
+    """
+    if not text or not text.strip():
+        return []
+    max_chars = max_tokens * 4
+    sentences = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        sentences.extend(_wrap(sentence, max_chars) if len(sentence) > max_chars else [sentence])
+
+    passages, current = [], ""
+    for sentence in sentences:
+        candidate = f"{current} {sentence}" if current else sentence
+        if current and estimate_tokens(candidate) > target_tokens:
+            passages.append(current)
+            current = sentence
+        else:
+            current = candidate
+    if current:
+        passages.append(current)
+    return passages
+
+
+def index_passages(conn, uid, text):
+    """
+    Replaces the passages of one video (inside the caller's transaction).
+    Returns the number of passages written.
+    """
+    conn.execute("DELETE FROM passages WHERE video_id = ?", (uid,))
+    passages = split_passages(text)
+    conn.executemany("INSERT INTO passages (video_id, seq, text, tokens) VALUES (?, ?, ?, ?)",
+                     [(uid, seq, p, estimate_tokens(p)) for seq, p in enumerate(passages)])
+    return len(passages)
+
+
+def index_missing(conn, chunk_rows=CHUNK_ROWS, pause=CHUNK_PAUSE_SECONDS):
+    """
+    Indexes every row with refined_text but no passages yet, chunk_rows per
+    transaction. `conn` must be in autocommit mode (isolation_level=None).
+    Safe to interrupt: the next run continues with the rows still missing.
+    Returns the number of rows indexed.
+    """
+    missing_sql = """SELECT rowid, id, refined_text FROM videos
+                     WHERE rowid > ? AND refined_text IS NOT NULL AND refined_text != ''
+                       AND NOT EXISTS (SELECT 1 FROM passages WHERE video_id = videos.id)
+                     ORDER BY rowid LIMIT ?"""
+    last = done = 0
+    while True:
+        conn.execute("BEGIN")
+        rows = conn.execute(missing_sql, (last, chunk_rows)).fetchall()
+        for rowid, uid, text in rows:
+            index_passages(conn, uid, text)
+            last = rowid
+        conn.execute("COMMIT")
+        done += len(rows)
+        if len(rows) < chunk_rows:
+            return done
+        print(f"      Indexed {done:,} rows...")
+        time.sleep(pause)
+
+
+def print_stats(conn):
+    videos, passages, tokens = conn.execute(
+        "SELECT COUNT(DISTINCT video_id), COUNT(*), COALESCE(SUM(tokens), 0) FROM passages").fetchone()
+    unindexed = conn.execute("""SELECT COUNT(*) FROM videos WHERE refined_text IS NOT NULL AND refined_text != ''
+                                AND NOT EXISTS (SELECT 1 FROM passages WHERE video_id = videos.id)""").fetchone()[0]
+    print(f"Videos indexed: {videos} | Passages: {passages} | Avg tokens/passage: {tokens / max(passages, 1):.0f}"
+          f" | Not indexed: {unindexed}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the refined_text passage index.")
+    parser.add_argument("--rebuild", action="store_true", help="Re-split every row (e.g. after changing PASSAGE_TOKENS)")
+    parser.add_argument("--stats", action="store_true", help="Show index size and exit")
+    args = parser.parse_args()
+
+    import data_handler
+    import migrate
+    migrate.upgrade(data_handler.DB_NAME)  # Creates the tables if missing
+    conn = sqlite3.connect(data_handler.DB_NAME, timeout=30, isolation_level=None)
+    if not args.stats:
+        start = time.perf_counter()
+        if args.rebuild:
+            conn.execute("DELETE FROM passages")
+        indexed = index_missing(conn)
+        print(f"✅ Indexed {indexed} rows in {time.perf_counter() - start:.1f}s")
+    print_stats(conn)
+    conn.close()
@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Web-optimized previews live next to "All Files", named by record ID:
+#   Previews/<id>.mp4            faststart H.264/AAC, capped resolution + bitrate
+#   Previews/<id>/index.m3u8     optional HLS segments cut from the preview
+#   Previews/manifest.json       {id: {"mp4": ..., "hls": ..., ...}} of finished renditions
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = os.path.join(SCRIPT_DIR, "video_agent.db")
+PREVIEWS_DIR = os.path.join(SCRIPT_DIR, "Previews")
+MANIFEST_PATH = os.path.join(PREVIEWS_DIR, "manifest.json")
+
+MAX_WIDTH = 720
+MAX_HEIGHT = 1280
+VIDEO_CRF = 26
+VIDEO_MAXRATE = "1500k"
+VIDEO_BUFSIZE = "3000k"
+AUDIO_BITRATE = "96k"
+HLS_SEGMENT_SECONDS = 4
+DEFAULT_WORKERS = 2
+FFMPEG_THREADS = 2  # Per job; keeps total CPU use ~ workers * FFMPEG_THREADS
+
+
+def find_ffmpeg():
+    """
+    Returns the ffmpeg executable: the one bundled with moviepy (imageio-ffmpeg)
+    if available, otherwise whatever is on PATH. None if neither exists.
+    """
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return shutil.which("ffmpeg")
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+class PreviewTranscoder:
+    """
+    Background job queue that transcodes source videos into web previews.
+    At most `max_workers` ffmpeg processes run at once; the manifest is
+    rewritten atomically after every finished job so readers never see a
+    partial file.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, hls=False):
+        self.max_workers = max_workers
+        self.hls = hls
+        self.ffmpeg = None
+        self._executor = None
+        self._futures = []
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._manifest = None
+
+    def _start(self):
+        if self._executor:
+            return True
+        self.ffmpeg = find_ffmpeg()
+        if not self.ffmpeg:
+            print("   Note: ffmpeg not found, skipping preview renditions.")
+            return False
+        os.makedirs(PREVIEWS_DIR, exist_ok=True)
+        self._manifest = load_manifest()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="preview")
+        return True
+
+    def has_preview(self, uid):
+        entry = (self._manifest or load_manifest()).get(uid)
+        return bool(entry and os.path.exists(os.path.join(PREVIEWS_DIR, entry["mp4"])))
+
+    def submit(self, uid, source_path):
+        """
+        Queues a transcode for `uid` unless a preview already exists or is queued.
+        Returns immediately.
+        """
+        if not source_path or not os.path.exists(source_path):
+            return
+        if not self._start():
+            return
+        with self._lock:
+            if uid in self._queued or self.has_preview(uid):
+                return
+            self._queued.add(uid)
+        self._futures.append(self._executor.submit(self._transcode, uid, source_path))
+
+    def wait(self):
+        """
+        Blocks until every queued job has finished. Returns (done, failed).
+        """
+        done = failed = 0
+        for future in self._futures:
+            if future.result():
+                done += 1
+            else:
+                failed += 1
+        self._futures = []
+        return done, failed
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run(self, args):
+        result = subprocess.run([self.ffmpeg, "-y", "-loglevel", "error"] + args,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "ffmpeg failed")
+
+    def _transcode(self, uid, source_path):
+        mp4_name = f"{uid}.mp4"
+        mp4_path = os.path.join(PREVIEWS_DIR, mp4_name)
+        tmp_path = os.path.join(PREVIEWS_DIR, f".{uid}.tmp.mp4")
+        scale = (f"scale=w='min({MAX_WIDTH},iw)':h='min({MAX_HEIGHT},ih)':force_original_aspect_ratio=decrease,"
+                 f"scale=trunc(iw/2)*2:trunc(ih/2)*2")
+        try:
+            self._run([
+                "-i", source_path,
+                "-map", "0:v:0", "-map", "0:a:0?",
+                "-vf", scale,
+                "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main", "-pix_fmt", "yuv420p",
+                "-crf", str(VIDEO_CRF), "-maxrate", VIDEO_MAXRATE, "-bufsize", VIDEO_BUFSIZE,
+                "-c:a", "aac", "-b:a", AUDIO_BITRATE,
+                "-movflags", "+faststart",
+                "-threads", str(FFMPEG_THREADS),
+                tmp_path
+            ])
+            os.replace(tmp_path, mp4_path)
+
+            entry = {
+                "mp4": mp4_name,
+                "bytes": os.path.getsize(mp4_path),
+                "source_bytes": os.path.getsize(source_path),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            }
+
+            if self.hls:
+                hls_dir = os.path.join(PREVIEWS_DIR, uid)
+                os.makedirs(hls_dir, exist_ok=True)
+                # Segments are cut from the preview without re-encoding
+                self._run([
+                    "-i", mp4_path, "-c", "copy",
+                    "-hls_time", str(HLS_SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+                    "-hls_segment_filename", os.path.join(hls_dir, "seg_%03d.ts"),
+                    os.path.join(hls_dir, "index.m3u8")
+                ])
+                entry["hls"] = f"{uid}/index.m3u8"
+
+            self._record(uid, entry)
+            print(f"   🎞️ Preview ready for {uid} ({entry['source_bytes'] // 1024} KB -> {entry['bytes'] // 1024} KB)")
+            return True
+        except Exception as e:
+            print(f"   [Error] Preview transcode failed for {uid}: {e}")
+            return False
+        finally:
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._queued.discard(uid)
+
+    def _record(self, uid, entry):
+        with self._lock:
+            self._manifest[uid] = entry
+            tmp_manifest = MANIFEST_PATH + ".tmp"
+            with open(tmp_manifest, 'w', encoding='utf-8') as f:
+                json.dump(self._manifest, f, indent=2)
+            os.replace(tmp_manifest, MANIFEST_PATH)
+
+
+def backfill_previews(max_workers=DEFAULT_WORKERS, hls=False):
+    """
+    Queues a preview for every video record that does not have one yet.
+    """
+    if not os.path.exists(DB_NAME):
+        print("Database not found. Nothing to do.")
+        return
+
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT id, file_path FROM videos WHERE file_type = 'Video'")
+    rows = c.fetchall()
+    conn.close()
+
+    transcoder = PreviewTranscoder(max_workers=max_workers, hls=hls)
+    for uid, file_path in rows:
+        transcoder.submit(uid, file_path)
+
+    done, failed = transcoder.wait()
+    transcoder.shutdown()
+    print(f"\nDone. Transcoded: {done} | Failed: {failed} | Videos in DB: {len(rows)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create web-optimized preview renditions for all videos.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parallel ffmpeg jobs")
+    parser.add_argument("--hls", action="store_true", help="Also cut segmented HLS renditions")
+    args = parser.parse_args()
+    backfill_previews(max_workers=args.workers, hls=args.hls)
@@ -0,0 +1,410 @@
+import cProfile
+import contextlib
+import functools
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+# Per-stage instrumentation for ingestion runs.
+# main.py, media_handler and data_handler wrap their work in stage("name")
+# blocks (or @timed functions). While a run is active each block adds its wall
+# time, bytes and API calls to the stage and to the item(s) being processed;
+# otherwise a block costs one global lookup. Stage names with a dot
+# ("transcribe.api") are parts of the stage before the dot.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORTS_DIR = os.path.join(SCRIPT_DIR, "Run Reports")
+
+PROFILE_MODES = ("sample", "cprofile")
+SAMPLE_INTERVAL_SECONDS = 0.005
+TOP_FUNCTIONS = 25
+SLOWEST_ITEMS = 10
+
+_run = None
+_local = threading.local()
+
+
+class _NullStage:
+    nbytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """
+    One timed block. `nbytes` may be set inside the block once it is known
+    (e.g. the size of a file the block wrote).
+    """
+
+    def __init__(self, run, name, nbytes, service, items):
+        self.run = run
+        self.name = name
+        self.nbytes = nbytes
+        self.service = service
+        self.items = items
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.run.record(self.name, time.perf_counter() - self.start, self.nbytes, self.service, self.items)
+        return False
+
+
+class _Sampler(threading.Thread):
+    """
+    Statistical profiler: snapshots the main thread's stack every
+    SAMPLE_INTERVAL_SECONDS. Cheap enough to leave on for a whole run.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL_SECONDS):
+        super().__init__(daemon=True, name="profiler-sampler")
+        self.interval = interval
+        self.target = threading.main_thread().ident
+        self.own = Counter()
+        self.inclusive = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[_frame_label(frame)] += 1
+            seen = set()
+            while frame is not None:
+                label = _frame_label(frame, line=False)
+                if label not in seen:
+                    seen.add(label)
+                    self.inclusive[label] += 1
+                frame = frame.f_back
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def hotspots(self, limit=TOP_FUNCTIONS):
+        total = self.samples or 1
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "own": [{"function": f, "share": round(n / total, 4)} for f, n in self.own.most_common(limit)],
+            "inclusive": [{"function": f, "share": round(n / total, 4)} for f, n in self.inclusive.most_common(limit)],
+        }
+
+
+def _frame_label(frame, line=True):
+    code = frame.f_code
+    label = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+    return f"{label}:{frame.f_lineno}" if line else label
+
+
+def _percentile(values, q):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(q * len(values)) - 1))
+    return values[index]
+
+
+class RunProfile:
+    """
+    Everything recorded during one ingestion run (thread-safe).
+    """
+
+    def __init__(self, label, mode=None):
+        self.label = label
+        self.mode = mode
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.elapsed = None
+        self.durations = defaultdict(list)
+        self.bytes = Counter()
+        self.api_calls = Counter()
+        # uid -> {"stages": {name: [seconds, bytes]}, "api_calls": Counter}
+        self.items = {}
+        self._lock = threading.Lock()
+        self._cprofile = None
+        self._sampler = None
+
+    def record(self, name, seconds, nbytes, service, items):
+        """
+        Adds one block. A block shared by several items (a Gemini batch) is
+        split evenly between them; each of them is counted as part of the call.
+        """
+        with self._lock:
+            self.durations[name].append(seconds)
+            self.bytes[name] += nbytes
+            if service:
+                self.api_calls[service] += 1
+            for uid in items or ():
+                entry = self.items.get(uid)
+                if entry is None:
+                    entry = self.items[uid] = {"stages": {}, "api_calls": Counter()}
+                totals = entry["stages"].setdefault(name, [0.0, 0])
+                totals[0] += seconds / len(items)
+                totals[1] += nbytes // len(items)
+                if service:
+                    entry["api_calls"][service] += 1
+
+    def begin_sampling(self):
+        if self.mode == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif self.mode == "sample":
+            self._sampler = _Sampler()
+            self._sampler.start()
+
+    def end_sampling(self):
+        if self._cprofile:
+            self._cprofile.disable()
+        if self._sampler:
+            self._sampler.stop()
+
+    def hotspots(self):
+        """
+        Top functions from the sampling or cProfile mode (None without one).
+        """
+        if self._sampler:
+            return self._sampler.hotspots()
+        if self._cprofile:
+            stats = pstats.Stats(self._cprofile)
+            rows = []
+            for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+                rows.append({"function": f"{os.path.basename(filename)}:{name}:{line}", "calls": calls,
+                             "own_s": round(own, 4), "cumulative_s": round(cumulative, 4)})
+            rows.sort(key=lambda r: -r["cumulative_s"])
+            return {"cumulative": rows[:TOP_FUNCTIONS]}
+        return None
+
+    def summary(self):
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.start
+        items = len(self.items)
+        stages = {}
+        for name in sorted(self.durations):
+            values = sorted(self.durations[name])
+            seconds = sum(values)
+            nbytes = self.bytes[name]
+            stages[name] = {
+                "calls": len(values),
+                "seconds": round(seconds, 3),
+                "share": round(seconds / elapsed, 4) if elapsed else 0,
+                "p50_ms": round(_percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(_percentile(values, 0.95) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+                "bytes": nbytes,
+                "mb_per_s": round(nbytes / seconds / 1e6, 2) if nbytes and seconds else None,
+            }
+
+        per_item = {}
+        for uid, entry in self.items.items():
+            item_stages = {name: {"seconds": round(s, 3), "bytes": b} for name, (s, b) in entry["stages"].items()}
+            # Only top-level stages, so nested blocks are not counted twice
+            total = sum(s for name, (s, _) in entry["stages"].items() if "." not in name)
+            per_item[uid] = {
+                "seconds": round(total, 3),
+                "bytes": max((b for _, b in entry["stages"].values()), default=0),
+                "api_calls": dict(entry["api_calls"]),
+                "stages": item_stages,
+            }
+        item_seconds = sorted(entry["seconds"] for entry in per_item.values())
+        slowest = sorted(per_item, key=lambda uid: -per_item[uid]["seconds"])[:SLOWEST_ITEMS]
+
+        return {
+            "label": self.label,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "elapsed_s": round(elapsed, 3),
+            "mode": self.mode,
+            "items": items,
+            "items_per_minute": round(items / elapsed * 60, 2) if elapsed else 0,
+            "stages": stages,
+            "api_calls": dict(self.api_calls),
+            "api_calls_per_item": {s: round(n / items, 3) for s, n in self.api_calls.items()} if items else {},
+            "item_seconds": {
+                "p50": round(_percentile(item_seconds, 0.50), 3),
+                "p95": round(_percentile(item_seconds, 0.95), 3),
+                "max": item_seconds[-1] if item_seconds else 0.0,
+            },
+            "slowest_items": slowest,
+            "per_item": per_item,
+            "hotspots": self.hotspots(),
+        }
+
+
+# --- Instrumentation API (no-ops unless a run is active) ---
+
+def stage(name, nbytes=0, service=None, items=None):
+    """
+    Context manager timing one block of `name`. `service` counts it as one
+    API call to that service. `items` (ids) defaults to the current item.
+    """
+    run = _run
+    if run is None:
+        return _NULL_STAGE
+    if items is None:
+        items = getattr(_local, "items", None)
+    return _Stage(run, name, nbytes, service, items)
+
+
+def timed(name, service=None, path_arg=None):
+    """
+    Decorator form of stage(). path_arg: index of a positional argument
+    holding a file path whose size is recorded as the bytes processed.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _run is None:
+                return fn(*args, **kwargs)
+            nbytes = 0
+            if path_arg is not None and len(args) > path_arg:
+                try:
+                    nbytes = os.path.getsize(args[path_arg])
+                except (OSError, TypeError):
+                    pass
+            with stage(name, nbytes=nbytes, service=service):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextlib.contextmanager
+def item(uid):
+    """
+    Attributes stages run by this thread inside the block to `uid`.
+    """
+    previous = getattr(_local, "items", None)
+    _local.items = [uid] if uid else None
+    try:
+        yield
+    finally:
+        _local.items = previous
+
+
+def current_item():
+    """
+    The item this thread is working on (hand it to worker threads via item()).
+    """
+    items = getattr(_local, "items", None)
+    return items[0] if items else None
+
+
+def start(label, mode=None):
+    """
+    Starts recording a run. If one is already active (e.g. a scan followed by
+    resume passes in the load test) it simply keeps going.
+    """
+    global _run
+    if _run is None:
+        _run = RunProfile(label, mode)
+        _run.begin_sampling()
+    return _run
+
+
+def finish():
+    """
+    Stops the active run and returns it (None if there was none).
+    """
+    global _run
+    run, _run = _run, None
+    if run is not None:
+        run.end_sampling()
+        run.elapsed = time.perf_counter() - run.start
+    return run
+
+
+# --- Reports ---
+
+def _mb(nbytes):
+    return f"{nbytes / 1e6:.1f}" if nbytes else "-"
+
+
+def format_summary(summary):
+    lines = [
+        f"Ingest run report ({summary['label']}), started {summary['started_at']}",
+        f"{summary['items']} items in {summary['elapsed_s']:.1f}s ({summary['items_per_minute']:.1f} items/min)",
+        "",
+        f"   {'Stage':<22} {'calls':>6} {'total s':>9} {'share':>7} {'p50 ms':>9} {'p95 ms':>9} {'MB':>8} {'MB/s':>7}",
+    ]
+    stages = summary["stages"]
+    parents = sorted((n for n in stages if "." not in n), key=lambda n: -stages[n]["seconds"])
+    # Sub-stages whose parent never ran on its own are listed at top level
+    orphans = [n for n in stages if "." in n and n.split(".")[0] not in stages]
+    for name in parents + sorted(orphans, key=lambda n: -stages[n]["seconds"]):
+        children = sorted((n for n in stages if n.startswith(name + ".")), key=lambda n: -stages[n]["seconds"])
+        for label, key in [(name, name)] + [("  " + c, c) for c in children]:
+            s = stages[key]
+            lines.append(f"   {label:<22} {s['calls']:>6} {s['seconds']:>9.2f} {s['share'] * 100:>6.1f}%"
+                         f" {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {_mb(s['bytes']):>8}"
+                         f" {s['mb_per_s'] if s['mb_per_s'] is not None else '-':>7}")
+
+    if summary["api_calls"]:
+        lines.append("")
+        lines.append("   API calls: " + " | ".join(
+            f"{service} {n} ({summary['api_calls_per_item'].get(service, 0):.2f}/item)"
+            for service, n in sorted(summary["api_calls"].items())))
+
+    if summary["items"]:
+        item_seconds = summary["item_seconds"]
+        lines.append(f"   Per item: p50 {item_seconds['p50']:.2f}s | p95 {item_seconds['p95']:.2f}s"
+                     f" | max {item_seconds['max']:.2f}s")
+        lines.append("")
+        lines.append("   Slowest items:")
+        for uid in summary["slowest_items"]:
+            entry = summary["per_item"][uid]
+            top = max(entry["stages"].items(), key=lambda kv: kv[1]["seconds"])
+            calls = sum(entry["api_calls"].values())
+            lines.append(f"   - {uid}  {entry['seconds']:.2f}s  {_mb(entry['bytes'])} MB"
+                         f"  slowest: {top[0]} {top[1]['seconds']:.2f}s  ({calls} API calls)")
+
+    hotspots = summary.get("hotspots")
+    if hotspots:
+        lines.append("")
+        if "cumulative" in hotspots:
+            lines.append("   cProfile (cumulative s / own s / calls):")
+            for row in hotspots["cumulative"]:
+                lines.append(f"   {row['cumulative_s']:>9.3f} {row['own_s']:>9.3f} {row['calls']:>8}  {row['function']}")
+        else:
+            lines.append(f"   Sampled hotspots ({hotspots['samples']} samples, inclusive share):")
+            for row in hotspots["inclusive"]:
+                lines.append(f"   {row['share'] * 100:>6.1f}%  {row['function']}")
+    return "\n".join(lines)
+
+
+def write_report(run, reports_dir=None):
+    """
+    Writes <time>_<label>.json (full numbers, per item) and .txt (the
+    summary printed here) to reports_dir. Returns the JSON path.
+    """
+    summary = run.summary()
+    text = format_summary(summary)
+    print("\n" + text)
+
+    reports_dir = reports_dir or REPORTS_DIR
+    os.makedirs(reports_dir, exist_ok=True)
+    base = os.path.join(reports_dir, f"{run.started_at:%Y%m%d_%H%M%S}_{run.label}")
+    with open(base + ".json", 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    with open(base + ".txt", 'w', encoding='utf-8') as f:
+        f.write(text + "\n")
+    if run._cprofile:
+        run._cprofile.dump_stats(base + ".prof")
+    print(f"\n💾 Run report written to {base}.json")
+    return base + ".json"
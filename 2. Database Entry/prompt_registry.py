@@ -0,0 +1,204 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+# Gemini refuses explicit context caches below a minimum size, so small
+# prefixes are simply sent inline (implicit prefix caching still applies).
+MIN_CACHE_TOKENS = 1024
+CACHE_TTL_SECONDS = 3600
+# Refresh the cache a little before Gemini expires it
+CACHE_EXPIRY_MARGIN = 60
+# caches.create errors (lowercased) meaning this prefix will never be cached
+CACHE_REFUSED_ERRORS = ("too small", "min_total_token_count", "not supported", "does not support")
+
+PLACEHOLDER_RE = re.compile(r"\{([a-z_]+)\}")
+
+
+def estimate_tokens(text):
+    """
+    Rough token estimate (~4 characters per token) used for cache eligibility
+    and prompt budgets.
+    """
+    return len(text) // 4 if text else 0
+
+
+class CompiledPrompt:
+    """
+    A prompt template split into a static prefix and a per-request suffix.
+    The prefix has all static placeholders (instructions, vocabulary) filled in.
+    The suffix holds every per-request placeholder and is rendered per call.
+    """
+
+    def __init__(self, name, prefix, suffix_template, dynamic_keys):
+        self.name = name
+        self.prefix = prefix
+        self.suffix_template = suffix_template
+        self.dynamic_keys = dynamic_keys
+        self.prefix_hash = hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+        self.prefix_tokens = estimate_tokens(prefix)
+        # Identifies the whole prompt (template + static values), e.g. to tag outputs with it
+        self.version = hashlib.sha256((prefix + suffix_template).encode("utf-8")).hexdigest()[:12]
+
+    def render_suffix(self, **values):
+        text = self.suffix_template
+        for key in self.dynamic_keys:
+            text = text.replace("{" + key + "}", str(values.get(key, "")))
+        return text
+
+    def render(self, **values):
+        return self.prefix + self.render_suffix(**values)
+
+
+def compile_prompt(name, template, static_values=None):
+    """
+    Splits `template` at the first placeholder that is not in `static_values`.
+    Everything before it becomes the prefix, everything from it onwards the
+    suffix template. Static placeholders are filled in both, so a static
+    value after the first dynamic one still reaches the model (it just isn't
+    part of the cached prefix).
+    """
+    static_values = static_values or {}
+    dynamic_keys = [k for k in dict.fromkeys(PLACEHOLDER_RE.findall(template)) if k not in static_values]
+
+    split_at = len(template)
+    for key in dynamic_keys:
+        split_at = min(split_at, template.find("{" + key + "}"))
+
+    prefix, suffix_template = template[:split_at], template[split_at:]
+    for key, value in static_values.items():
+        prefix = prefix.replace("{" + key + "}", value)
+        suffix_template = suffix_template.replace("{" + key + "}", value)
+
+    return CompiledPrompt(name, prefix, suffix_template, dynamic_keys)
+
+
+class PromptRegistry:
+    """
+    Loads and compiles prompt templates once.
+    A template is only re-read when its file changes on disk, and only
+    recompiled when the file or the caller-supplied static version changes.
+    """
+
+    def __init__(self, prompts_dir):
+        self.prompts_dir = prompts_dir
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def get(self, filename, static=None, version=None):
+        """
+        filename: Template file inside the prompts directory.
+        static: Optional callable returning {placeholder: value} for the prefix.
+                Only called when a recompile is needed.
+        version: Any comparable token identifying the static values (e.g. the
+                 metadata dict or the CSV mtime).
+        """
+        path = os.path.join(self.prompts_dir, filename)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Prompt file {filename} not found at {path}")
+
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size, version)
+
+        with self._lock:
+            entry = self._compiled.get(filename)
+            if entry and entry[0] == stamp:
+                return entry[1]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            template = f.read()
+        compiled = compile_prompt(filename, template, static() if static else None)
+
+        with self._lock:
+            self._compiled[filename] = (stamp, compiled)
+        return compiled
+
+
+class PrefixCache:
+    """
+    Serves the static prefix of compiled prompts from Gemini cached content.
+    Caches are keyed per client (each API key owns its own caches), model and
+    prefix hash, and recreated when they expire. Any cache failure falls back
+    to sending the full prompt inline; only a refusal of the prefix itself
+    (model without caching, prefix too small) stops later attempts.
+    """
+
+    def __init__(self, ttl_seconds=CACHE_TTL_SECONDS, min_tokens=MIN_CACHE_TOKENS):
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self._caches = {}
+        self._unsupported = set()
+        self._lock = threading.Lock()
+
+    def _cache_name(self, client, model, prompt, http_options=None):
+        if prompt.prefix_tokens < self.min_tokens:
+            return None
+
+        key = (id(client), model, prompt.prefix_hash)
+        now = time.time()
+        with self._lock:
+            if key in self._unsupported:
+                return None
+            entry = self._caches.get(key)
+            if entry and entry[1] > now:
+                return entry[0]
+
+        cache_config = {
+            "contents": [prompt.prefix],
+            "display_name": f"{prompt.name}-{prompt.prefix_hash}",
+            "ttl": f"{self.ttl_seconds}s",
+        }
+        if http_options:
+            cache_config["http_options"] = http_options
+        try:
+            cache = client.caches.create(model=model, config=cache_config)
+        except Exception as e:
+            error_msg = str(e).lower()
+            if any(marker in error_msg for marker in CACHE_REFUSED_ERRORS):
+                print(f"   Note: Prompt cache not available for {prompt.name}, sending inline from now on ({e})")
+                with self._lock:
+                    self._unsupported.add(key)
+            else:
+                # Transient (network, quota, server error): inline for this call, try again next time
+                print(f"   Note: Prompt cache creation failed for {prompt.name}, sending inline ({e})")
+            return None
+
+        with self._lock:
+            self._caches[key] = (cache.name, now + self.ttl_seconds - CACHE_EXPIRY_MARGIN)
+        return cache.name
+
+    def _forget(self, client, model, prompt):
+        with self._lock:
+            self._caches.pop((id(client), model, prompt.prefix_hash), None)
+
+    def generate(self, client, model, prompt, config=None, **values):
+        """
+        Calls client.models.generate_content with the prompt's prefix served from
+        cache when possible. `values` fill the per-request placeholders.
+        `config` is an optional dict of extra generation settings; its
+        http_options (e.g. a timeout) also apply to creating the cache.
+        """
+        suffix = prompt.render_suffix(**values)
+        cache_name = self._cache_name(client, model, prompt, (config or {}).get("http_options"))
+
+        if cache_name:
+            try:
+                return client.models.generate_content(
+                    model=model,
+                    contents=suffix,
+                    config=dict(config or {}, cached_content=cache_name)
+                )
+            except Exception as e:
+                from httpx import TimeoutException
+                error_msg = str(e)
+                # Out of quota or out of time: an inline retry would only fail again, slower
+                if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg or isinstance(e, TimeoutException):
+                    raise
+                # Cache expired or was evicted server-side; retry inline once
+                self._forget(client, model, prompt)
+
+        kwargs = {"model": model, "contents": prompt.prefix + suffix}
+        if config:
+            kwargs["config"] = config
+        return client.models.generate_content(**kwargs)
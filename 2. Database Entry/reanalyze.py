@@ -0,0 +1,197 @@
+import argparse
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import data_handler
+from data_handler import init_db, analyze_items, get_analysis_version, save_new_values, update_analysis, DB_NAME, DONE_STAGES
+
+# Re-tags existing rows from their stored raw_text (no re-transcription).
+# By default only rows whose analysis_version differs from the current
+# prompt + metadata.csv are selected, so reruns pick up where they stopped.
+MAX_BATCH_CHARS = 10000  # Same batch budget as main.py
+# Gemini free tier allows roughly this many generate calls per key
+REQUESTS_PER_MINUTE_PER_KEY = 10
+ANALYSIS_FIELDS = ["title", "summary", "category", "tags", "types", "refined_text"]
+
+
+class Throttle:
+    """
+    Spaces request starts so all threads together stay under `per_minute`.
+    """
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, stop=None):
+        """
+        Blocks until this caller's slot. `stop` (a threading.Event) cuts the
+        wait short when it is set.
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if stop is not None:
+            stop.wait(start - now)
+        else:
+            time.sleep(start - now)
+
+
+def select_rows(version, include_current=False, category=None, missing=None, analyzed_before=None, ids=None, limit=None):
+    """
+    Returns [{'id', 'raw_text', 'platform'}] for rows matching every given filter.
+    Rows still in the ingestion journal (not committed yet) are never selected.
+    """
+    conditions = ["raw_text IS NOT NULL", "raw_text != ''",
+                  f"id NOT IN (SELECT id FROM jobs WHERE stage NOT IN ({', '.join('?' * len(DONE_STAGES))}))"]
+    params = list(DONE_STAGES)
+
+    if not include_current:
+        conditions.append("(analysis_version IS NULL OR analysis_version != ?)")
+        params.append(version)
+    if category:
+        conditions.append("(" + " OR ".join("category LIKE ?" for _ in category) + ")")
+        params.extend(f"%{c}%" for c in category)
+    if missing:
+        conditions.append("(" + " OR ".join(f"({f} IS NULL OR {f} = '')" for f in missing) + ")")
+    if analyzed_before:
+        conditions.append("(analyzed_at IS NULL OR analyzed_at < ?)")
+        params.append(analyzed_before)
+    if ids:
+        conditions.append(f"id IN ({', '.join('?' * len(ids))})")
+        params.extend(ids)
+
+    sql = f"SELECT id, raw_text, platform FROM videos WHERE {' AND '.join(conditions)} ORDER BY rowid"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    rows = [dict(r) for r in conn.execute(sql, params)]
+    conn.close()
+    return rows
+
+
+def pack_batches(rows, max_chars=MAX_BATCH_CHARS):
+    batches, current, chars = [], [], 0
+    for row in rows:
+        size = len(row['raw_text'])
+        if current and chars + size > max_chars:
+            batches.append(current)
+            current, chars = [], 0
+        current.append(row)
+        chars += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def reanalyze(batches, workers, per_minute):
+    """
+    Sends batches to Gemini from `workers` threads (throttled to `per_minute`)
+    and updates rows in place as results arrive. On a 429 no new batches are
+    started and the queued ones are dropped without waiting for their slot;
+    the rows left over stay stale for the next run.
+    Returns (updated, failed, not_run).
+    """
+    throttle = Throttle(per_minute)
+    quota_hit = threading.Event()
+
+    def run(batch):
+        """
+        Returns (batch, {id: result}, stopped). stopped means the quota ran
+        out before every row was tried.
+        """
+        results = {}
+        if quota_hit.is_set():
+            return batch, results, True
+
+        def keep(row, result):
+            results[row['id']] = result
+
+        def wait():
+            if quota_hit.is_set():
+                raise RuntimeError("QUOTA_EXCEEDED")
+            throttle.wait(stop=quota_hit)
+            if quota_hit.is_set():
+                raise RuntimeError("QUOTA_EXCEEDED")
+
+        try:
+            analyze_items(batch, keep, wait=wait)
+        except RuntimeError as e:
+            if str(e) != "QUOTA_EXCEEDED":
+                raise
+            quota_hit.set()
+            return batch, results, True
+        return batch, results, False
+
+    updated = failed = not_run = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run, batch): batch for batch in batches}
+        # Results are written from this thread only (SQLite + metadata.csv)
+        for future in as_completed(futures):
+            if future.cancelled():
+                not_run += len(futures[future])
+                continue
+            batch, by_id, stopped = future.result()
+            if stopped:
+                # Batches still queued never start
+                for pending in futures:
+                    pending.cancel()
+            for row in batch:
+                result = by_id.get(row['id'])
+                if not result:
+                    if stopped:
+                        not_run += 1
+                    else:
+                        failed += 1
+                    continue
+                save_new_values(result)
+                update_analysis(row['id'], result)
+                updated += 1
+            print(f"   ✅ Updated {updated} rows ({failed} failed)")
+
+    if quota_hit.is_set():
+        print("\n🚨 Gemini API Quota Exceeded (429). Stopped starting new batches.")
+        print("   Run the same command again later; finished rows are already current.")
+    return updated, failed, not_run
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-run Gemini analysis on stored transcripts.")
+    parser.add_argument("--all", action="store_true",
+                        help="Include rows already analyzed with the current prompt and vocabulary")
+    parser.add_argument("--category", nargs="+", help="Only rows whose category contains one of these")
+    parser.add_argument("--missing", nargs="+", choices=ANALYSIS_FIELDS, help="Only rows with one of these fields empty")
+    parser.add_argument("--analyzed-before", help="Only rows analyzed before this date (YYYY-MM-DD) or never recorded")
+    parser.add_argument("--ids", nargs="+", help="Only these video IDs")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--workers", type=int, help="Concurrent Gemini calls (default: one per API key)")
+    parser.add_argument("--rpm", type=float, help="Total requests per minute across all keys")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be sent and exit")
+    args = parser.parse_args()
+
+    init_db()
+    version = get_analysis_version()
+    rows = select_rows(version, include_current=args.all, category=args.category, missing=args.missing,
+                       analyzed_before=args.analyzed_before, ids=args.ids, limit=args.limit)
+    batches = pack_batches(rows)
+
+    keys = max(1, len(data_handler.API_KEYS))
+    workers = args.workers or keys
+    rpm = args.rpm or REQUESTS_PER_MINUTE_PER_KEY * keys
+    print(f"Analysis version: {version}")
+    print(f"Rows selected: {len(rows)} | Batches: {len(batches)} | Workers: {workers} | Limit: {rpm:g}/min"
+          f" (~{len(batches) / rpm:.1f} min)")
+
+    if args.dry_run or not batches:
+        raise SystemExit(0)
+
+    start = time.perf_counter()
+    updated, failed, not_run = reanalyze(batches, workers, rpm)
+    print(f"\nDone in {time.perf_counter() - start:.1f}s. Updated: {updated} | Failed: {failed} | Not run: {not_run}")
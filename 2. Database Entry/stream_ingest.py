@@ -0,0 +1,308 @@
+import argparse
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import main
+import profiler
+from data_handler import init_db, get_unique_id, record_job, record_job_error, get_job_by_source, load_source_index
+
+# Download-to-ingest pipeline: URLs go straight into the library.
+# Worker threads download a URL and transcribe it as soon as it lands; a
+# single analyzer thread batches the extracted items for Gemini meanwhile.
+# Downloading, transcription and analysis of different files overlap.
+# Every file is journaled like a folder scan, so `main.py --resume` picks up
+# whatever a crash or a 429 left unfinished.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DOWNLOAD_DIR = os.path.join(SCRIPT_DIR, "Downloads")
+
+DOWNLOAD_WORKERS = 3
+# A partial batch is sent anyway once no new item arrived for this long
+BATCH_IDLE_SECONDS = 20
+
+# Full-quality video (the library keeps it, thumbnails/previews need it)
+VIDEO_PROFILE = {
+    "format": "bestvideo+bestaudio/best",
+    "merge_output_format": "mp4",
+}
+# Transcription only: smallest stream, re-encoded to 48 kbps mono MP3
+AUDIO_PROFILE = {
+    "format": "bestaudio/worst",
+    "postprocessors": [{
+        "key": "FFmpegExtractAudio",
+        "preferredcodec": "mp3",
+        "preferredquality": "48",
+    }],
+    "postprocessor_args": {"extractaudio": ["-ac", "1", "-ar", "16000"]},
+}
+
+# Platform video ID (and author) straight from the URL, so known videos are
+# skipped before anything is downloaded
+URL_PATTERNS = [
+    ("Tiktok", re.compile(r"tiktok\.com/@([^/?#]+)/(?:video|photo)/(\d+)")),
+    ("Twitter", re.compile(r"(?:twitter|x)\.com/([^/?#]+)/status/(\d+)")),
+    ("Instagram", re.compile(r"instagram\.com/(?:([^/?#]+)/)?(?:p|reel|reels|tv)/([\w-]+)")),
+]
+EXTRACTOR_PLATFORMS = {"tiktok": "Tiktok", "twitter": "Twitter", "instagram": "Instagram"}
+
+_DONE = object()
+
+
+def parse_source_url(url):
+    """
+    Returns {'platform', 'source_author', 'source_video_id'} read from a
+    known URL shape (values None when the URL doesn't say).
+    """
+    for platform, pattern in URL_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            author, video_id = match.groups()
+            return {"platform": platform, "source_author": author.lstrip("@") if author else None,
+                    "source_video_id": video_id}
+    return {"platform": None, "source_author": None, "source_video_id": None}
+
+
+def read_urls(paths):
+    """
+    URLs from text files (one per line, e.g. tiktok_urls.txt); '#' starts a comment.
+    """
+    urls = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    urls.append(line)
+    return urls
+
+
+def download(url, audio_only=False):
+    """
+    Downloads one URL into DOWNLOAD_DIR with yt-dlp.
+    Returns (file path, yt-dlp info dict).
+    """
+    from yt_dlp import YoutubeDL
+
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    options = {
+        "outtmpl": os.path.join(DOWNLOAD_DIR, "%(extractor_key)s_%(id)s.%(ext)s"),
+        "restrictfilenames": True,
+        "noplaylist": True,
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+    }
+    options.update(AUDIO_PROFILE if audio_only else VIDEO_PROFILE)
+    with YoutubeDL(options) as ydl:
+        info = ydl.extract_info(url, download=True)
+        path = ydl.prepare_filename(info)
+    if audio_only:
+        path = os.path.splitext(path)[0] + ".mp3"
+    elif not os.path.exists(path):
+        # Merged formats are written under the merge container's extension
+        path = os.path.splitext(path)[0] + ".mp4"
+    return path, info
+
+
+def source_fields(url, info, parsed):
+    """
+    Record columns describing where a download came from.
+    """
+    return {
+        "source_url": info.get("webpage_url") or url,
+        "source_author": info.get("uploader_id") or info.get("uploader") or info.get("channel") or parsed["source_author"],
+        "source_video_id": str(info.get("id") or parsed["source_video_id"] or "") or None,
+    }
+
+
+def file_type_for(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in main.VIDEO_EXTS:
+        return "Video"
+    if ext in main.AUDIO_EXTS:
+        return "Audio"
+    if ext in main.IMAGE_EXTS:
+        return "Image"
+    return "Unknown"
+
+
+class StreamIngest:
+    """
+    Runs the pipeline for a list of URLs. Counters are updated from
+    several threads, always under self.lock.
+    """
+
+    def __init__(self, platform=None, audio_only=False, workers=DOWNLOAD_WORKERS, keep_downloads=False):
+        self.platform = platform
+        self.audio_only = audio_only
+        self.workers = workers
+        self.keep_downloads = keep_downloads
+        self.extracted = queue.Queue()
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.known = {}
+        self.counts = {"downloaded": 0, "known": 0, "duplicate": 0, "failed": 0, "batches": 0}
+
+    def _count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def handle_url(self, url, index, total):
+        """
+        Download + extract for one URL (worker thread). The extracted item is
+        queued for the analyzer.
+        """
+        if self.stop.is_set():
+            return
+        parsed = parse_source_url(url)
+        uid = get_unique_id()
+        with profiler.item(uid):
+            try:
+                with profiler.stage("download") as timing:
+                    path, info = download(url, self.audio_only)
+                    timing.nbytes = os.path.getsize(path)
+            except Exception as e:
+                print(f"   [Error] Download failed ({index}/{total}) {url}: {e}")
+                self._count("failed")
+                return
+            self._count("downloaded")
+            print(f"⬇️  Downloaded {index}/{total}: {os.path.basename(path)}")
+            source = source_fields(url, info, parsed)
+            # Short links only reveal the video ID once resolved
+            if source["source_video_id"] in self.known:
+                print(f"⚠️ Skipped: Already in library (ID: {self.known[source['source_video_id']]})")
+                self._count("known")
+                self._discard(path)
+                return
+
+            platform = (self.platform or parsed["platform"]
+                        or EXTRACTOR_PLATFORMS.get((info.get("extractor_key") or "").lower(), "Unknown"))
+            file_type = file_type_for(path)
+            original_name = os.path.basename(path)
+            dest_path = os.path.join(main.get_dest_folder(platform, file_type), f"{uid}_{original_name}")
+
+            record_job(uid, path, dest_path, original_name, platform, file_type)
+            try:
+                item = main.extract_item(uid, path, dest_path, platform, file_type, original_name, source=source)
+            except Exception as e:
+                print(f"   [Error] Extraction failed for {url}: {e}")
+                record_job_error(uid, f"Extraction failed: {e}")
+                return
+        if item is None:
+            self._count("duplicate")
+            self._discard(path)
+            return
+        self.extracted.put(item)
+
+    def _discard(self, path):
+        # The store holds its own link/copy once a file is committed or skipped
+        if not self.keep_downloads:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _flush(self, batch):
+        if not batch or self.stop.is_set():
+            return
+        try:
+            main.process_batch(batch)
+        except SystemExit:
+            # process_batch exits on a Gemini 429; stop downloading too
+            self.stop.set()
+            return
+        self._count("batches")
+        for item in batch:
+            job = get_job_by_source(item['source_path'])
+            if job and job['stage'] == "committed":
+                self._discard(item['source_path'])
+
+    def analyze_loop(self):
+        """
+        Analyzer thread: batches items by main.MAX_BATCH_CHARS as they arrive.
+        """
+        batch, chars = [], 0
+        while True:
+            try:
+                item = self.extracted.get(timeout=BATCH_IDLE_SECONDS)
+            except queue.Empty:
+                # Downloads are slow right now; don't sit on a partial batch
+                self._flush(batch)
+                batch, chars = [], 0
+                continue
+            if item is _DONE:
+                break
+            if batch and chars + item['char_count'] > main.MAX_BATCH_CHARS:
+                self._flush(batch)
+                batch, chars = [], 0
+            batch.append(item)
+            chars += item['char_count']
+        self._flush(batch)
+
+    def run(self, urls):
+        self.known = load_source_index()
+        todo = []
+        for url in dict.fromkeys(urls):
+            video_id = parse_source_url(url)["source_video_id"]
+            if video_id and video_id in self.known:
+                self._count("known")
+                continue
+            todo.append(url)
+        print(f"URLs: {len(urls)} | Already in library: {self.counts['known']} | To ingest: {len(todo)}"
+              f" | Profile: {'audio only' if self.audio_only else 'video'}\n")
+        if not todo:
+            return self.counts
+
+        analyzer = threading.Thread(target=self.analyze_loop, name="stream-analyzer")
+        analyzer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for index, url in enumerate(todo, 1):
+                    pool.submit(self.handle_url, url, index, len(todo))
+        finally:
+            self.extracted.put(_DONE)
+            analyzer.join()
+        return self.counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download URLs and ingest each file as soon as it lands.")
+    parser.add_argument("urls", nargs="*", help="Video URLs")
+    parser.add_argument("--from-file", nargs="+", default=[], metavar="TXT",
+                        help="Text files with one URL per line (e.g. tiktok_urls.txt)")
+    parser.add_argument("--audio-only", action="store_true",
+                        help="Download a low-bitrate audio track only (transcription, no thumbnails/previews)")
+    parser.add_argument("--platform", choices=sorted(set(main.PLATFORM_MAP.values())),
+                        help="Platform for every URL (default: detected from the URL)")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="Files downloaded/transcribed at once")
+    parser.add_argument("--keep-downloads", action="store_true",
+                        help="Leave the downloaded files in Downloads/ after they are stored")
+    parser.add_argument("--profile", choices=profiler.PROFILE_MODES)
+    args = parser.parse_args()
+
+    urls = args.urls + read_urls(args.from_file)
+    if not urls:
+        parser.error("No URLs given")
+
+    init_db()
+    profiler.start("stream", mode=args.profile)
+    start = time.perf_counter()
+    try:
+        pipeline = StreamIngest(args.platform, args.audio_only, args.workers, args.keep_downloads)
+        counts = pipeline.run(urls)
+        main.finish_previews()
+        # Only reached when the run finished; an error (or Ctrl-C) propagates as is
+        print(f"\nDone in {time.perf_counter() - start:.1f}s. Downloaded: {counts['downloaded']}"
+              f" | Skipped (known): {counts['known']} | Duplicates: {counts['duplicate']}"
+              f" | Failed: {counts['failed']} | Batches: {counts['batches']}")
+        if pipeline.stop.is_set():
+            print("🚨 Stopped early (Gemini quota). Continue later with: python main.py --resume")
+            sys.exit(0)
+    finally:
+        run = profiler.finish()
+        if run and run.durations:
+            profiler.write_report(run)
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+import data_handler
+from prompt_registry import PLACEHOLDER_RE, compile_prompt
+
+# Run from "2. Database Entry": python -m pytest tests  (or python -m unittest)
+
+
+class CompilePromptTest(unittest.TestCase):
+
+    def test_static_value_after_dynamic_placeholder_is_filled(self):
+        prompt = compile_prompt("t", "A: {a}\nB: {b}\nC: {c}\n", {"a": "1", "c": "3"})
+        self.assertEqual(prompt.prefix, "A: 1\nB: ")
+        self.assertEqual(prompt.render(b="2"), "A: 1\nB: 2\nC: 3\n")
+
+
+class AnalysisPromptTest(unittest.TestCase):
+    """
+    The real analysis prompt, with the vocabulary from a scratch metadata.csv.
+    """
+
+    def setUp(self):
+        self.workspace = tempfile.TemporaryDirectory()
+        self.saved = (data_handler.CSV_PATH, data_handler.DB_NAME, data_handler.TAG_TOP_K)
+        data_handler.CSV_PATH = os.path.join(self.workspace.name, "metadata.csv")
+        data_handler.DB_NAME = os.path.join(self.workspace.name, "video_agent.db")
+        data_handler.write_metadata({"Category": ["Mindset", "Business"], "Tags": ["Effort", "Focus"],
+                                     "Types": ["Advice", "Quote"], "Platform": ["Tiktok"]})
+
+    def tearDown(self):
+        data_handler.CSV_PATH, data_handler.DB_NAME, data_handler.TAG_TOP_K = self.saved
+        self.workspace.cleanup()
+
+    def render(self, top_k):
+        data_handler.TAG_TOP_K = top_k
+        prompt = data_handler.get_analysis_prompt()
+        values = {"items_json": '[{"id": "x1", "raw_text": "put in the effort"}]'}
+        if top_k is not None:
+            values["tags"] = ", ".join(data_handler.select_tags(["put in the effort"]))
+        return prompt, prompt.render(**values)
+
+    def test_no_placeholder_survives_rendering(self):
+        for top_k in (None, data_handler.TAG_TOP_K or 25):
+            with self.subTest(top_k=top_k):
+                _, text = self.render(top_k)
+                self.assertEqual(PLACEHOLDER_RE.findall(text), [])
+                self.assertIn("Types: Advice, Quote", text)
+                self.assertIn("Effort", text)
+
+    def test_rules_stay_in_cached_prefix_with_per_batch_tags(self):
+        prompt, _ = self.render(data_handler.TAG_TOP_K or 25)
+        self.assertIn("RULES:", prompt.prefix)
+        self.assertIn("Types: Advice, Quote", prompt.prefix)
+        self.assertTrue(prompt.suffix_template.startswith("{tags}"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from unittest import mock
+
+import data_handler
+
+# Run from "2. Database Entry": python -m pytest tests  (or python -m unittest)
+
+
+def result(item_id):
+    return {"id": item_id, **{field: "x" for field in data_handler.ANALYSIS_FIELDS}}
+
+
+class AnalyzeItemsTest(unittest.TestCase):
+    """
+    analyze_items with analyze_batch replaced by scripted responses.
+    """
+
+    def setUp(self):
+        self.items = [{"id": f"v{i}", "raw_text": "text"} for i in range(4)]
+        self.batches = []
+        self.done = []
+        patcher = mock.patch.object(data_handler.time, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_with(self, respond):
+        def fake_batch(items):
+            self.batches.append([item["id"] for item in items])
+            return respond(items)
+
+        with mock.patch.object(data_handler, "analyze_batch", side_effect=fake_batch):
+            return data_handler.analyze_items(self.items, lambda item, r: self.done.append(item["id"]))
+
+    def test_failed_call_resends_whole_batch_with_backoff(self):
+        replies = iter([None, None])
+        errors = self.run_with(lambda items: next(replies, [result(item["id"]) for item in items]))
+        self.assertEqual(errors, {})
+        self.assertEqual(self.batches, [["v0", "v1", "v2", "v3"]] * 3)
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list],
+                         [data_handler.CALL_BACKOFF_SECONDS, 2 * data_handler.CALL_BACKOFF_SECONDS])
+
+    def test_quota_error_is_retried_then_raised(self):
+        def respond(items):
+            raise RuntimeError("QUOTA_EXCEEDED")
+
+        with self.assertRaisesRegex(RuntimeError, "QUOTA_EXCEEDED"):
+            self.run_with(respond)
+        self.assertEqual(len(self.batches), data_handler.CALL_RETRIES + 1)
+        self.assertTrue(all(len(batch) == 4 for batch in self.batches))
+
+    def test_call_that_never_succeeds_is_not_bisected(self):
+        errors = self.run_with(lambda items: None)
+        self.assertEqual(errors, {item["id"]: data_handler.CALL_FAILED_ERROR for item in self.items})
+        self.assertTrue(all(len(batch) == 4 for batch in self.batches))
+
+    def test_malformed_response_bisects_to_the_bad_item(self):
+        # Any response containing v2 comes back unreadable
+        errors = self.run_with(lambda items: [] if any(item["id"] == "v2" for item in items)
+                               else [result(item["id"]) for item in items])
+        self.assertEqual(errors, {"v2": data_handler.ISOLATED_ERROR})
+        self.assertEqual(sorted(self.done), ["v0", "v1", "v3"])
+        self.sleep.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import data_handler
+import migrate
+
+# Run from "2. Database Entry": python -m pytest tests  (or python -m unittest)
+
+
+class PassageBackfillTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workspace = tempfile.TemporaryDirectory()
+        self.saved = data_handler.DB_NAME
+        data_handler.DB_NAME = os.path.join(self.workspace.name, "video_agent.db")
+
+    def tearDown(self):
+        data_handler.DB_NAME = self.saved
+        self.workspace.cleanup()
+
+    def passage_count(self):
+        conn = sqlite3.connect(data_handler.DB_NAME)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM passages WHERE video_id = 'old'").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_rows_from_before_the_index_are_split_by_init_db(self):
+        migrate.upgrade(data_handler.DB_NAME, target=7)
+        conn = sqlite3.connect(data_handler.DB_NAME)
+        with conn:
+            conn.execute("INSERT INTO videos (id, refined_text) VALUES ('old', 'First point. Second point.')")
+        conn.close()
+
+        migrate.upgrade(data_handler.DB_NAME)  # The migration itself only adds the tables
+        self.assertEqual(self.passage_count(), 0)
+        data_handler.init_db()
+        self.assertEqual(self.passage_count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
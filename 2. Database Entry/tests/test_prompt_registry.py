@@ -0,0 +1,98 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import prompt_registry
+from prompt_registry import PrefixCache, compile_prompt
+
+# Run from "2. Database Entry": python -m pytest tests  (or python -m unittest)
+
+
+class FakeClient:
+    """
+    Records caches.create / models.generate_content calls. `create_errors`
+    are raised by the next cache creations, `cached_errors` by the next calls
+    that use a cache.
+    """
+
+    def __init__(self, create_errors=(), cached_errors=()):
+        self.create_errors = list(create_errors)
+        self.cached_errors = list(cached_errors)
+        self.created = []
+        self.calls = []
+        self.caches = SimpleNamespace(create=self.create_cache)
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+
+    def create_cache(self, model, config):
+        if self.create_errors:
+            raise self.create_errors.pop(0)
+        self.created.append(config)
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    def generate_content(self, model, contents, config=None):
+        cache_name = (config or {}).get("cached_content")
+        if cache_name and self.cached_errors:
+            raise self.cached_errors.pop(0)
+        self.calls.append((cache_name, contents))
+        return SimpleNamespace(text="ok")
+
+
+class PrefixCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.prompt = compile_prompt("p.txt", "RULES " * 100 + "\n{question}", {})
+        self.cache = PrefixCache(ttl_seconds=600, min_tokens=10)
+        self.now = 1000.0
+        patcher = mock.patch.object(prompt_registry.time, "time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def generate(self, client, question="q"):
+        return self.cache.generate(client, "model", self.prompt, question=question)
+
+    def test_cache_is_created_once_and_reused(self):
+        client = FakeClient()
+        self.generate(client, "a")
+        self.generate(client, "b")
+        self.assertEqual(len(client.created), 1)
+        self.assertEqual(client.created[0]["contents"], [self.prompt.prefix])
+        self.assertEqual(client.calls, [("cachedContents/1", "a"), ("cachedContents/1", "b")])
+
+    def test_cache_is_recreated_after_expiry(self):
+        client = FakeClient()
+        self.generate(client)
+        self.now += 600 - prompt_registry.CACHE_EXPIRY_MARGIN + 1
+        self.generate(client)
+        self.assertEqual([name for name, _ in client.calls], ["cachedContents/1", "cachedContents/2"])
+
+    def test_evicted_cache_falls_back_inline_then_recreates(self):
+        client = FakeClient(cached_errors=[Exception("404 NOT_FOUND. CachedContent not found")])
+        self.generate(client)
+        self.generate(client)
+        self.assertEqual(client.calls[0], (None, self.prompt.prefix + "q"))
+        self.assertEqual(client.calls[1][0], "cachedContents/2")
+
+    def test_transient_create_error_only_affects_that_call(self):
+        client = FakeClient(create_errors=[Exception("503 UNAVAILABLE. Try again later")])
+        self.generate(client)
+        self.generate(client)
+        self.assertEqual([name for name, _ in client.calls], [None, "cachedContents/1"])
+
+    def test_refused_prefix_is_not_offered_again(self):
+        client = FakeClient(create_errors=[
+            Exception("400 INVALID_ARGUMENT. Cached content is too small. min_total_token_count=4096")])
+        self.generate(client)
+        self.generate(client)
+        self.assertEqual([name for name, _ in client.calls], [None, None])
+        self.assertEqual(client.created, [])
+
+    def test_small_prefix_is_sent_inline(self):
+        client = FakeClient()
+        small = compile_prompt("s.txt", "Hi {question}", {})
+        self.cache.generate(client, "model", small, question="q")
+        self.assertEqual(client.calls, [(None, "Hi q")])
+        self.assertEqual(client.created, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
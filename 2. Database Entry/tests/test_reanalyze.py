@@ -0,0 +1,67 @@
+import itertools
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import data_handler
+import reanalyze
+from prompt_registry import PrefixCache
+
+# Run from "2. Database Entry": python -m pytest tests  (or python -m unittest)
+
+
+class QuotaClient:
+    """
+    Gemini client whose every call is rejected with a 429.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+        self.caches = SimpleNamespace(create=lambda model, config: SimpleNamespace(name="cachedContents/q"))
+
+    def generate_content(self, model, contents, config=None):
+        with self._lock:
+            self.calls += 1
+        raise Exception("429 RESOURCE_EXHAUSTED. Quota exceeded.")
+
+
+class ReanalyzeQuotaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workspace = tempfile.TemporaryDirectory()
+        self.client = QuotaClient()
+        patches = [
+            mock.patch.object(data_handler, "CSV_PATH", os.path.join(self.workspace.name, "metadata.csv")),
+            mock.patch.object(data_handler, "DB_NAME", os.path.join(self.workspace.name, "video_agent.db")),
+            mock.patch.object(data_handler, "clients", [self.client]),
+            mock.patch.object(data_handler, "client_rotator", itertools.cycle([self.client])),
+            mock.patch.object(data_handler, "prefix_cache", PrefixCache()),
+            mock.patch.object(data_handler, "CALL_RETRIES", 0),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.workspace.cleanup)
+        data_handler.write_metadata({"Category": ["Mindset"], "Tags": ["Effort"],
+                                     "Types": ["Advice"], "Platform": ["Tiktok"]})
+
+    def test_queued_batches_return_without_sleeping_after_429(self):
+        batches = [[{"id": f"v{i}", "raw_text": "put in the effort", "platform": "Tiktok"}] for i in range(12)]
+        start = time.perf_counter()
+        updated, failed, not_run = reanalyze.reanalyze(batches, workers=2, per_minute=60)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual((updated, failed, not_run), (0, 0, 12))
+        # At 60/min the second call's slot is a second away; nothing may wait for it
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual(self.client.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+# Picks the vocabulary entries worth sending for one Gemini batch: the most
+# used entries (core) plus the best matches for each item's raw text.
+# Local tf-idf scoring only (no embeddings), so it costs milliseconds per batch.
+WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from how i if in into is it its my no not of on or "
+    "our so than that the their them then there they this to too was we what when who why "
+    "will with you your".split()
+)
+SUFFIXES = ("ing", "ed", "es", "s", "ly")
+# An entry's own words count as this many occurrences in its profile
+NAME_WEIGHT = 3
+
+
+def stem(word):
+    """
+    Very light stemmer: "habits"/"habit", "focused"/"focusing"/"focus" and
+    "disciplined"/"discipline" end up equal.
+    """
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[:-len(suffix)]
+            break
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def terms(text):
+    return [stem(w) for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+def clean_label(label):
+    return label.replace("(NEW)", "").strip()
+
+
+class VocabularySelector:
+    """
+    Ranks vocabulary entries for a text by tf-idf similarity to each entry's
+    profile: the entry's own words plus the texts of library rows already
+    labelled with it (`examples`: [(raw_text, [labels])]). Entries nobody has
+    used yet are matched on their words alone.
+    """
+
+    def __init__(self, entries, examples=(), core_count=0):
+        self.entries = list(dict.fromkeys(entries))
+        index = {e.lower(): i for i, e in enumerate(self.entries)}
+        profiles = [Counter() for _ in self.entries]
+        usage = Counter()
+        df = Counter()
+        documents = 0
+
+        for text, labels in examples:
+            doc = Counter(terms(text))
+            documents += 1
+            df.update(doc.keys())
+            for label in labels:
+                i = index.get(clean_label(label).lower())
+                if i is not None:
+                    usage[i] += 1
+                    profiles[i].update(doc)
+
+        for i, entry in enumerate(self.entries):
+            name_terms = set(terms(entry))
+            df.update(name_terms)
+            for t in name_terms:
+                profiles[i][t] += NAME_WEIGHT
+
+        n = documents + len(self.entries)
+        self._idf = {t: math.log(1 + n / count) for t, count in df.items()}
+
+        # Normalized profile vectors, stored as term -> [(entry index, weight)]
+        self._postings = defaultdict(list)
+        for i, profile in enumerate(profiles):
+            weights = {t: (1 + math.log(c)) * self._idf[t] for t, c in profile.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for t, w in weights.items():
+                self._postings[t].append((i, w / norm))
+
+        self.core = [self.entries[i] for i, _ in usage.most_common(core_count)]
+
+    def rank(self, text):
+        """
+        Entries sharing at least one term with text, best first.
+        """
+        scores = defaultdict(float)
+        for t, count in Counter(terms(text)).items():
+            postings = self._postings.get(t)
+            if not postings:
+                continue
+            weight = (1 + math.log(count)) * self._idf[t]
+            for i, w in postings:
+                scores[i] += weight * w
+        return [self.entries[i] for i, _ in sorted(scores.items(), key=lambda kv: -kv[1])]
+
+    def select(self, texts, top_k, max_chars=None):
+        """
+        Core entries, then up to top_k matches per text, taken round-robin
+        (every text's best match before anyone's second) so a long batch
+        still covers each item. With max_chars, stops before the ", "-joined
+        list would exceed it.
+        """
+        chosen = []
+        seen = set()
+        used = 0
+
+        def add(entry):
+            nonlocal used
+            extra = len(entry) + (2 if chosen else 0)
+            if max_chars is not None and used + extra > max_chars:
+                return False
+            chosen.append(entry)
+            seen.add(entry)
+            used += extra
+            return True
+
+        for entry in self.core:
+            if not add(entry):
+                return chosen
+
+        rankings = [self.rank(text)[:top_k] for text in texts]
+        for position in range(top_k):
+            for ranking in rankings:
+                if position < len(ranking) and ranking[position] not in seen:
+                    if not add(ranking[position]):
+                        return chosen
+        return chosen
@@ -1,17 +1,99 @@
 import json
-import os
-from google import genai
+import threading
+from contextlib import contextmanager
 import config
+from prompt_registry import PromptRegistry, PrefixCache, estimate_tokens
 
-# Initialize Client
-client = genai.Client(api_key=config.GOOGLE_API_KEY)
+# The client is built on first use: importing google.genai takes ~0.5s,
+# which app.py (and every Flask reload) used to pay before serving anything.
+_client = None
+_client_lock = threading.Lock()
 
-def _load_prompt(filename):
-    path = os.path.join(config.PROMPTS_DIR, filename)
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Prompt file {filename} not found at {path}")
-    with open(path, 'r', encoding='utf-8') as f:
-        return f.read()
+# Prompts are compiled once; the static prefix is served from Gemini's context cache
+prompts = PromptRegistry(config.PROMPTS_DIR)
+prefix_cache = PrefixCache()
+
+class AgentUnavailable(Exception):
+    """
+    A stage could not produce an answer in time; `status` is the HTTP code to return.
+    """
+    status = 503
+
+    def __init__(self, stage, message):
+        super().__init__(message)
+        self.stage = stage
+
+class AgentBusy(AgentUnavailable):
+    status = 503
+
+class AgentTimeout(AgentUnavailable):
+    status = 504
+
+class StageLimiter:
+    """
+    Caps concurrent Gemini calls of one agent stage. Callers beyond the cap
+    queue for up to `queue_timeout` seconds; when `max_queue` are already
+    waiting, new callers are turned away at once.
+    """
+
+    def __init__(self, stage, concurrency, max_queue, queue_timeout):
+        self.stage = stage
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    raise AgentBusy(self.stage, f"Too many requests waiting for the {self.stage} agent")
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                raise AgentBusy(self.stage, f"The {self.stage} agent is busy, try again shortly")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+limiters = {
+    stage: StageLimiter(stage, limit, config.STAGE_MAX_QUEUE, config.STAGE_QUEUE_TIMEOUT)
+    for stage, limit in config.STAGE_CONCURRENCY.items()
+}
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            from google import genai
+            _client = genai.Client(api_key=config.GOOGLE_API_KEY)
+    return _client
+
+def _is_timeout(error):
+    from httpx import TimeoutException
+    return isinstance(error, TimeoutException)
+
+def _generate(stage, prompt, **values):
+    """
+    One Gemini call for `stage`, inside the stage's concurrency limit and
+    with its HTTP timeout. Raises AgentBusy / AgentTimeout.
+    """
+    timeout = config.STAGE_TIMEOUTS[stage]
+    with limiters[stage].slot():
+        try:
+            return prefix_cache.generate(get_client(), config.MODEL_NAME, prompt,
+                                         config={"http_options": {"timeout": timeout * 1000}}, **values)
+        except Exception as e:
+            if _is_timeout(e):
+                raise AgentTimeout(stage, f"The {stage} agent did not answer within {timeout}s") from e
+            raise
 
 def _clean_json_response(text):
     text = text.strip()
@@ -23,37 +105,66 @@ def _clean_json_response(text):
         text = text[:-3]
     return text.strip()
 
-def run_filtering_agent(user_query, metadata, chat_history=None):
+def _truncate_to_tokens(text, max_tokens):
+    max_chars = max_tokens * 4
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + "..."
+
+def _format_history(heading, ai_label, chat_history=None, summary=""):
+    """
+    Builds the conversation context for an agent prompt under HISTORY_TOKEN_BUDGET.
+    The rolling summary goes first, then the most recent messages newest-first
+    until the budget is spent, so the prompt size stays flat in long sessions.
+    """
+    if not chat_history and not summary:
+        return ""
+
+    budget = config.HISTORY_TOKEN_BUDGET
+    context = ""
+    if summary:
+        summary = _truncate_to_tokens(summary, config.SUMMARY_TOKEN_BUDGET)
+        context += f"\nCONVERSATION SUMMARY:\n{summary}\n"
+        budget -= estimate_tokens(summary)
+
+    # A single long AI answer may not crowd out the user's last turn
+    per_message = budget // 2
+    recent = []
+    for h in reversed(chat_history or []):
+        if budget <= 0:
+            break
+        role = "User" if h['role'] == 'user' else ai_label
+        line = _truncate_to_tokens(f"{role}: {h['content']}", min(budget, per_message))
+        recent.insert(0, line)
+        budget -= estimate_tokens(line)
+
+    if recent:
+        context += f"\n{heading}:\n" + "\n".join(recent) + "\n"
+    return context
+
+def run_filtering_agent(user_query, metadata, chat_history=None, summary=""):
     """
     Agent 1: Decides filter criteria.
     chat_history: List of dicts [{"role":..., "content":...}]
+    summary: Rolling conversation summary for the session
     """
-    prompt_template = _load_prompt("1_filter.txt")
-    
-    options_str = (
-        f"Categories: {', '.join(metadata.get('Category', []))}\n"
-        f"Tags: {', '.join(metadata.get('Tags', []))}\n"
-        f"Types: {', '.join(metadata.get('Types', []))}"
+    # The vocabulary is part of the cached prefix; it is only re-joined when metadata changes
+    prompt = prompts.get(
+        "1_filter.txt",
+        static=lambda: {"options": (
+            f"Categories: {', '.join(metadata.get('Category', []))}\n"
+            f"Tags: {', '.join(metadata.get('Tags', []))}\n"
+            f"Types: {', '.join(metadata.get('Types', []))}"
+        )},
+        version=metadata
     )
     
-    history_context = ""
-    if chat_history:
-        # Format last 5 turns
-        relevant_history = chat_history[-5:]
-        history_context = "\nRECENT CONVERSATION HISTORY:\n"
-        for h in relevant_history:
-            role = "User" if h['role'] == 'user' else "AI"
-            history_context += f"{role}: {h['content']}\n"
+    history_context = _format_history("RECENT CONVERSATION HISTORY", "AI", chat_history, summary)
     
-    prompt = f"{prompt_template}\n{history_context}\nUSER QUERY:\n{user_query}\n\nAVAILABLE OPTIONS:\n{options_str}"
-
     try:
-        response = client.models.generate_content(
-            model=config.MODEL_NAME,
-            contents=prompt
-        )
+        response = _generate("filter", prompt, history=history_context, user_query=user_query)
         cleaned = _clean_json_response(response.text)
         return json.loads(cleaned)
+    except AgentUnavailable:
+        raise
     except Exception as e:
         print(f"Error in Filtering Agent: {e}")
         return {}
@@ -63,53 +174,88 @@ def run_refinement_agent(user_query, video_candidates):
     if not video_candidates:
         return []
 
-    prompt_template = _load_prompt("2_refine.txt")
+    prompt = prompts.get("2_refine.txt")
     
     candidates_str = ""
     for v in video_candidates:
         candidates_str += f"ID: {v['id']}\nTitle: {v['title']}\nSummary: {v['summary']}\n---\n"
     
-    prompt = f"{prompt_template}\n\nUSER QUERY:\n{user_query}\n\nCANDIDATE VIDEOS:\n{candidates_str}"
-
     try:
-        response = client.models.generate_content(
-            model=config.MODEL_NAME,
-            contents=prompt
-        )
+        response = _generate("refine", prompt, user_query=user_query, candidates=candidates_str)
         cleaned = _clean_json_response(response.text)
         data = json.loads(cleaned)
         return data.get("selected_ids", [])
+    except AgentUnavailable:
+        raise
     except Exception as e:
         print(f"Error in Refinement Agent: {e}")
         return []
 
-def run_response_agent(user_query, video_details_list, chat_history=None):
+def _join_passages(passages):
+    """
+    Joins passages (in document order) into one excerpt. Consecutive ones are
+    running text; "[...]" marks where passages were left out between them.
+    """
+    excerpt, last_seq = "", None
+    for p in passages:
+        if last_seq is not None:
+            excerpt += " " if p['seq'] == last_seq + 1 else "\n[...]\n"
+        excerpt += p['text']
+        last_seq = p['seq']
+    return excerpt
+
+def run_response_agent(user_query, video_details_list, chat_history=None, summary=""):
     """
     Agent 3: Generates final advice.
     """
-    prompt_template = _load_prompt("3_response.txt")
+    prompt = prompts.get("3_response.txt")
     
-    history_context = ""
-    if chat_history:
-        relevant_history = chat_history[-5:]
-        history_context = "\nCONVERSATION HISTORY:\n"
-        for h in relevant_history:
-            role = "User" if h['role'] == 'user' else "Assistant"
-            history_context += f"{role}: {h['content']}\n"
+    history_context = _format_history("CONVERSATION HISTORY", "Assistant", chat_history, summary)
 
+    # Each video contributes its passages most relevant to the query, in document order
     content_str = ""
     for v in video_details_list:
-        content_str += f"Video ID: {v['id']}\nTitle: {v['title']}\nPlatform: {v['platform']}\nContent:\n{v['refined_text']}\n###\n"
+        excerpts = _join_passages(v['passages'])
+        content_str += f"Video ID: {v['id']}\nTitle: {v['title']}\nPlatform: {v['platform']}\nExcerpts:\n{excerpts}\n###\n"
     
-    prompt = f"{prompt_template}\n{history_context}\nUSER QUERY:\n{user_query}\n\nVIDEO CONTENTS:\n{content_str}"
-
     try:
-        response = client.models.generate_content(
-            model=config.MODEL_NAME,
-            contents=prompt
-        )
+        response = _generate("response", prompt, history=history_context, user_query=user_query, contents=content_str)
         cleaned = _clean_json_response(response.text)
         return json.loads(cleaned)
+    except AgentUnavailable:
+        raise
     except Exception as e:
         print(f"Error in Response Agent: {e}")
         return None
+
+def run_summary_agent(previous_summary, new_messages):
+    """
+    Agent 4: Folds the newest messages into the session's rolling summary.
+    Returns the updated summary, or None on failure (caller keeps the old one).
+    """
+    if not new_messages:
+        return previous_summary
+
+    prompt = prompts.get(
+        "4_summary.txt",
+        static=lambda: {"max_words": str(config.SUMMARY_TOKEN_BUDGET * 3 // 4)},
+        version=config.SUMMARY_TOKEN_BUDGET
+    )
+
+    # Long AI answers are clipped; the summary only needs their gist
+    per_message_tokens = config.HISTORY_TOKEN_BUDGET // 2
+    messages_str = ""
+    for m in new_messages:
+        role = "User" if m['role'] == 'user' else "Assistant"
+        messages_str += _truncate_to_tokens(f"{role}: {m['content']}", per_message_tokens) + "\n"
+
+    try:
+        response = _generate("summary", prompt, summary=previous_summary or "(empty)", messages=messages_str)
+        cleaned = _clean_json_response(response.text)
+        summary = json.loads(cleaned).get("summary", "")
+        return _truncate_to_tokens(summary.strip(), config.SUMMARY_TOKEN_BUDGET)
+    except AgentUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error in Summary Agent: {e}")
+        return None
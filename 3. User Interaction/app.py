@@ -1,19 +1,56 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, abort
 import agent_logic
 import db_ops
 import config
 import chat_db
+import gzip
+import hashlib
 import os
 import subprocess
 import sys
+import threading
 import uuid
 
+try:
+    import brotli
+except ImportError:
+    brotli = None  # Optional; gzip is used when brotli is not installed
+
 app = Flask(__name__)
 
 # Directory where media files are stored
 MEDIA_DIR = os.path.join(os.path.dirname(config.DB_PATH), "All Files")
 
-CHARACTER_LIMIT = 50000
+# Columns of the ranked videos the response step needs besides their passages
+RESPONSE_DETAIL_COLUMNS = ['title', 'platform', 'file_path']
+
+# Chat history
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+AGENT_HISTORY_TURNS = 2  # Older turns reach the agents through the rolling summary
+SUMMARY_BATCH_MESSAGES = 20
+
+# Gallery API
+MAX_GALLERY_PAGE_SIZE = 200
+GRID_FIELDS = ['id', 'title', 'platform', 'kind', 'thumb']
+DETAIL_FIELDS = ['id', 'title', 'platform', 'category', 'tags', 'types', 'summary', 'kind', 'media_url']
+# Derived fields and the DB columns they are built from
+DERIVED_FIELDS = {'thumb': ['id'], 'kind': ['file_type'], 'media_url': ['file_path']}
+ALLOWED_FIELDS = set(db_ops.GALLERY_COLUMNS) | set(DERIVED_FIELDS)
+
+# Response compression
+COMPRESS_MIN_BYTES = 500
+COMPRESS_MIMETYPES = {'application/json', 'text/html', 'text/css', 'text/javascript', 'application/javascript'}
+
+# Sessions whose summary is currently being updated in the background
+_summarizing = set()
+_summarizing_lock = threading.Lock()
+
+# Chat turns being answered right now, keyed by (session_id, normalized query).
+# A double-click or a second tab asking the same thing joins the running turn
+# if it reaches the same server process (see gunicorn.conf.py).
+_inflight = {}
+_inflight_lock = threading.Lock()
 
 def open_file(path):
     if not path:
@@ -31,6 +68,80 @@ def open_file(path):
         print(f"Could not open file {path}: {e}")
         return False
 
+def update_session_summary(session_id):
+    """
+    Folds messages newer than the stored summary into it.
+    Runs in a background thread after each turn; at most one update per session.
+    """
+    with _summarizing_lock:
+        if session_id in _summarizing:
+            return
+        _summarizing.add(session_id)
+    try:
+        summary, last_id = chat_db.get_session_summary(session_id)
+        new_messages = chat_db.get_chat_history(session_id, limit=SUMMARY_BATCH_MESSAGES,
+                                                after_id=last_id, with_metadata=False)
+        if not new_messages:
+            return
+        updated = agent_logic.run_summary_agent(summary, new_messages)
+        if updated is not None:
+            chat_db.save_session_summary(session_id, updated, new_messages[-1]['id'])
+    except Exception as e:
+        print(f"Summary update failed for session {session_id}: {e}")
+    finally:
+        with _summarizing_lock:
+            _summarizing.discard(session_id)
+
+def schedule_summary_update(session_id):
+    threading.Thread(target=update_session_summary, args=(session_id,), daemon=True).start()
+
+@app.after_request
+def compress_response(response):
+    """
+    Brotli/gzip-compresses textual responses when the client accepts it.
+    Files served from disk (media, thumbnails) are passed through untouched.
+    """
+    accept = request.headers.get('Accept-Encoding', '')
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype not in COMPRESS_MIMETYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    if brotli and 'br' in accept:
+        data, encoding = brotli.compress(data, quality=5), 'br'
+    elif 'gzip' in accept:
+        data, encoding = gzip.compress(data, compresslevel=6), 'gzip'
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = len(data)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def cached_json(build, *key_parts):
+    """
+    Returns build() as JSON with a weak ETag derived from the library version
+    and key_parts. If the client already has that version, build() is skipped
+    and a bodiless 304 is returned.
+    """
+    raw = "|".join([db_ops.get_library_version()] + [str(p) for p in key_parts])
+    etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag, weak=True)
+    # Always revalidate; unchanged pages cost a 304 round trip only
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -43,6 +154,24 @@ def gallery():
 def serve_media(filename):
     return send_from_directory(MEDIA_DIR, filename)
 
+# Thumbnails are immutable per record ID, so browsers may cache them for a year
+THUMB_MAX_AGE = 365 * 24 * 3600
+
+@app.route('/thumb/<video_id>')
+def serve_thumbnail(video_id):
+    return send_from_directory(config.THUMBS_DIR, f"{video_id}.webp", max_age=THUMB_MAX_AGE)
+
+@app.route('/thumb/<video_id>/poster')
+def serve_poster(video_id):
+    return send_from_directory(config.THUMBS_DIR, f"{video_id}_poster.webp", max_age=THUMB_MAX_AGE)
+
+# Faststart H.264 previews (and optional HLS segments) from the transcode stage
+PREVIEW_MAX_AGE = 24 * 3600
+
+@app.route('/preview/<path:filename>')
+def serve_preview(filename):
+    return send_from_directory(config.PREVIEWS_DIR, filename, max_age=PREVIEW_MAX_AGE)
+
 # --- Session Management ---
 @app.route('/api/sessions', methods=['GET'])
 def get_sessions():
@@ -68,7 +197,152 @@ def rename_session(session_id):
 
 @app.route('/api/sessions/<session_id>/history', methods=['GET'])
 def get_history(session_id):
-    return jsonify(chat_db.get_chat_history(session_id))
+    """
+    Paginated history, newest page first.
+    Query params: limit (default 50), before (message id cursor from a previous page).
+    """
+    limit = max(1, min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), MAX_HISTORY_PAGE_SIZE))
+    before = request.args.get('before', type=int)
+    if before is not None and before < 1:
+        before = None  # Message ids start at 1; treat like a missing or malformed cursor
+    messages = chat_db.get_chat_history(session_id, limit=limit, before_id=before)
+    # A full page means there may be older messages
+    next_before = messages[0]['id'] if len(messages) == limit else None
+    return jsonify({"messages": messages, "next_before": next_before})
+
+def pack_passages(ranked_ids, passages, budget):
+    """
+    Picks passages round by round: every video's best passage in rank order,
+    then every video's second best, and so on while they fit `budget` tokens.
+    Returns {video_id: [passages in document order]} in rank order, without
+    videos that got none.
+    """
+    chosen = {vid_id: [] for vid_id in ranked_ids}
+    used = 0
+    rounds = max((len(passages.get(v, [])) for v in ranked_ids), default=0)
+    for round_index in range(rounds):
+        for vid_id in ranked_ids:
+            options = passages.get(vid_id, [])
+            if round_index < len(options) and used + options[round_index]['tokens'] <= budget:
+                chosen[vid_id].append(options[round_index])
+                used += options[round_index]['tokens']
+    return {vid_id: sorted(picked, key=lambda p: p['seq']) for vid_id, picked in chosen.items() if picked}
+
+def normalize_query(query):
+    return " ".join(query.casefold().split())
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+def coalesced(key, work):
+    """
+    Runs work() once per key at a time. Requests with the same key that
+    arrive while it runs wait for its (payload, status) instead of starting
+    their own. Returns (payload, status, shared).
+    """
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+
+    if not leader:
+        # The leader's agent calls are bounded by STAGE_TIMEOUTS, so this returns
+        flight.done.wait()
+        return flight.result + (True,)
+
+    try:
+        flight.result = work()
+    except agent_logic.AgentUnavailable as e:
+        print(f"Chat turn stopped at the {e.stage} agent: {e}")
+        flight.result = ({"error": str(e)}, e.status)
+    except Exception as e:
+        print(f"Server Error: {e}")
+        flight.result = ({"error": str(e)}, 500)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+    return flight.result + (False,)
+
+def answer_query(session_id, query):
+    """
+    One chat turn: filter -> refine -> respond, saving both messages.
+    Returns (payload, status).
+    """
+    # Get History: rolling summary + the last turn's text
+    summary, _ = chat_db.get_session_summary(session_id)
+    history = chat_db.get_chat_history(session_id, limit=AGENT_HISTORY_TURNS, with_metadata=False)
+    
+    # Save user message
+    chat_db.add_message(session_id, 'user', query)
+
+    # Step 1: Filtering (Pass history)
+    meta = db_ops.load_metadata()
+    filter_criteria = agent_logic.run_filtering_agent(query, meta, chat_history=history, summary=summary)
+    
+    candidates = db_ops.search_videos_by_criteria(filter_criteria)
+    if not candidates:
+        msg = "I couldn't find any relevant videos in my database to help with that. Maybe try rephrasing or asking something else?"
+        chat_db.add_message(session_id, 'ai', msg)
+        schedule_summary_update(session_id)
+        return {
+            "answer_text": msg,
+            "recommendations_with_notes": [],
+            "other_recommendations": []
+        }, 200
+
+    # Step 2: Refining
+    ranked_ids = agent_logic.run_refinement_agent(query, candidates)
+    
+    # Best passages of each ranked video under the context budget
+    details_map = db_ops.get_full_video_details(ranked_ids, columns=RESPONSE_DETAIL_COLUMNS)
+    ranked_ids = [vid_id for vid_id in dict.fromkeys(ranked_ids) if vid_id in details_map]
+    passages = db_ops.get_relevant_passages(query, ranked_ids, per_video=config.MAX_PASSAGES_PER_VIDEO)
+    final_video_details = []
+    for vid_id, chosen in pack_passages(ranked_ids, passages, config.RESPONSE_CONTEXT_TOKENS).items():
+        final_video_details.append(dict(details_map[vid_id], passages=chosen))
+
+    if not final_video_details:
+        msg = "Found relevant videos, but none of them has any text to answer from. Maybe try asking something else?"
+        chat_db.add_message(session_id, 'ai', msg)
+        schedule_summary_update(session_id)
+        return {
+            "answer_text": msg,
+            "recommendations_with_notes": [],
+            "other_recommendations": []
+        }, 200
+
+    # Step 3: Response (Pass history)
+    response = agent_logic.run_response_agent(query, final_video_details, chat_history=history, summary=summary)
+    
+    if not response:
+        return {"error": "Error generating response from AI."}, 500
+
+    # Enhance response
+    lookup = {v['id']: v for v in final_video_details}
+    def enhance_recs(recs):
+        enhanced = []
+        for r in recs:
+            vid_id = r.get('id')
+            if vid_id in lookup:
+                v = lookup[vid_id]
+                r['title'] = v.get('title', 'Unknown')
+                r['file_path'] = v.get('file_path')
+                r['platform'] = v.get('platform')
+                enhanced.append(r)
+        return db_ops.attach_preview_urls(enhanced)
+
+    response['recommendations_with_notes'] = enhance_recs(response.get('recommendations_with_notes', []))
+    response['other_recommendations'] = enhance_recs(response.get('other_recommendations', []))
+
+    # Save AI Response
+    chat_db.add_message(session_id, 'ai', response['answer_text'], msg_type='result', metadata=response)
+    schedule_summary_update(session_id)
+
+    return response, 200
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -81,88 +355,13 @@ def chat():
     if not session_id:
         return jsonify({"error": "No session provided"}), 400
 
-    try:
-        # Get History
-        history = chat_db.get_chat_history(session_id)
-        
-        # Save user message
-        chat_db.add_message(session_id, 'user', query)
-
-        # Step 1: Filtering (Pass history)
-        meta = db_ops.load_metadata()
-        filter_criteria = agent_logic.run_filtering_agent(query, meta, chat_history=history)
-        
-        candidates = db_ops.search_videos_by_criteria(filter_criteria)
-        if not candidates:
-            msg = "I couldn't find any relevant videos in my database to help with that. Maybe try rephrasing or asking something else?"
-            chat_db.add_message(session_id, 'ai', msg)
-            return jsonify({
-                "answer_text": msg,
-                "recommendations_with_notes": [],
-                "other_recommendations": []
-            })
-
-        # Step 2: Refining
-        ranked_ids = agent_logic.run_refinement_agent(query, candidates)
-        
-        # Prune based on 50k limit
-        final_video_details = []
-        current_char_count = 0
-        details_map = db_ops.get_full_video_details(ranked_ids)
-        
-        for vid_id in ranked_ids:
-            if vid_id not in details_map:
-                continue
-            vid = details_map[vid_id]
-            text = vid.get('refined_text', '') or ""
-            text_len = len(text)
-            
-            if current_char_count + text_len <= CHARACTER_LIMIT:
-                final_video_details.append(vid)
-                current_char_count += text_len
-            else:
-                break
-
-        if not final_video_details:
-             msg = "Found relevant videos, but their content is too large to process. Please try a more specific question."
-             chat_db.add_message(session_id, 'ai', msg)
-             return jsonify({"error": msg}), 413
-
-        # Step 3: Response (Pass history)
-        response = agent_logic.run_response_agent(query, final_video_details, chat_history=history)
-        
-        if not response:
-            return jsonify({"error": "Error generating response from AI."}), 500
-
-        # Enhance response
-        lookup = {v['id']: v for v in final_video_details}
-        def enhance_recs(recs):
-            enhanced = []
-            for r in recs:
-                vid_id = r.get('id')
-                if vid_id in lookup:
-                    v = lookup[vid_id]
-                    r['title'] = v.get('title', 'Unknown')
-                    r['file_path'] = v.get('file_path')
-                    r['platform'] = v.get('platform')
-                    enhanced.append(r)
-            return enhanced
-
-        response['recommendations_with_notes'] = enhance_recs(response.get('recommendations_with_notes', []))
-        response['other_recommendations'] = enhance_recs(response.get('other_recommendations', []))
-
-        # Save AI Response
-        chat_db.add_message(session_id, 'ai', response['answer_text'], msg_type='result', metadata=response)
-
-        return jsonify(response)
-
-    except Exception as e:
-        print(f"Server Error: {e}")
-        return jsonify({"error": str(e)}), 500
-
-    except Exception as e:
-        print(f"Server Error: {e}")
-        return jsonify({"error": str(e)}), 500
+    payload, status, shared = coalesced((session_id, normalize_query(query)),
+                                        lambda: answer_query(session_id, query))
+    response = jsonify(payload)
+    response.status_code = status
+    if shared:
+        response.headers['X-Coalesced'] = '1'
+    return response
 
 @app.route('/api/open-video', methods=['POST'])
 def open_video():
@@ -180,7 +379,71 @@ def open_video():
 # --- Gallery API ---
 @app.route('/api/gallery/filters', methods=['GET'])
 def get_gallery_filters():
-    return jsonify(db_ops.get_unique_filter_options())
+    return cached_json(db_ops.get_unique_filter_options, 'filters')
+
+def media_url_for(file_path):
+    if not file_path:
+        return None
+    parts = file_path.replace('\\', '/').split('All Files/')
+    return f"/media/{parts[1]}" if len(parts) > 1 else None
+
+def shape_video(row, fields):
+    """
+    Builds the API representation of a video row with only the requested fields.
+    """
+    out = {}
+    for field in fields:
+        if field == 'thumb':
+            out['thumb'] = f"/thumb/{row['id']}"
+        elif field == 'kind':
+            out['kind'] = (row.get('file_type') or 'unknown').lower()
+        elif field == 'media_url':
+            out['media_url'] = media_url_for(row.get('file_path'))
+        else:
+            out[field] = row.get(field)
+    return out
+
+def columns_for(fields):
+    columns = ['id']
+    for field in fields:
+        for col in DERIVED_FIELDS.get(field, [field]):
+            if col not in columns:
+                columns.append(col)
+    return columns
+
+@app.route('/api/gallery/videos', methods=['GET'])
+def list_gallery_videos():
+    """
+    Cacheable, compact gallery page.
+    Query params: platform/category/tags/types (repeatable), page, limit,
+    fields (comma separated, default: id,title,platform,kind,thumb).
+    """
+    filters = {key: request.args.getlist(key) for key in ('platform', 'category', 'tags', 'types')}
+    page = max(1, request.args.get('page', 1, type=int))
+    limit = min(max(1, request.args.get('limit', 50, type=int)), MAX_GALLERY_PAGE_SIZE)
+    requested = request.args.get('fields')
+    fields = [f for f in requested.split(',') if f in ALLOWED_FIELDS] if requested else GRID_FIELDS
+    fields = fields or GRID_FIELDS
+
+    def build():
+        rows = db_ops.get_gallery_videos(filters, limit=limit, offset=(page - 1) * limit,
+                                         columns=columns_for(fields))
+        return [shape_video(row, fields) for row in rows]
+
+    return cached_json(build, 'videos', sorted(request.args.items(multi=True)))
+
+@app.route('/api/gallery/videos/<video_id>', methods=['GET'])
+def get_gallery_video(video_id):
+    """
+    Detail fields for one video, fetched on demand by the viewer.
+    """
+    def build():
+        row = db_ops.get_video_card(video_id)
+        if not row:
+            abort(404)
+        return db_ops.attach_preview_urls([shape_video(row, DETAIL_FIELDS)])[0]
+
+    return cached_json(build, 'video', video_id)
 
 @app.route('/api/gallery/videos', methods=['POST'])
 def get_gallery_videos():
@@ -203,7 +466,7 @@ def get_gallery_videos():
     offset = (page - 1) * limit
     
     videos = db_ops.get_gallery_videos(filters, limit=limit, offset=offset)
-    return jsonify(videos)
+    return jsonify(db_ops.attach_preview_urls(videos))
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001) # Use 5001 to avoid common occupancy
@@ -0,0 +1,8 @@
+"""
+Benchmarks for the User Interaction query layer.
+
+Run from the "3. User Interaction" directory:
+    python -m benchmarks.bench_db_ops --sizes 1000,10000,100000
+    python -m benchmarks.bench_db_ops --compare benchmarks/reports/<old>.json
+    python -m benchmarks.bench_startup
+"""
@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import config
+import db_ops
+from benchmarks.corpus import ensure_corpus, load_profile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+REPORTS_DIR = os.path.join(BENCH_DIR, "reports")
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_ITERATIONS = 30
+WARMUP_ITERATIONS = 2
+# Slow shapes get fewer iterations on big corpora so a full run stays practical
+MAX_SECONDS_PER_SHAPE = 20
+REGRESSION_THRESHOLD = 1.2
+
+
+def _top(profile, key, n):
+    values, weights = profile[key]
+    ranked = sorted(zip(values, weights), key=lambda vw: -vw[1])
+    return [v for v, _ in ranked[:n]]
+
+
+def _rare(profile, key):
+    values, weights = profile[key]
+    return min(zip(values, weights), key=lambda vw: vw[1])[0]
+
+
+def query_shapes(profile, db_path, rows):
+    """
+    Returns [(name, callable)] covering how the app calls each db_ops query.
+    """
+    conn = sqlite3.connect(db_path)
+    # Evenly spread, deterministic ids so runs are comparable
+    step = max(1, rows // 50)
+    sample_ids = [r[0] for r in conn.execute("SELECT id FROM videos WHERE rowid % ? = 0 LIMIT 50", (step,))]
+    conn.close()
+
+    narrow = {'tags': [_rare(profile, 'tags')]}
+    broad = {
+        'category': _top(profile, 'category', 3),
+        'tags': _top(profile, 'tags', 5),
+        'types': _top(profile, 'types', 2),
+    }
+    gallery_filtered = {
+        'platform': [p for p, _ in sorted(profile['platforms'].items(), key=lambda pw: -pw[1])[:1]],
+        'tags': _top(profile, 'tags', 2),
+    }
+    deep_offset = max(0, min(rows - 50, 10000))
+
+    def reset_filter_cache():
+        db_ops._filter_cache['data'] = None
+        db_ops._filter_cache['timestamp'] = 0
+        return db_ops.get_unique_filter_options()
+
+    return [
+        # Filtering agent output: one rare tag / several popular values / nothing selected
+        ("search_narrow", lambda: db_ops.search_videos_by_criteria(narrow)),
+        ("search_broad", lambda: db_ops.search_videos_by_criteria(broad)),
+        ("search_unfiltered", lambda: db_ops.search_videos_by_criteria({})),
+        # Gallery: first page, a deep page, a filtered page
+        ("gallery_first_page", lambda: db_ops.get_gallery_videos({}, limit=50, offset=0)),
+        ("gallery_deep_page", lambda: db_ops.get_gallery_videos({}, limit=50, offset=deep_offset)),
+        ("gallery_filtered", lambda: db_ops.get_gallery_videos(gallery_filtered, limit=50, offset=0)),
+        # Filter sidebar (cache cleared so the query itself is measured)
+        ("filter_options", reset_filter_cache),
+        # Response agent detail lookups
+        ("details_5", lambda: db_ops.get_full_video_details(sample_ids[:5])),
+        ("details_50", lambda: db_ops.get_full_video_details(sample_ids[:50])),
+    ]
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def measure(fn, iterations):
+    """
+    Times `fn` and records its Python memory peak.
+    Timing runs without tracemalloc (it slows allocation-heavy code); one
+    extra traced call measures the peak bytes allocated during a call.
+    """
+    for _ in range(WARMUP_ITERATIONS):
+        result = fn()
+
+    timings = []
+    budget_end = time.perf_counter() + MAX_SECONDS_PER_SHAPE
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+        if time.perf_counter() > budget_end and len(timings) >= 3:
+            break
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "iterations": len(timings),
+        "result_rows": len(result) if hasattr(result, '__len__') else None,
+        "min_ms": round(timings[0], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p90_ms": round(_percentile(timings, 90), 3),
+        "p99_ms": round(_percentile(timings, 99), 3),
+        "max_ms": round(timings[-1], 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_benchmarks(sizes, iterations, seed=0, rebuild=False, only=None):
+    profile = load_profile()
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": seed,
+            "iterations": iterations,
+        },
+        "results": {},
+    }
+
+    original_db_path = config.DB_PATH
+    try:
+        for rows in sizes:
+            db_path = ensure_corpus(DATA_DIR, rows, seed, profile, rebuild)
+            config.DB_PATH = db_path
+            print(f"\n📊 {rows:,} rows")
+            size_results = {}
+            for name, fn in query_shapes(profile, db_path, rows):
+                if only and name not in only:
+                    continue
+                stats = measure(fn, iterations)
+                size_results[name] = stats
+                print(f"   {name:<20} p50 {stats['p50_ms']:>10.2f} ms   p99 {stats['p99_ms']:>10.2f} ms"
+                      f"   peak {stats['peak_kb']:>10.0f} KB   rows {stats['result_rows']}")
+            report["results"][str(rows)] = size_results
+    finally:
+        config.DB_PATH = original_db_path
+
+    report["meta"]["max_rss_kb"] = _max_rss_kb()
+    return report
+
+
+def compare_reports(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Prints p50/p99 ratios (current / baseline) per size and shape.
+    Returns the number of shapes whose p50 regressed beyond `threshold`.
+    """
+    regressions = 0
+    print(f"\nComparing against {baseline['meta'].get('commit')} ({baseline['meta'].get('created_at')})")
+    for rows, shapes in current["results"].items():
+        old_shapes = baseline["results"].get(rows)
+        if not old_shapes:
+            continue
+        print(f"\n   {int(rows):,} rows")
+        for name, stats in shapes.items():
+            old = old_shapes.get(name)
+            if not old or not old["p50_ms"]:
+                continue
+            p50_ratio = stats["p50_ms"] / old["p50_ms"]
+            p99_ratio = stats["p99_ms"] / old["p99_ms"] if old["p99_ms"] else 0
+            flag = ""
+            if p50_ratio > threshold:
+                flag = "  ⚠️ slower"
+                regressions += 1
+            elif p50_ratio < 1 / threshold:
+                flag = "  ✅ faster"
+            print(f"   {name:<20} p50 x{p50_ratio:5.2f}   p99 x{p99_ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark db_ops queries against synthetic corpora.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma separated corpus sizes (rows)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", help="Comma separated query shapes to run")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the synthetic databases")
+    parser.add_argument("--out", help="Report path (default: benchmarks/reports/<time>_<commit>.json)")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = set(args.only.split(",")) if args.only else None
+    report = run_benchmarks(sizes, args.iterations, args.seed, args.rebuild, only)
+
+    out = args.out
+    if not out:
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out = os.path.join(REPORTS_DIR, f"{stamp}_{report['meta']['commit'] or 'nogit'}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report written to {out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare_reports(baseline, report):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
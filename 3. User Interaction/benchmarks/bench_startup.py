@@ -0,0 +1,26 @@
+import importlib.util
+import os
+
+# Start-up budget for the web app: `import app` (what Flask's reloader redoes
+# on every change) must stay well under a second. The check itself is shared
+# with the ingestion side and loaded by path from
+# "2. Database Entry/benchmarks/startup_budget.py".
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_PATH = os.path.join(os.path.dirname(APP_DIR), "2. Database Entry", "benchmarks", "startup_budget.py")
+
+TARGETS = {
+    "import app": ["-c", "import app"],
+}
+# Only needed once a chat request reaches Gemini
+LAZY_MODULES = ["google.genai"]
+
+
+def load_startup_budget():
+    spec = importlib.util.spec_from_file_location("startup_budget", SHARED_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+if __name__ == "__main__":
+    load_startup_budget().main(TARGETS, LAZY_MODULES, APP_DIR)
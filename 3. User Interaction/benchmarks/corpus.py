@@ -0,0 +1,218 @@
+import collections
+import contextlib
+import csv
+import importlib.util
+import io
+import os
+import random
+import sqlite3
+import time
+
+import config
+
+# The corpus gets its schema from the ingestion side's own migrations
+MIGRATE_PATH = os.path.join(config.PARENT_DIR, "2. Database Entry", "migrate.py")
+# Columns filled by CorpusGenerator.row, in order; the rest keep their defaults
+CORPUS_COLUMNS = ['id', 'title', 'summary', 'category', 'tags', 'types', 'refined_text', 'raw_text',
+                  'platform', 'file_type', 'file_path', 'original_filename']
+
+# Used when there is no real library to profile (lengths in characters)
+DEFAULT_PROFILE = {
+    'raw_lengths': [0, 120, 400, 700, 900, 1100, 1500, 2500, 6000],
+    'refined_lengths': [0, 150, 250, 320, 400, 600],
+    'summary_lengths': [90, 120, 140, 170],
+    'tag_counts': [4, 5, 6, 6, 7, 7, 8, 9],
+    'platforms': {'Tiktok': 60, 'Instagram': 28, 'Twitter': 12},
+    'file_types': {'Video': 92, 'Image': 8},
+}
+
+INSERT_BATCH = 10000
+FILLER_WORDS = ("the work is only part of the idea you have to show up every day and do it "
+                "again because results compound slowly then suddenly people overestimate "
+                "what they can do in a year and underestimate a decade of focus").split()
+
+
+def _read_vocabulary():
+    """
+    Returns {'Category': [...], 'Tags': [...], 'Types': [...], 'Platform': [...]} from metadata.csv.
+    """
+    vocab = {'Category': [], 'Tags': [], 'Types': [], 'Platform': []}
+    if not os.path.exists(config.CSV_PATH):
+        return vocab
+    with open(config.CSV_PATH, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            for key in vocab:
+                val = (row.get(key) or '').strip()
+                if val and val not in vocab[key]:
+                    vocab[key].append(val)
+    return vocab
+
+
+def _split(value):
+    return [t.strip() for t in (value or '').split(',') if t.strip()]
+
+
+def load_profile():
+    """
+    Builds the distributions the synthetic corpus is drawn from.
+    Vocabulary comes from metadata.csv. Text lengths, tags per row and value
+    frequencies are sampled from the real video_agent.db when it exists, so
+    the corpus looks like our library; otherwise DEFAULT_PROFILE is used and
+    vocabulary values follow a Zipf-like popularity curve.
+    """
+    vocab = _read_vocabulary()
+    profile = dict(DEFAULT_PROFILE)
+    counts = {key: collections.Counter() for key in ('category', 'tags', 'types')}
+
+    if os.path.exists(config.DB_PATH):
+        conn = sqlite3.connect(f"file:{config.DB_PATH}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("""SELECT length(raw_text), length(refined_text), length(summary),
+                                          category, tags, types, platform, file_type FROM videos""").fetchall()
+        except sqlite3.Error:
+            rows = []
+        finally:
+            conn.close()
+
+        if rows:
+            profile['raw_lengths'] = [r[0] or 0 for r in rows]
+            profile['refined_lengths'] = [r[1] or 0 for r in rows]
+            profile['summary_lengths'] = [r[2] or 0 for r in rows]
+            profile['tag_counts'] = [len(_split(r[4])) for r in rows]
+            profile['platforms'] = collections.Counter(r[6] for r in rows if r[6])
+            profile['file_types'] = collections.Counter(r[7] for r in rows if r[7])
+            for r in rows:
+                counts['category'].update(_split(r[3]))
+                counts['tags'].update(_split(r[4]))
+                counts['types'].update(_split(r[5]))
+
+    # Every vocabulary value can appear; observed ones keep their real popularity
+    for key, vocab_key in (('category', 'Category'), ('tags', 'Tags'), ('types', 'Types')):
+        values = list(dict.fromkeys(vocab[vocab_key] + list(counts[key])))
+        if not values:
+            values = [f"{vocab_key} {i}" for i in range(1, 21)]
+        if counts[key]:
+            weights = [counts[key].get(v, 0) + 1 for v in values]
+        else:
+            weights = [1.0 / rank for rank in range(1, len(values) + 1)]
+        profile[key] = (values, weights)
+
+    return profile
+
+
+class CorpusGenerator:
+    """
+    Deterministic row generator for a given profile and seed.
+    """
+
+    def __init__(self, profile, seed=0):
+        self.profile = profile
+        self.rng = random.Random(seed)
+        # One long filler text; rows take slices at random offsets (cheap at 1M rows)
+        words = [self.rng.choice(FILLER_WORDS) for _ in range(60000)]
+        self.filler = " ".join(words)
+        self.platforms = list(profile['platforms'])
+        self.platform_weights = list(profile['platforms'].values())
+        self.file_types = list(profile['file_types'])
+        self.file_type_weights = list(profile['file_types'].values())
+
+    def _text(self, length):
+        if length <= 0:
+            return ""
+        length = min(length, len(self.filler))
+        start = self.rng.randrange(0, len(self.filler) - length + 1)
+        return self.filler[start:start + length]
+
+    def _pick(self, key, k):
+        values, weights = self.profile[key]
+        picked = []
+        for value in self.rng.choices(values, weights=weights, k=k * 2):
+            if value not in picked:
+                picked.append(value)
+            if len(picked) == k:
+                break
+        return picked
+
+    def row(self, i):
+        # Multiplying by an odd constant mod 2^32 is a bijection: unique 8-hex ids like ours
+        uid = f"{(i * 2654435761) % 2 ** 32:08x}"
+        platform = self.rng.choices(self.platforms, weights=self.platform_weights)[0]
+        file_type = self.rng.choices(self.file_types, weights=self.file_type_weights)[0]
+        ext = "mp4" if file_type == "Video" else "jpeg"
+        title = self._text(self.rng.randint(20, 60)).strip().capitalize()
+        filename = f"{uid}_{title[:40]}.{ext}"
+        return (
+            uid,
+            title,
+            self._text(self.rng.choice(self.profile['summary_lengths'])),
+            self._pick('category', 1)[0],
+            ", ".join(self._pick('tags', self.rng.choice(self.profile['tag_counts']))),
+            ", ".join(self._pick('types', 1)),
+            self._text(self.rng.choice(self.profile['refined_lengths'])),
+            self._text(self.rng.choice(self.profile['raw_lengths'])),
+            platform,
+            file_type,
+            f"/library/All Files/{platform}/{file_type.lower()}/{filename}",
+            filename,
+        )
+
+
+def load_migrate():
+    """
+    Imports "2. Database Entry/migrate.py" by path.
+    """
+    spec = importlib.util.spec_from_file_location("migrate", MIGRATE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def schema_version():
+    """
+    Version of the newest migration, i.e. of the schema a new corpus gets.
+    """
+    return load_migrate().load_migrations()[-1].version
+
+
+def build_corpus(path, rows, seed=0, profile=None):
+    """
+    Writes a synthetic video_agent.db with `rows` records to `path`, on a
+    schema built by running every migration on an empty file.
+    An existing file at `path` is replaced.
+    """
+    profile = profile or load_profile()
+    generator = CorpusGenerator(profile, seed)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # One progress line per migration
+        load_migrate().upgrade(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    insert_sql = (f"INSERT INTO videos ({', '.join(CORPUS_COLUMNS)})"
+                  f" VALUES ({', '.join('?' * len(CORPUS_COLUMNS))})")
+    for batch_start in range(0, rows, INSERT_BATCH):
+        batch = [generator.row(i) for i in range(batch_start, min(rows, batch_start + INSERT_BATCH))]
+        conn.executemany(insert_sql, batch)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    os.replace(tmp_path, path)
+    return time.perf_counter() - start
+
+
+def ensure_corpus(data_dir, rows, seed=0, profile=None, rebuild=False):
+    """
+    Returns the path of the synthetic DB for (rows, seed) at the current
+    schema version, building it if missing.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"videos_{rows}_s{seed}_v{schema_version()}.db")
+    if rebuild or not os.path.exists(path):
+        print(f"   Building synthetic corpus with {rows:,} rows...")
+        elapsed = build_corpus(path, rows, seed, profile)
+        print(f"   Built {os.path.basename(path)} in {elapsed:.1f}s ({os.path.getsize(path) // (1024 * 1024)} MB)")
+    return path
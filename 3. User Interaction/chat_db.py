@@ -1,13 +1,64 @@
 import sqlite3
 import os
 import json
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_history.db")
 
+# Idle connections kept open for reuse across requests
+POOL_SIZE = 4
+BUSY_TIMEOUT_SECONDS = 5
+_pool = queue.LifoQueue()
+# Tables are created with the first connection, not at import (Flask reloads
+# and scripts that only import this module skip the schema round trip)
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+@contextmanager
+def _connect():
+    """
+    Borrows a pooled connection (opening one if the pool is empty).
+    Commits on success, rolls back on error, then returns it to the pool.
+    """
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        if not _schema_ready:
+            _ensure_schema(conn)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if _pool.qsize() < POOL_SIZE:
+            _pool.put(conn)
+        else:
+            conn.close()
+
+def _ensure_schema(conn):
+    global _schema_ready
+    with _schema_lock:
+        if not _schema_ready:
+            _create_schema(conn)
+            conn.commit()
+            _schema_ready = True
+
 def init_chat_db():
-    conn = sqlite3.connect(DB_PATH)
+    """
+    Creates the tables now instead of on first use.
+    """
+    with _connect():
+        pass
+
+def _create_schema(conn):
     c = conn.cursor()
+    c.execute("PRAGMA journal_mode=WAL")
     # Sessions table
     c.execute("""CREATE TABLE IF NOT EXISTS sessions (
         id TEXT PRIMARY KEY,
@@ -26,60 +77,93 @@ def init_chat_db():
         created_at TIMESTAMP,
         FOREIGN KEY(session_id) REFERENCES sessions(id) ON DELETE CASCADE
     )""")
-    conn.commit()
-    conn.close()
+    # History lookups are always "latest N messages of one session"
+    c.execute("CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages(session_id, id)")
+    # Rolling conversation summary; covers every message up to last_message_id
+    c.execute("""CREATE TABLE IF NOT EXISTS session_summaries (
+        session_id TEXT PRIMARY KEY,
+        summary TEXT,
+        last_message_id INTEGER,
+        updated_at TIMESTAMP
+    )""")
 
 def create_session(session_id, name=None):
     if not name:
         name = f"New Chat {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO sessions (id, name, created_at) VALUES (?, ?, ?)", 
-              (session_id, name, datetime.now()))
-    conn.commit()
-    conn.close()
+    with _connect() as conn:
+        conn.execute("INSERT INTO sessions (id, name, created_at) VALUES (?, ?, ?)",
+                     (session_id, name, datetime.now()))
 
 def get_sessions():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, name, created_at FROM sessions ORDER BY created_at DESC")
-    rows = c.fetchall()
-    conn.close()
+    with _connect() as conn:
+        rows = conn.execute("SELECT id, name, created_at FROM sessions ORDER BY created_at DESC").fetchall()
     return [{"id": r[0], "name": r[1], "created_at": r[2]} for r in rows]
 
 def delete_session(session_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
-    c.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
-    conn.commit()
-    conn.close()
+    with _connect() as conn:
+        conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM session_summaries WHERE session_id = ?", (session_id,))
 
 def rename_session(session_id, new_name):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("UPDATE sessions SET name = ? WHERE id = ?", (new_name, session_id))
-    conn.commit()
-    conn.close()
+    with _connect() as conn:
+        conn.execute("UPDATE sessions SET name = ? WHERE id = ?", (new_name, session_id))
 
 def add_message(session_id, role, content, msg_type='text', metadata=None):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     meta_json = json.dumps(metadata) if metadata else None
-    c.execute("INSERT INTO messages (session_id, role, content, type, metadata, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-              (session_id, role, content, msg_type, meta_json, datetime.now()))
-    conn.commit()
-    conn.close()
+    with _connect() as conn:
+        conn.execute("INSERT INTO messages (session_id, role, content, type, metadata, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                     (session_id, role, content, msg_type, meta_json, datetime.now()))
 
-def get_chat_history(session_id, limit=10):
+def get_chat_history(session_id, limit=10, before_id=None, after_id=None, with_metadata=True):
     """
-    Returns last N messages for the session.
+    Returns the last N messages for the session, oldest first.
+    before_id: Reverse cursor; only messages with a smaller id are returned.
+    after_id: Forward cursor; returns the first N messages with a larger id
+              (e.g. the next ones not yet summarized).
+    with_metadata: When False the (large) metadata blob is neither read nor decoded.
     """
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT role, content, type, metadata FROM messages WHERE session_id = ? ORDER BY id ASC", (session_id,))
-    rows = c.fetchall()
-    conn.close()
-    return [{"role": r[0], "content": r[1], "type": r[2], "metadata": json.loads(r[3]) if r[3] else None} for r in rows]
+    columns = "id, role, content, type, metadata" if with_metadata else "id, role, content, type"
+    sql = f"SELECT {columns} FROM messages WHERE session_id = ?"
+    params = [session_id]
+    if before_id is not None:
+        sql += " AND id < ?"
+        params.append(before_id)
+    if after_id is not None:
+        sql += " AND id > ?"
+        params.append(after_id)
+    # Oldest first after a forward cursor, so consecutive pages leave no gaps
+    sql += " ORDER BY id ASC LIMIT ?" if after_id is not None else " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+
+    with _connect() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    if after_id is None:
+        rows.reverse()
+
+    history = []
+    for r in rows:
+        msg = {"id": r[0], "role": r[1], "content": r[2], "type": r[3]}
+        if with_metadata:
+            msg["metadata"] = json.loads(r[4]) if r[4] else None
+        history.append(msg)
+    return history
+
+def get_session_summary(session_id):
+    """
+    Returns (summary, last_message_id) for the session, or ("", 0) if none yet.
+    """
+    with _connect() as conn:
+        row = conn.execute("SELECT summary, last_message_id FROM session_summaries WHERE session_id = ?",
+                           (session_id,)).fetchone()
+    return (row[0] or "", row[1] or 0) if row else ("", 0)
 
-init_chat_db()
+def save_session_summary(session_id, summary, last_message_id):
+    with _connect() as conn:
+        conn.execute("""INSERT INTO session_summaries (session_id, summary, last_message_id, updated_at)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(session_id) DO UPDATE SET
+                            summary = excluded.summary,
+                            last_message_id = excluded.last_message_id,
+                            updated_at = excluded.updated_at""",
+                     (session_id, summary, last_message_id, datetime.now()))
@@ -11,6 +11,9 @@ PARENT_DIR = os.path.dirname(SCRIPT_DIR)
 # Database and Metadata Paths (Relative to this script)
 DB_PATH = os.path.join(PARENT_DIR, "2. Database Entry", "video_agent.db")
 CSV_PATH = os.path.join(PARENT_DIR, "2. Database Entry", "metadata.csv")
+THUMBS_DIR = os.path.join(PARENT_DIR, "2. Database Entry", "Thumbnails")
+PREVIEWS_DIR = os.path.join(PARENT_DIR, "2. Database Entry", "Previews")
+PREVIEW_MANIFEST_PATH = os.path.join(PREVIEWS_DIR, "manifest.json")
 
 # Prompts Directory
 PROMPTS_DIR = os.path.join(SCRIPT_DIR, "Prompts")
@@ -18,3 +21,28 @@ PROMPTS_DIR = os.path.join(SCRIPT_DIR, "Prompts")
 # API Configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 MODEL_NAME = "gemini-3-flash-preview"
+
+# Chat context budgets (approximate tokens, ~4 chars each)
+SUMMARY_TOKEN_BUDGET = 400   # Rolling per-session conversation summary
+HISTORY_TOKEN_BUDGET = 1200  # Summary + most recent turns passed to each agent
+# Video content for the response agent: best-matching passages, never whole texts
+RESPONSE_CONTEXT_TOKENS = 6000
+MAX_PASSAGES_PER_VIDEO = 3
+
+# Server processes sharing the limits below. Stage limits and chat-turn
+# coalescing live in each process and are not shared between them.
+# `python app.py` and `python wsgi.py` run one process; gunicorn.conf.py sets
+# this to its worker count before the workers import config.
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 1))
+
+# Gemini calls per agent stage across the whole server. Each process gets an
+# equal share (at least 1), so the total stays put whatever WEB_WORKERS is.
+STAGE_CONCURRENCY_TOTAL = {"filter": 16, "refine": 16, "response": 16, "summary": 8}
+STAGE_CONCURRENCY = {stage: max(1, total // WEB_WORKERS) for stage, total in STAGE_CONCURRENCY_TOTAL.items()}
+# Seconds one Gemini call of a stage may take before the request gives up
+STAGE_TIMEOUTS = {"filter": 20, "refine": 30, "response": 60, "summary": 30}
+# Requests waiting for a free slot per stage (server total, split the same
+# way), and how long they may wait
+STAGE_MAX_QUEUE_TOTAL = 64
+STAGE_MAX_QUEUE = max(1, STAGE_MAX_QUEUE_TOTAL // WEB_WORKERS)
+STAGE_QUEUE_TIMEOUT = 30
@@ -1,18 +1,89 @@
 import sqlite3
 import csv
+import json
 import os
+import queue
+import re
+import urllib.parse
+from contextlib import contextmanager
 import config
+from prompt_registry import estimate_tokens
+
+# Read-only connections to video_agent.db, reused across requests.
+# main.py is the only writer; WAL lets these readers proceed while it writes.
+READ_POOL_SIZE = 8
+BUSY_TIMEOUT_SECONDS = 5
+STATEMENT_CACHE_SIZE = 256          # Prepared statements kept per connection
+READ_CACHE_KIB = 64 * 1024          # Page cache per connection
+READ_MMAP_BYTES = 256 * 1024 * 1024
+_read_pool = queue.LifoQueue()
+
+def _open_reader(db_path):
+    uri = f"file:{urllib.parse.quote(db_path)}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_SECONDS,
+                           cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_SECONDS * 1000}")
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute(f"PRAGMA cache_size = -{READ_CACHE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {READ_MMAP_BYTES}")
+    # Warm the page cache with the table the gallery scans first
+    conn.execute("SELECT count(*) FROM videos").fetchone()
+    return conn
+
+@contextmanager
+def _reader():
+    """
+    Borrows a pooled read-only connection (opening one if the pool is empty).
+    Statements are reused from the connection's prepared-statement cache.
+    A connection that raised is closed instead of returned.
+    """
+    db_path = config.DB_PATH
+    conn = None
+    while conn is None:
+        try:
+            path, candidate = _read_pool.get_nowait()
+        except queue.Empty:
+            conn = _open_reader(db_path)
+            break
+        if path == db_path:
+            conn = candidate
+        else:
+            candidate.close()
+    try:
+        yield conn
+    except Exception:
+        conn.close()
+        raise
+    else:
+        if _read_pool.qsize() < READ_POOL_SIZE:
+            _read_pool.put((db_path, conn))
+        else:
+            conn.close()
+
+# Parsed metadata.csv, reused until the file changes on disk
+_metadata_cache = {
+    'stamp': None,
+    'data': None
+}
 
 def load_metadata():
     """
     Reads the metadata.csv and returns a dictionary of lists.
     Format: {'Category': [...], 'Tags': [...], 'Types': [...], 'Platform': [...]}
+    The parsed result is cached and only re-read when the file changes, so the
+    same dict is returned while the vocabulary is unchanged. Treat it as read-only.
     """
     data = {'Category': [], 'Tags': [], 'Types': [], 'Platform': []}
     if not os.path.exists(config.CSV_PATH):
         print(f"Warning: Metadata CSV at {config.CSV_PATH} not found.")
         return data
 
+    st = os.stat(config.CSV_PATH)
+    stamp = (st.st_mtime_ns, st.st_size)
+    if _metadata_cache['stamp'] == stamp:
+        return _metadata_cache['data']
+
     with open(config.CSV_PATH, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         for row in reader:
@@ -21,18 +92,56 @@ def load_metadata():
                     val = row[key].strip()
                     if val not in data[key]: # Avoid duplicates in list if any
                         data[key].append(val)
+
+    _metadata_cache['stamp'] = stamp
+    _metadata_cache['data'] = data
     return data
 
+# Preview rendition manifest written by the ingestion transcoder
+_preview_cache = {
+    'stamp': None,
+    'data': {}
+}
+
+def load_preview_manifest():
+    """
+    Returns {video_id: {"mp4": ..., "hls": ...}} for videos that have web previews.
+    Re-read only when the manifest file changes.
+    """
+    if not os.path.exists(config.PREVIEW_MANIFEST_PATH):
+        return {}
+
+    st = os.stat(config.PREVIEW_MANIFEST_PATH)
+    stamp = (st.st_mtime_ns, st.st_size)
+    if _preview_cache['stamp'] != stamp:
+        try:
+            with open(config.PREVIEW_MANIFEST_PATH, 'r', encoding='utf-8') as f:
+                _preview_cache['data'] = json.load(f)
+            _preview_cache['stamp'] = stamp
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read preview manifest: {e}")
+    return _preview_cache['data']
+
+def attach_preview_urls(videos):
+    """
+    Adds 'preview_url' (and 'hls_url' when segmented) to each video dict that
+    has a web-optimized rendition. Videos without one keep using /media/.
+    """
+    manifest = load_preview_manifest()
+    for v in videos:
+        entry = manifest.get(v.get('id'))
+        if entry:
+            v['preview_url'] = f"/preview/{entry['mp4']}"
+            if entry.get('hls'):
+                v['hls_url'] = f"/preview/{entry['hls']}"
+    return videos
+
 def search_videos_by_criteria(criteria):
     """
     Searches DB for videos matching the criteria (broad search).
     Criteria is a dict: {'category': [...], 'tags': [...], 'types': [...]} (lowercase keys from AI)
     Returns: List of dicts (id, title, summary, etc.)
     """
-    conn = sqlite3.connect(config.DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
     # Construct dynamic query
     # We will use OR logic within fields (e.g. cat1 OR cat2)
     # AND logic between fields (Category AND Tags matches) - or Broad?
@@ -63,46 +172,98 @@ def search_videos_by_criteria(criteria):
     if not conditions:
         # If no criteria returned, maybe return everything? Or nothing?
         # Let's return everything limit 100 to be safe, or just return all.
-        sql = "SELECT id, title, summary, category, tags, types, refined_text FROM videos"
+        sql = "SELECT id, title, summary, category, tags, types FROM videos"
     else:
         # Combine with OR or AND?
         # Broad implementation: OR
-        sql = "SELECT id, title, summary, category, tags, types, refined_text FROM videos WHERE " + " OR ".join(conditions)
+        sql = "SELECT id, title, summary, category, tags, types FROM videos WHERE " + " OR ".join(conditions)
 
     try:
-        c.execute(sql, params)
-        rows = c.fetchall()
+        with _reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
         return [dict(row) for row in rows]
     except Exception as e:
         print(f"Database error: {e}")
         return []
-    finally:
-        conn.close()
 
-def get_full_video_details(video_ids):
+def get_full_video_details(video_ids, columns=None):
     """
-    Fetch full details including refined_text for specific IDs.
+    Fetch details (every column unless `columns` is given) for specific IDs.
     Returns: Dict mapping ID -> Video Dict
     """
     if not video_ids:
         return {}
-    
-    conn = sqlite3.connect(config.DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
 
     placeholders = ', '.join(['?'] * len(video_ids))
-    sql = f"SELECT * FROM videos WHERE id IN ({placeholders})"
+    selected = ', '.join(['id'] + [c for c in columns if c != 'id']) if columns else '*'
+    sql = f"SELECT {selected} FROM videos WHERE id IN ({placeholders})"
     
     try:
-        c.execute(sql, video_ids)
-        rows = c.fetchall()
+        with _reader() as conn:
+            rows = conn.execute(sql, video_ids).fetchall()
         return {row['id']: dict(row) for row in rows}
     except Exception as e:
         print(f"Database error: {e}")
         return {}
-    finally:
-        conn.close()
+
+# Passage retrieval for the response agent (index built by "2. Database Entry/passage_index.py")
+MATCH_STOPWORDS = set("""a an and are as at be but by can do does for from get got has have how i if in
+into is it its me my no not of on or so than that the their them then there these they this to up
+was we what when where which who why will with you your about should would could just like am been
+being did any some more most very too also our us he she his her""".split())
+FALLBACK_PASSAGE_CHARS = 800  # Rows not indexed yet: the start of refined_text
+
+def _match_expression(query):
+    """
+    FTS5 query matching any content word of the question (each term quoted).
+    """
+    terms = [t for t in re.findall(r"\w+", query.lower()) if len(t) > 1 and t not in MATCH_STOPWORDS]
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+
+def get_relevant_passages(query, video_ids, per_video=3):
+    """
+    Returns {video_id: [{'seq', 'text', 'tokens', 'score'}]}: up to `per_video`
+    passages of each video, best BM25 match for `query` first. Videos without
+    a matching passage get their opening passages (score None); videos not
+    indexed yet get the start of their refined_text.
+    """
+    if not video_ids:
+        return {}
+    placeholders = ', '.join(['?'] * len(video_ids))
+    result = {}
+    try:
+        with _reader() as conn:
+            expression = _match_expression(query)
+            if expression:
+                rows = conn.execute(f"""SELECT p.video_id, p.seq, p.text, p.tokens, bm25(passages_fts) AS score
+                                        FROM passages_fts JOIN passages p ON p.id = passages_fts.rowid
+                                        WHERE passages_fts MATCH ? AND p.video_id IN ({placeholders})
+                                        ORDER BY score""", [expression] + list(video_ids)).fetchall()
+                for row in rows:
+                    found = result.setdefault(row['video_id'], [])
+                    if len(found) < per_video:
+                        found.append({'seq': row['seq'], 'text': row['text'], 'tokens': row['tokens'],
+                                      'score': row['score']})
+
+            unmatched = [v for v in video_ids if v not in result]
+            if unmatched:
+                rows = conn.execute(f"""SELECT video_id, seq, text, tokens FROM passages
+                                        WHERE video_id IN ({', '.join(['?'] * len(unmatched))}) AND seq < ?
+                                        ORDER BY video_id, seq""", unmatched + [per_video]).fetchall()
+                for row in rows:
+                    result.setdefault(row['video_id'], []).append(
+                        {'seq': row['seq'], 'text': row['text'], 'tokens': row['tokens'], 'score': None})
+    except sqlite3.OperationalError as e:
+        # Library not migrated to the passage index yet
+        print(f"Passage index unavailable ({e}); using the start of each text")
+
+    missing = [v for v in video_ids if v not in result]
+    if missing:
+        for vid_id, row in get_full_video_details(missing, columns=['refined_text']).items():
+            text = (row.get('refined_text') or '').strip()[:FALLBACK_PASSAGE_CHARS]
+            if text:
+                result[vid_id] = [{'seq': 0, 'text': text, 'tokens': estimate_tokens(text), 'score': None}]
+    return result
 
 import functools
 import time
@@ -125,9 +286,6 @@ def get_unique_filter_options():
     if _filter_cache['data'] and (current_time - _filter_cache['timestamp'] < CACHE_DURATION):
         return _filter_cache['data']
 
-    conn = sqlite3.connect(config.DB_PATH)
-    c = conn.cursor()
-    
     options = {
         'platform': [],
         'category': [],
@@ -136,22 +294,23 @@ def get_unique_filter_options():
     }
     
     try:
-        # Get platforms
-        c.execute("SELECT DISTINCT platform FROM videos WHERE platform IS NOT NULL AND platform != ''")
-        options['platform'] = [r[0] for r in c.fetchall()]
-        
-        # Get categories
-        c.execute("SELECT DISTINCT category FROM videos WHERE category IS NOT NULL AND category != ''")
-        options['category'] = [r[0] for r in c.fetchall()]
-        
-        # Get types
-        c.execute("SELECT DISTINCT types FROM videos WHERE types IS NOT NULL AND types != ''")
-        options['types'] = [r[0] for r in c.fetchall()]
-        
-        # For tags, we need to split by comma as they are often comma-separated strings
-        c.execute("SELECT DISTINCT tags FROM videos WHERE tags IS NOT NULL AND tags != ''")
+        with _reader() as conn:
+            # Get platforms
+            options['platform'] = [r[0] for r in conn.execute(
+                "SELECT DISTINCT platform FROM videos WHERE platform IS NOT NULL AND platform != ''")]
+
+            # Get categories
+            options['category'] = [r[0] for r in conn.execute(
+                "SELECT DISTINCT category FROM videos WHERE category IS NOT NULL AND category != ''")]
+
+            # Get types
+            options['types'] = [r[0] for r in conn.execute(
+                "SELECT DISTINCT types FROM videos WHERE types IS NOT NULL AND types != ''")]
+
+            # For tags, we need to split by comma as they are often comma-separated strings
+            tag_rows = conn.execute("SELECT DISTINCT tags FROM videos WHERE tags IS NOT NULL AND tags != ''").fetchall()
         all_tags = set()
-        for row in c.fetchall():
+        for row in tag_rows:
             if row[0]:
                 tags = [t.strip() for t in row[0].split(',') if t.strip()]
                 all_tags.update(tags)
@@ -164,20 +323,37 @@ def get_unique_filter_options():
     except Exception as e:
         print(f"Database error getting options: {e}")
         return options
-    finally:
-        conn.close()
 
-def get_gallery_videos(filters, limit=50, offset=0):
+# Columns the gallery API may select (never the large text columns)
+GALLERY_COLUMNS = ['id', 'title', 'file_path', 'platform', 'category', 'tags', 'summary', 'types', 'file_type']
+DEFAULT_GALLERY_COLUMNS = ['id', 'title', 'file_path', 'platform', 'category', 'tags', 'summary', 'types']
+VIDEO_CARD_SQL = f"SELECT {', '.join(GALLERY_COLUMNS)} FROM videos WHERE id = ?"
+
+def get_library_version():
+    """
+    Returns a token that changes whenever the library changes: the DB file
+    (and its WAL, where writes land first) plus the preview manifest.
+    Used to build ETags for gallery responses.
+    """
+    parts = []
+    for path in (config.DB_PATH, config.DB_PATH + "-wal", config.PREVIEW_MANIFEST_PATH):
+        try:
+            st = os.stat(path)
+            parts.append(f"{st.st_mtime_ns:x}-{st.st_size:x}")
+        except OSError:
+            parts.append("0")
+    return ".".join(parts)
+
+def get_gallery_videos(filters, limit=50, offset=0, columns=None):
     """
     Fetch videos based on multiple filter criteria.
     filters: {'platform': [], 'category': [], 'tags': [], 'types': []}
+    columns: Subset of GALLERY_COLUMNS to select (defaults to DEFAULT_GALLERY_COLUMNS)
     """
-    conn = sqlite3.connect(config.DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
+    columns = [col for col in (columns or DEFAULT_GALLERY_COLUMNS) if col in GALLERY_COLUMNS] or ['id']
+
     # Select only necessary columns for the gallery
-    sql = "SELECT id, title, file_path, platform, category, tags, summary, types FROM videos"
+    sql = f"SELECT {', '.join(columns)} FROM videos"
     conditions = []
     params = []
     
@@ -221,11 +397,22 @@ def get_gallery_videos(filters, limit=50, offset=0):
     params.extend([limit, offset])
     
     try:
-        c.execute(sql, params)
-        rows = c.fetchall()
+        with _reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
         return [dict(row) for row in rows]
     except Exception as e:
         print(f"Database search error: {e}")
         return []
-    finally:
-        conn.close()
+
+def get_video_card(video_id):
+    """
+    Fetch the gallery detail fields for a single video (no transcript text).
+    Returns a dict or None.
+    """
+    try:
+        with _reader() as conn:
+            row = conn.execute(VIDEO_CARD_SQL, (video_id,)).fetchone()
+        return dict(row) if row else None
+    except Exception as e:
+        print(f"Database error: {e}")
+        return None
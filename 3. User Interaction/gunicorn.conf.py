@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+
+# gunicorn -c gunicorn.conf.py wsgi:application
+# Threaded workers: a chat turn mostly waits on Gemini, so each process serves
+# many of them at once. Each process holds its own state:
+#   - Stage limits: config.STAGE_CONCURRENCY is config.STAGE_CONCURRENCY_TOTAL
+#     divided by WEB_WORKERS, so the server-wide cap holds. A busy worker can
+#     turn requests away while another still has free slots.
+#   - Coalescing of identical questions only joins requests on the same
+#     worker. A browser's keep-alive connection usually keeps its repeated
+#     requests there; a second tab may land elsewhere and run its own turn.
+# WEB_WORKERS=1 with more WEB_THREADS makes both exact.
+bind = os.getenv("BIND", "127.0.0.1:5001")
+worker_class = "gthread"
+workers = int(os.getenv("WEB_WORKERS", min(4, multiprocessing.cpu_count())))
+threads = int(os.getenv("WEB_THREADS", 8))
+
+# config splits the stage limits by WEB_WORKERS, so it is only imported once
+# that is set (the forked workers inherit both the variable and the module).
+# Not `import config`: gunicorn reads every module-level name as a setting.
+os.environ["WEB_WORKERS"] = str(workers)
+from config import STAGE_QUEUE_TIMEOUT, STAGE_TIMEOUTS
+
+# Longest possible chat turn: every stage waiting for a slot, then timing out
+timeout = sum(STAGE_TIMEOUTS[s] for s in ("filter", "refine", "response")) + 3 * STAGE_QUEUE_TIMEOUT + 30
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
@@ -0,0 +1,15 @@
+import importlib.util
+import os
+import sys
+
+# The prompt registry and prefix cache are shared with the ingestion side.
+# There is one copy, in "2. Database Entry/prompt_registry.py"; this module
+# loads it by path and stands in for it, so `from prompt_registry import ...`
+# works the same in both apps.
+SHARED_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "2. Database Entry", "prompt_registry.py")
+
+_spec = importlib.util.spec_from_file_location(__name__, SHARED_PATH)
+_shared = importlib.util.module_from_spec(_spec)
+sys.modules[__name__] = _shared
+_spec.loader.exec_module(_shared)
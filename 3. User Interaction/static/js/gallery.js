@@ -24,6 +24,19 @@ document.addEventListener('DOMContentLoaded', () => {
     const limit = 50;
     let isLoading = false;
     let hasMore = true;
+    let prefetched = null;   // { page, promise } for the page after the last rendered one
+    let generation = 0;      // Bumped on filter change so stale responses are dropped
+
+    // Virtualized Grid State
+    const mainContainer = document.getElementById('gallery-main');
+    const GRID_OVERSCAN_ROWS = 2;      // Rows kept mounted above/below the viewport
+    const PAGE_PREFETCH_MARGIN = 800;  // px before the end at which the next page is appended
+    const mountedCards = new Map();    // index -> card element
+    const cardPool = [];
+    let columns = 1;
+    let rowHeight = 0;
+    let gridTop = 0;
+    let frameRequested = false;
 
     // --- Init ---
     const init = async () => {
@@ -41,21 +54,39 @@ document.addEventListener('DOMContentLoaded', () => {
         await loadFilters();
         await fetchVideos(false);
 
-        // Infinite scroll for grid
+        // Re-window the grid at most once per frame while scrolling
         // Use the main container causing the scroll, not window
-        const mainContainer = document.getElementById('gallery-main');
-        if (mainContainer) {
-            mainContainer.addEventListener('scroll', handleScroll);
-        }
+        mainContainer.addEventListener('scroll', () => {
+            if (frameRequested) return;
+            frameRequested = true;
+            requestAnimationFrame(() => {
+                frameRequested = false;
+                renderVisible();
+            });
+        }, { passive: true });
+
+        window.addEventListener('resize', () => {
+            measureGrid();
+            renderVisible();
+        });
     };
 
-    const handleScroll = (e) => {
-        if (isLoading || !hasMore) return;
-        const target = e.target;
-        // Check if we are near the bottom of the container
-        if ((target.scrollTop + target.clientHeight) >= target.scrollHeight - 500) {
+    // Infinite scroll: a sentinel after the grid appends the next page when it nears the viewport
+    const sentinel = document.createElement('div');
+    sentinel.className = 'grid-sentinel';
+    videoGrid.after(sentinel);
+
+    const sentinelObserver = new IntersectionObserver((entries) => {
+        if (entries.some(e => e.isIntersecting) && hasMore && !isLoading) {
             fetchVideos(true);
         }
+    }, { root: mainContainer, rootMargin: `0px 0px ${PAGE_PREFETCH_MARGIN}px 0px` });
+    sentinelObserver.observe(sentinel);
+
+    // Re-arm the observer so a sentinel that is still visible fires again
+    const recheckSentinel = () => {
+        sentinelObserver.unobserve(sentinel);
+        sentinelObserver.observe(sentinel);
     };
 
     // --- Filter Management ---
@@ -128,255 +159,217 @@ document.addEventListener('DOMContentLoaded', () => {
             applyFilterBtn.click();
         }
 
-        if (!tiktokModal.classList.contains('hidden')) {
+        if (viewer.isOpen()) {
             if (e.key === 'ArrowDown') {
                 e.preventDefault();
-                navNext.click();
+                viewer.next();
             } else if (e.key === 'ArrowUp') {
                 e.preventDefault();
-                navPrev.click();
+                viewer.prev();
             } else if (e.key === 'Escape') {
-                closeTiktok.click();
+                viewer.close();
             }
         }
     });
 
     // --- Video Fetching & Rendering ---
+    // Grid pages only carry what a card needs; the viewer loads the rest per item
+    const GRID_FIELDS = 'id,title,platform,kind,thumb';
+
+    const requestPage = async (page) => {
+        const params = new URLSearchParams({ page, limit, fields: GRID_FIELDS });
+        Object.entries(activeFilters).forEach(([key, values]) => {
+            values.forEach(value => params.append(key, value));
+        });
+        const res = await fetch(`/api/gallery/videos?${params}`);
+        return res.json();
+    };
+
+    const detailRequests = new Map(); // id -> Promise of the merged video
+    const loadDetails = (vid) => {
+        if (!detailRequests.has(vid.id)) {
+            const promise = fetch(`/api/gallery/videos/${encodeURIComponent(vid.id)}`)
+                .then(res => (res.ok ? res.json() : {}))
+                .then(details => Object.assign(vid, details))
+                .catch(() => {
+                    detailRequests.delete(vid.id);
+                    return vid;
+                });
+            detailRequests.set(vid.id, promise);
+        }
+        return detailRequests.get(vid.id);
+    };
+
     const fetchVideos = async (isAppend = false) => {
-        if (isLoading) return;
+        if (isAppend && isLoading) return;
         isLoading = true;
 
         if (!isAppend) {
+            generation++;
             currentPage = 1;
             allVideos = [];
-            videoGrid.innerHTML = '';
+            prefetched = null;
             hasMore = true;
+            mountedCards.forEach(card => recycleCard(card));
+            mountedCards.clear();
+            mainContainer.scrollTop = 0;
         }
-
-        const payload = {
-            filters: activeFilters,
-            page: currentPage,
-            limit: limit
-        };
+        const requestGeneration = generation;
 
         try {
-            const res = await fetch('/api/gallery/videos', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payload)
-            });
-            const newVideos = await res.json();
+            // Use the prefetched page if it is the one we need
+            const pending = prefetched && prefetched.page === currentPage ? prefetched.promise : requestPage(currentPage);
+            prefetched = null;
+            const newVideos = await pending;
+            if (requestGeneration !== generation) return; // Filters changed meanwhile
 
             if (newVideos.length < limit) {
                 hasMore = false;
             }
 
+            allVideos = allVideos.concat(newVideos);
             if (!isAppend) {
-                allVideos = newVideos;
-                if (allVideos.length === 0) {
-                    emptyState.classList.remove('hidden');
-                } else {
-                    emptyState.classList.add('hidden');
-                    renderGallery(newVideos);
-                }
-            } else {
-                allVideos = [...allVideos, ...newVideos];
-                renderGallery(newVideos);
+                emptyState.classList.toggle('hidden', allVideos.length > 0);
             }
-
+            renderVisible();
             currentPage++;
+
+            // Prefetch page N+1 while page N renders
+            if (hasMore) {
+                const promise = requestPage(currentPage);
+                promise.catch(() => { }); // Surfaced when consumed
+                prefetched = { page: currentPage, promise };
+            }
         } catch (e) {
             console.error("Error fetching videos", e);
         } finally {
-            isLoading = false;
+            if (requestGeneration === generation) {
+                isLoading = false;
+                recheckSentinel();
+            }
         }
     };
 
-    const renderGallery = (videosToRender) => {
-        const template = document.getElementById('gallery-card-template');
-
-        // Calculate global starting index for these new videos
-        // If allVideos has 100 items, and we just added 50 (videosToRender), 
-        // the start index is 100 - 50 = 50.
-        const startIndex = allVideos.length - videosToRender.length;
-
-        videosToRender.forEach((vid, i) => {
-            const globalIndex = startIndex + i;
-            const clone = template.content.cloneNode(true);
-            const card = clone.querySelector('.gallery-card');
-
-            card.querySelector('.card-platform').innerText = vid.platform || 'Unknown';
-            card.querySelector('.card-title').innerText = vid.title || 'Untitled';
-
-            const mediaContainer = card.querySelector('.card-media');
-            if (vid.file_path && typeof vid.file_path === 'string') {
-                const parts = vid.file_path.split('All Files/');
-                if (parts.length > 1) {
-                    const mediaUrl = `/media/${parts[1]}`;
-                    const ext = vid.file_path.split('.').pop().toLowerCase();
-                    if (['mp4', 'mov'].includes(ext)) {
-                        const v = document.createElement('video');
-                        v.src = mediaUrl;
-                        v.muted = true;
-                        v.loop = true;
-                        // Lazy play on hover
-                        v.onmouseover = () => v.play().catch(() => { });
-                        v.onmouseout = () => v.pause();
-                        mediaContainer.prepend(v);
-                    } else {
-                        const img = document.createElement('img');
-                        img.src = mediaUrl;
-                        img.loading = "lazy"; // Native lazy load
-                        mediaContainer.prepend(img);
-                    }
-                }
-            }
-
-            card.onclick = () => openTiktokViewer(globalIndex);
-            videoGrid.appendChild(clone);
-        });
+    // --- Virtualized Grid ---
+    // Only rows near the viewport are mounted; the grid's padding stands in for the rest.
+    const measureGrid = () => {
+        const style = getComputedStyle(videoGrid);
+        columns = Math.max(1, style.gridTemplateColumns.split(' ').filter(Boolean).length);
+        const card = videoGrid.querySelector('.gallery-card');
+        if (card) {
+            rowHeight = card.offsetHeight + (parseFloat(style.rowGap) || 0);
+        }
+        gridTop = videoGrid.getBoundingClientRect().top - mainContainer.getBoundingClientRect().top
+            + mainContainer.scrollTop;
     };
 
-    // --- TikTok Style Viewer ---
-    const openTiktokViewer = (startIndex) => {
-        tiktokContainer.innerHTML = '';
-        const template = document.getElementById('tiktok-item-template');
-
-        allVideos.forEach((vid, index) => {
-            const clone = template.content.cloneNode(true);
-            const item = clone.querySelector('.tiktok-item');
-
-            item.querySelector('.tiktok-platform').innerText = vid.platform || 'Knowledge';
-            item.querySelector('.tiktok-title').innerText = vid.title || 'Untitled';
-            item.querySelector('.tiktok-summary').innerText = vid.summary || '';
-
-            const tagContainer = item.querySelector('.tiktok-tags');
-            if (vid.tags && typeof vid.tags === 'string') {
-                vid.tags.split(',').forEach(tag => {
-                    const trimmed = tag.trim();
-                    if (trimmed) {
-                        const span = document.createElement('span');
-                        span.className = 'tiktok-tag';
-                        span.innerText = `#${trimmed}`;
-                        tagContainer.appendChild(span);
-                    }
-                });
-            }
-
-            const mediaWrapper = item.querySelector('.tiktok-media-wrapper');
-            if (vid.file_path) {
-                const parts = vid.file_path.split('All Files/');
-                if (parts.length > 1) {
-                    const mediaUrl = `/media/${parts[1]}`;
-                    const ext = vid.file_path.split('.').pop().toLowerCase();
-                    if (['mp4', 'mov'].includes(ext)) {
-                        const v = document.createElement('video');
-                        v.dataset.src = mediaUrl;
-                        v.controls = true;
-                        v.loop = true;
-                        v.dataset.type = 'video';
-                        // Hide initially to prevent "empty player" ugly UI
-                        v.style.opacity = '0';
-                        v.style.transition = 'opacity 0.3s';
-
-                        // Show when ready
-                        v.onloadeddata = () => {
-                            v.style.opacity = '1';
-                        };
-
-                        mediaWrapper.appendChild(v);
-                    } else {
-                        const img = document.createElement('img');
-                        img.src = mediaUrl;
-                        mediaWrapper.appendChild(img);
-                    }
-                }
-            }
+    const createCard = () => {
+        const template = document.getElementById('gallery-card-template');
+        const card = template.content.querySelector('.gallery-card').cloneNode(true);
+        const mediaContainer = card.querySelector('.card-media');
+
+        // Grid cards only ever load the small WebP thumbnail, never the original media
+        const img = document.createElement('img');
+        img.loading = "lazy"; // Native lazy load
+        img.decoding = "async";
+        const icon = document.createElement('i');
+        img.onerror = () => {
+            // No thumbnail (audio or not yet backfilled): show a type icon instead
+            img.style.display = 'none';
+            icon.style.display = '';
+        };
+        mediaContainer.prepend(img, icon);
 
-            tiktokContainer.appendChild(clone);
-        });
+        card.onclick = () => openTiktokViewer(Number(card.dataset.index));
+        return card;
+    };
 
-        tiktokModal.classList.remove('hidden');
+    const fillCard = (card, index) => {
+        const vid = allVideos[index];
+        card.dataset.index = index;
+        card.querySelector('.card-platform').innerText = vid.platform || 'Unknown';
+        card.querySelector('.card-title').innerText = vid.title || 'Untitled';
+        const isVideo = vid.kind === 'video';
+        card.classList.toggle('is-video', isVideo);
+
+        const img = card.querySelector('.card-media img');
+        const icon = card.querySelector('.card-media i');
+        icon.className = `fa-solid ${isVideo ? 'fa-film' : 'fa-file-lines'} card-placeholder`;
+        icon.style.display = 'none';
+        img.style.display = '';
+        img.src = vid.thumb;
+    };
 
-        // Scroll to the clicked item
-        setTimeout(() => {
-            const items = tiktokContainer.querySelectorAll('.tiktok-item');
-            if (items[startIndex]) {
-                items[startIndex].scrollIntoView({ behavior: 'auto', block: 'start' });
-                // Force a check after scroll
-                setTimeout(playCurrentVideo, 100);
-            }
-        }, 100);
+    const recycleCard = (card) => {
+        card.remove();
+        cardPool.push(card);
     };
 
-    const playCurrentVideo = () => {
-        const items = tiktokContainer.querySelectorAll('.tiktok-item');
-        const containerRect = tiktokContainer.getBoundingClientRect();
+    const renderVisible = () => {
+        if (!allVideos.length) {
+            videoGrid.style.paddingTop = '';
+            videoGrid.style.paddingBottom = '';
+            return;
+        }
+        if (!rowHeight) {
+            // First render: mount one card so the row height can be measured
+            const card = cardPool.pop() || createCard();
+            fillCard(card, 0);
+            videoGrid.prepend(card);
+            mountedCards.set(0, card);
+            measureGrid();
+        }
 
-        items.forEach(item => {
-            const rect = item.getBoundingClientRect();
-            const video = item.querySelector('video');
-            if (!video) return;
-
-            // If item is visible in container (with some tolerance)
-            if (Math.abs(rect.top - containerRect.top) < 50) {
-                // Initialize src if needed
-                if (!video.src && video.dataset.src) {
-                    video.src = video.dataset.src;
-                }
-                video.play().catch(e => console.log("Auto-play blocked"));
-            } else {
-                video.pause();
-                // Reset to start to save memory/logic as requested
-                video.currentTime = 0;
+        const totalRows = Math.ceil(allVideos.length / columns);
+        const viewTop = mainContainer.scrollTop - gridTop;
+        const viewBottom = viewTop + mainContainer.clientHeight;
+        const firstRow = Math.max(0, Math.floor(viewTop / rowHeight) - GRID_OVERSCAN_ROWS);
+        const lastRow = Math.max(firstRow, Math.min(totalRows - 1, Math.ceil(viewBottom / rowHeight) + GRID_OVERSCAN_ROWS));
+        const start = firstRow * columns;
+        const end = Math.min(allVideos.length, (lastRow + 1) * columns);
+
+        mountedCards.forEach((card, index) => {
+            if (index < start || index >= end) {
+                mountedCards.delete(index);
+                recycleCard(card);
             }
         });
-    };
 
-    tiktokContainer.onscroll = () => {
-        // Debounce or use IntersectionObserver for better performance?
-        // Simple scroll check for now
-        clearTimeout(window.scrollTimeout);
-        window.scrollTimeout = setTimeout(playCurrentVideo, 100);
-    };
+        // Mount missing cards, keeping DOM order equal to index order for grid placement
+        let previous = null;
+        for (let i = start; i < end; i++) {
+            let card = mountedCards.get(i);
+            if (!card) {
+                card = cardPool.pop() || createCard();
+                fillCard(card, i);
+                mountedCards.set(i, card);
+            }
+            const expectedPosition = previous ? previous.nextSibling : videoGrid.firstChild;
+            if (card !== expectedPosition) {
+                videoGrid.insertBefore(card, expectedPosition);
+            }
+            previous = card;
+        }
 
-    closeTiktok.onclick = () => {
-        tiktokModal.classList.add('hidden');
-        tiktokContainer.querySelectorAll('video').forEach(v => v.pause());
+        videoGrid.style.paddingTop = `${firstRow * rowHeight}px`;
+        videoGrid.style.paddingBottom = `${Math.max(0, totalRows - lastRow - 1) * rowHeight}px`;
     };
 
-    const navPrev = document.querySelector('.nav-prev');
-    const navNext = document.querySelector('.nav-next');
-
-    navPrev.onclick = () => {
-        tiktokContainer.scrollBy({ top: -window.innerHeight, behavior: 'smooth' });
-    };
+    // --- TikTok Style Viewer ---
+    const viewer = createTiktokViewer({
+        modal: tiktokModal,
+        container: tiktokContainer,
+        template: document.getElementById('tiktok-item-template'),
+        closeBtn: closeTiktok,
+        prevBtn: document.querySelector('.nav-prev'),
+        nextBtn: document.querySelector('.nav-next'),
+        nativeControls: true,
+        loadDetails
+    });
 
-    navNext.onclick = () => {
-        tiktokContainer.scrollBy({ top: window.innerHeight, behavior: 'smooth' });
+    const openTiktokViewer = (startIndex) => {
+        viewer.open(allVideos, startIndex);
     };
 
-    // --- Hijack Scroll for One-at-a-time (TikTok style) ---
-    let isScrolling = false;
-    tiktokContainer.addEventListener('wheel', (e) => {
-        if (tiktokModal.classList.contains('hidden')) return;
-        e.preventDefault(); // Stop native scrolling
-
-        if (isScrolling) return;
-
-        if (Math.abs(e.deltaY) > 20) { // Threshold
-            isScrolling = true;
-            if (e.deltaY > 0) {
-                navNext.click();
-            } else {
-                navPrev.click();
-            }
-
-            setTimeout(() => {
-                isScrolling = false;
-            }, 800); // Lock for 800ms
-        }
-    }, { passive: false });
-
     init();
 });
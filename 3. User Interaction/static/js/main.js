@@ -9,6 +9,13 @@ document.addEventListener('DOMContentLoaded', () => {
     const welcomeHero = document.getElementById('welcome-hero');
 
     let currentSessionId = null;
+    let historyCursor = null; // id of the oldest loaded message, if older ones exist
+
+    // "Load earlier" control, shown when the history has more pages
+    const loadEarlierBtn = document.createElement('button');
+    loadEarlierBtn.className = 'gallery-toggle-btn load-earlier-btn hidden';
+    loadEarlierBtn.innerHTML = '<i class="fa-solid fa-clock-rotate-left"></i> Load earlier messages';
+    chatHistory.insertBefore(loadEarlierBtn, welcomeHero.nextSibling);
 
     // --- Session Management ---
 
@@ -35,26 +42,59 @@ document.addEventListener('DOMContentLoaded', () => {
         currentSessionId = sessionId;
         welcomeHero.classList.remove('hidden'); // Show by default, then hide if messages exist
         chatHistory.querySelectorAll('.message, .results-container').forEach(e => e.remove());
+        setHistoryCursor(null);
 
         await loadHistory(sessionId);
         loadSessions();
     };
 
-    const loadHistory = async (sessionId) => {
-        const res = await fetch(`/api/sessions/${sessionId}/history`);
-        const history = await res.json();
-        if (history.length > 0) welcomeHero.classList.add('hidden');
-
-        history.forEach(h => {
+    const renderHistory = (messages) => {
+        messages.forEach(h => {
             if (h.type === 'result') {
                 renderRecommendations(h.metadata, false); // false = don't scroll yet
             } else {
                 addMessage(h.content, h.role, false);
             }
         });
+    };
+
+    const setHistoryCursor = (cursor) => {
+        historyCursor = cursor;
+        loadEarlierBtn.classList.toggle('hidden', !historyCursor);
+    };
+
+    const loadHistory = async (sessionId) => {
+        // Server returns the newest page; older pages are fetched on demand
+        const res = await fetch(`/api/sessions/${sessionId}/history`);
+        const page = await res.json();
+        if (page.messages.length > 0) welcomeHero.classList.add('hidden');
+
+        renderHistory(page.messages);
+        setHistoryCursor(page.next_before);
         chatHistory.scrollTop = chatHistory.scrollHeight;
     };
 
+    const loadEarlierHistory = async () => {
+        if (!historyCursor || !currentSessionId) return;
+        const res = await fetch(`/api/sessions/${currentSessionId}/history?before=${historyCursor}`);
+        const page = await res.json();
+
+        // Render at the end, then move the new nodes above the current oldest message
+        const anchor = chatHistory.querySelector('.message, .results-container');
+        const prevHeight = chatHistory.scrollHeight;
+        const prevCount = chatHistory.children.length;
+        renderHistory(page.messages);
+        Array.from(chatHistory.children).slice(prevCount).forEach(node => {
+            chatHistory.insertBefore(node, anchor);
+        });
+
+        // Keep the viewport on the message the user was reading
+        chatHistory.scrollTop += chatHistory.scrollHeight - prevHeight;
+        setHistoryCursor(page.next_before);
+    };
+
+    loadEarlierBtn.onclick = loadEarlierHistory;
+
     const createNewChat = async () => {
         const res = await fetch('/api/sessions', {
             method: 'POST',
@@ -163,7 +203,9 @@ document.addEventListener('DOMContentLoaded', () => {
 
                         if (['mp4', 'mov'].includes(ext)) {
                             mediaElement = document.createElement('video');
-                            mediaElement.src = mediaUrl;
+                            mediaElement.src = getPlaybackUrl(rec, mediaUrl);
+                            mediaElement.poster = `/thumb/${encodeURIComponent(rec.id)}/poster`;
+                            mediaElement.preload = 'none';
                             mediaElement.controls = false;
 
                             // Click video -> Zoom (Open Modal)
@@ -249,180 +291,35 @@ document.addEventListener('DOMContentLoaded', () => {
     };
 
     // --- TikTok Style Viewer ---
-    const tiktokModal = document.getElementById('tiktok-modal');
-    const tiktokContainer = document.getElementById('tiktok-container');
-    const closeTiktok = document.getElementById('close-tiktok');
-    const navPrev = document.querySelector('.nav-prev');
-    const navNext = document.querySelector('.nav-next');
-
-    // Reuse play/pause overlay logic
-    const togglePlayPause = (video, wrapper) => {
-        if (video.paused) {
-            video.play();
-            showPlayPauseIcon(wrapper, 'play');
-        } else {
-            video.pause();
-            showPlayPauseIcon(wrapper, 'pause');
-        }
-    };
-
-    const showPlayPauseIcon = (wrapper, type) => {
-        // Remove existing overlay
-        const existing = wrapper.querySelector('.play-pause-overlay');
-        if (existing) existing.remove();
-
-        const overlay = document.createElement('div');
-        overlay.className = 'play-pause-overlay';
-        overlay.innerHTML = type === 'play' ? '<i class="fa-solid fa-play"></i>' : '<i class="fa-solid fa-pause"></i>';
-        wrapper.appendChild(overlay);
-
-        // Auto remove handled by CSS animation, but cleanup is good
-        setTimeout(() => {
-            if (overlay.parentNode === wrapper) overlay.remove();
-        }, 800);
-    };
+    const viewer = createTiktokViewer({
+        modal: document.getElementById('tiktok-modal'),
+        container: document.getElementById('tiktok-container'),
+        template: document.getElementById('tiktok-item-template'),
+        closeBtn: document.getElementById('close-tiktok'),
+        prevBtn: document.querySelector('.nav-prev'),
+        nextBtn: document.querySelector('.nav-next'),
+        tapToToggle: true
+    });
 
     const openTiktokStyleViewer = (startIndex, videos) => {
-        tiktokContainer.innerHTML = '';
-        const template = document.getElementById('tiktok-item-template');
-
-        videos.forEach((vid, index) => {
-            const clone = template.content.cloneNode(true);
-            const item = clone.querySelector('.tiktok-item');
-
-            item.querySelector('.tiktok-platform').innerText = vid.platform || 'Knowledge';
-            item.querySelector('.tiktok-title').innerText = vid.title || 'Untitled';
-
-            // Use note as summary if summary is missing (Chat returns note)
-            item.querySelector('.tiktok-summary').innerText = vid.summary || vid.note || '';
-
-            const mediaWrapper = item.querySelector('.tiktok-media-wrapper');
-            if (vid.file_path) {
-                const parts = vid.file_path.split('All Files/');
-                if (parts.length > 1) {
-                    const mediaUrl = `/media/${parts[1]}`;
-                    const ext = vid.file_path.split('.').pop().toLowerCase();
-                    if (['mp4', 'mov'].includes(ext)) {
-                        const v = document.createElement('video');
-                        v.src = mediaUrl;
-                        v.loop = true;
-                        // Click to toggle play/pause
-                        v.onclick = () => togglePlayPause(v, mediaWrapper);
-
-                        // Hide initially for polish
-                        v.style.opacity = '0';
-                        v.style.transition = 'opacity 0.3s';
-
-                        // Show when ready
-                        v.onloadeddata = () => {
-                            v.style.opacity = '1';
-                        };
-
-                        mediaWrapper.appendChild(v);
-                    } else {
-                        const img = document.createElement('img');
-                        img.src = mediaUrl;
-                        mediaWrapper.appendChild(img);
-                    }
-                }
-            }
-
-            tiktokContainer.appendChild(clone);
-        });
-
-        tiktokModal.classList.remove('hidden');
-
-        // Scroll to the clicked item
-        setTimeout(() => {
-            const items = tiktokContainer.querySelectorAll('.tiktok-item');
-            if (items[startIndex]) {
-                items[startIndex].scrollIntoView({ behavior: 'auto', block: 'start' });
-                // Force a check after scroll
-                setTimeout(playCurrentVideo, 100);
-            }
-        }, 100);
-    };
-
-    const playCurrentVideo = () => {
-        const items = tiktokContainer.querySelectorAll('.tiktok-item');
-        const containerRect = tiktokContainer.getBoundingClientRect();
-
-        items.forEach(item => {
-            const rect = item.getBoundingClientRect();
-            const video = item.querySelector('video');
-            if (!video) return;
-
-            // If item is visible in container (with tolerance)
-            if (Math.abs(rect.top - containerRect.top) < 50) {
-                video.play().catch(e => console.log("Auto-play blocked"));
-            } else {
-                video.pause();
-                video.currentTime = 0;
-            }
-        });
-    };
-
-    tiktokContainer.onscroll = () => {
-        clearTimeout(window.scrollTimeout);
-        window.scrollTimeout = setTimeout(playCurrentVideo, 100);
+        viewer.open(videos, startIndex);
     };
 
-    closeTiktok.onclick = () => {
-        tiktokModal.classList.add('hidden');
-        tiktokContainer.querySelectorAll('video').forEach(v => v.pause());
-    };
-
-    navPrev.onclick = () => {
-        tiktokContainer.scrollBy({ top: -window.innerHeight, behavior: 'smooth' });
-    };
-
-    navNext.onclick = () => {
-        tiktokContainer.scrollBy({ top: window.innerHeight, behavior: 'smooth' });
-    };
-
-    // Hijack Scroll for One-at-a-time
-    let isScrolling = false;
-    tiktokContainer.addEventListener('wheel', (e) => {
-        if (tiktokModal.classList.contains('hidden')) return;
-        e.preventDefault();
-
-        if (isScrolling) return;
-
-        if (Math.abs(e.deltaY) > 20) {
-            isScrolling = true;
-            if (e.deltaY > 0) {
-                navNext.click();
-            } else {
-                navPrev.click();
-            }
-            setTimeout(() => { isScrolling = false; }, 800);
-        }
-    }, { passive: false });
-
     // Keyboard support
     document.addEventListener('keydown', (e) => {
-        if (!tiktokModal.classList.contains('hidden')) {
+        if (viewer.isOpen()) {
             if (e.key === 'ArrowDown') {
                 e.preventDefault();
-                navNext.click();
+                viewer.next();
             } else if (e.key === 'ArrowUp') {
                 e.preventDefault();
-                navPrev.click();
+                viewer.prev();
             } else if (e.key === 'Escape') {
-                closeTiktok.click();
+                viewer.close();
             } else if (e.key === ' ' || e.key === 'Spacebar') {
                 // Toggle play/pause for current video
                 e.preventDefault();
-                const items = tiktokContainer.querySelectorAll('.tiktok-item');
-                const containerRect = tiktokContainer.getBoundingClientRect();
-                items.forEach(item => {
-                    const rect = item.getBoundingClientRect();
-                    if (Math.abs(rect.top - containerRect.top) < 50) {
-                        const video = item.querySelector('video');
-                        const wrapper = item.querySelector('.tiktok-media-wrapper');
-                        if (video) togglePlayPause(video, wrapper);
-                    }
-                });
+                viewer.toggleCurrent();
             }
         }
     });
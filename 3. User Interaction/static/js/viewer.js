@@ -0,0 +1,349 @@
+// --- Shared media helpers ---
+
+const isVideoPath = (path) => {
+    if (!path || typeof path !== 'string') return false;
+    return ['mp4', 'mov'].includes(path.split('.').pop().toLowerCase());
+};
+
+const getMediaUrl = (path) => {
+    if (!path || typeof path !== 'string') return null;
+    const parts = path.split('All Files/');
+    return parts.length > 1 ? `/media/${parts[1]}` : null;
+};
+
+// Prefer the web-optimized preview (or native HLS) over the original file
+const getPlaybackUrl = (vid, mediaUrl) => {
+    if (vid.hls_url && document.createElement('video').canPlayType('application/vnd.apple.mpegurl')) {
+        return vid.hls_url;
+    }
+    return vid.preview_url || mediaUrl;
+};
+
+// --- TikTok Style Viewer (virtualized) ---
+// Only a small window of slides around the current one is mounted. Slide
+// elements (and their <video>/<img>) are recycled from a pool, playback is
+// driven by an IntersectionObserver, and only the next 1-2 items in the
+// scroll direction are preloaded depending on scroll velocity.
+
+const VIEWER_KEEP_BEHIND = 1;          // Slides kept mounted behind the current one
+const VIEWER_MAX_PRELOAD = 2;          // Slides preloaded ahead when scrolling fast
+const VIEWER_FAST_SCROLL = 1.5;        // Screens per second that count as "fast"
+const VIEWER_ACTIVE_RATIO = 0.6;       // Visible fraction at which a slide starts playing
+
+// loadDetails (optional): vid => Promise resolving once the item's detail
+// fields (summary, tags, media_url, ...) are merged in. Used when the list
+// was fetched with only the compact card fields.
+const createTiktokViewer = ({ modal, container, template, closeBtn, prevBtn, nextBtn, nativeControls = false, tapToToggle = false, loadDetails = null }) => {
+    const track = document.createElement('div');
+    track.className = 'tiktok-track';
+    container.innerHTML = '';
+    container.appendChild(track);
+
+    let items = [];
+    let slideHeight = 0;
+    let currentIndex = 0;
+    let direction = 1;
+    let velocity = 0; // Screens per second, smoothed
+    let lastScroll = { top: 0, time: 0 };
+    let frameRequested = false;
+
+    const mounted = new Map(); // index -> slot
+    const pool = [];
+    const slotsByElement = new WeakMap();
+
+    // --- Play/Pause overlay ---
+    const showPlayPauseIcon = (wrapper, type) => {
+        const existing = wrapper.querySelector('.play-pause-overlay');
+        if (existing) existing.remove();
+
+        const overlay = document.createElement('div');
+        overlay.className = 'play-pause-overlay';
+        overlay.innerHTML = type === 'play' ? '<i class="fa-solid fa-play"></i>' : '<i class="fa-solid fa-pause"></i>';
+        wrapper.appendChild(overlay);
+
+        // Auto remove handled by CSS animation, but cleanup is good
+        setTimeout(() => {
+            if (overlay.parentNode === wrapper) overlay.remove();
+        }, 800);
+    };
+
+    const togglePlayPause = (video, wrapper) => {
+        if (video.paused) {
+            video.play();
+            showPlayPauseIcon(wrapper, 'play');
+        } else {
+            video.pause();
+            showPlayPauseIcon(wrapper, 'pause');
+        }
+    };
+
+    // --- Slot lifecycle ---
+    const observer = new IntersectionObserver((entries) => {
+        entries.forEach(entry => {
+            const slot = slotsByElement.get(entry.target);
+            if (!slot || slot.index < 0) return;
+            if (entry.intersectionRatio >= VIEWER_ACTIVE_RATIO) {
+                activate(slot);
+            } else if (!slot.video.paused) {
+                slot.video.pause();
+            }
+        });
+    }, { root: container, threshold: [0, VIEWER_ACTIVE_RATIO] });
+
+    const createSlot = () => {
+        const el = template.content.querySelector('.tiktok-item').cloneNode(true);
+        const wrapper = el.querySelector('.tiktok-media-wrapper');
+
+        const video = document.createElement('video');
+        video.loop = true;
+        video.playsInline = true;
+        video.preload = 'none';
+        video.controls = nativeControls;
+        if (tapToToggle) video.onclick = () => togglePlayPause(video, wrapper);
+
+        const img = document.createElement('img');
+        img.decoding = 'async';
+        wrapper.append(video, img);
+
+        const slot = { el, wrapper, video, img, index: -1, isVideo: false };
+        slotsByElement.set(el, slot);
+        el.style.height = `${slideHeight}px`;
+        track.appendChild(el);
+        observer.observe(el);
+        return slot;
+    };
+
+    const releaseMedia = (slot) => {
+        slot.video.pause();
+        if (slot.video.getAttribute('src')) {
+            // Dropping the src and calling load() frees the decoder and buffered data
+            slot.video.removeAttribute('src');
+            slot.video.load();
+        }
+        slot.img.removeAttribute('src');
+    };
+
+    const fillText = (slot, vid) => {
+        slot.el.querySelector('.tiktok-platform').innerText = vid.platform || 'Knowledge';
+        slot.el.querySelector('.tiktok-title').innerText = vid.title || 'Untitled';
+        // Use note as summary if summary is missing (Chat returns note)
+        slot.el.querySelector('.tiktok-summary').innerText = vid.summary || vid.note || '';
+
+        const tagContainer = slot.el.querySelector('.tiktok-tags');
+        if (tagContainer) {
+            tagContainer.innerHTML = '';
+            if (vid.tags && typeof vid.tags === 'string') {
+                vid.tags.split(',').forEach(tag => {
+                    const trimmed = tag.trim();
+                    if (trimmed) {
+                        const span = document.createElement('span');
+                        span.className = 'tiktok-tag';
+                        span.innerText = `#${trimmed}`;
+                        tagContainer.appendChild(span);
+                    }
+                });
+            }
+        }
+
+    };
+
+    const fillMedia = (slot, vid) => {
+        releaseMedia(slot);
+        delete slot.video.dataset.src;
+        delete slot.img.dataset.src;
+
+        const mediaUrl = vid.media_url || getMediaUrl(vid.file_path);
+        const playable = vid.kind ? vid.kind === 'video' : isVideoPath(vid.file_path);
+        slot.isVideo = Boolean(mediaUrl) && playable;
+        slot.video.style.display = slot.isVideo ? '' : 'none';
+        slot.img.style.display = mediaUrl && !slot.isVideo ? '' : 'none';
+
+        if (slot.isVideo) {
+            slot.video.dataset.src = getPlaybackUrl(vid, mediaUrl);
+            slot.video.poster = `/thumb/${encodeURIComponent(vid.id)}/poster`;
+        } else if (mediaUrl) {
+            slot.img.dataset.src = mediaUrl;
+        }
+    };
+
+    const fillSlot = (slot, index) => {
+        const vid = items[index];
+        slot.index = index;
+        slot.el.style.top = `${index * slideHeight}px`;
+        slot.el.style.display = '';
+        fillText(slot, vid);
+        fillMedia(slot, vid);
+
+        if (loadDetails && !('media_url' in vid)) {
+            loadDetails(vid).then(() => {
+                // The slot may have been recycled for another item meanwhile
+                if (slot.index !== index || items[index] !== vid) return;
+                fillText(slot, vid);
+                fillMedia(slot, vid);
+                if (index === currentIndex) activate(slot);
+                else updateWindow();
+            });
+        }
+    };
+
+    const recycle = (slot) => {
+        releaseMedia(slot);
+        slot.index = -1;
+        slot.el.style.display = 'none';
+        pool.push(slot);
+    };
+
+    const loadMedia = (slot) => {
+        if (slot.isVideo) {
+            if (slot.video.dataset.src && !slot.video.getAttribute('src')) {
+                slot.video.preload = 'auto';
+                slot.video.src = slot.video.dataset.src;
+            }
+        } else if (slot.img.dataset.src && !slot.img.getAttribute('src')) {
+            slot.img.src = slot.img.dataset.src;
+        }
+    };
+
+    // --- Windowing ---
+    const updateWindow = () => {
+        if (!items.length) return;
+        const preloadCount = Math.abs(velocity) > VIEWER_FAST_SCROLL ? VIEWER_MAX_PRELOAD : 1;
+        const start = Math.max(0, currentIndex - (direction > 0 ? VIEWER_KEEP_BEHIND : preloadCount));
+        const end = Math.min(items.length - 1, currentIndex + (direction > 0 ? preloadCount : VIEWER_KEEP_BEHIND));
+
+        mounted.forEach((slot, index) => {
+            if (index < start || index > end) {
+                mounted.delete(index);
+                recycle(slot);
+            }
+        });
+
+        for (let i = start; i <= end; i++) {
+            let slot = mounted.get(i);
+            if (!slot) {
+                slot = pool.pop() || createSlot();
+                fillSlot(slot, i);
+                mounted.set(i, slot);
+            }
+            // Load the current slide and the ones ahead of it in the scroll direction
+            const ahead = (i - currentIndex) * direction;
+            if (ahead >= 0 && ahead <= preloadCount) loadMedia(slot);
+        }
+    };
+
+    const activate = (slot) => {
+        if (slot.index !== currentIndex) {
+            currentIndex = slot.index;
+            updateWindow();
+        }
+        mounted.forEach(other => {
+            if (other !== slot && other.video.getAttribute('src')) {
+                other.video.pause();
+                other.video.currentTime = 0;
+            }
+        });
+        loadMedia(slot);
+        if (slot.isVideo) {
+            slot.video.play().catch(() => console.log("Auto-play blocked"));
+        }
+    };
+
+    const layout = () => {
+        slideHeight = container.clientHeight;
+        track.style.height = `${items.length * slideHeight}px`;
+        mounted.forEach((slot, index) => { slot.el.style.top = `${index * slideHeight}px`; });
+        [...mounted.values(), ...pool].forEach(slot => { slot.el.style.height = `${slideHeight}px`; });
+    };
+
+    // Cheap scroll tracking (one read of scrollTop per frame) for windowing + velocity
+    container.addEventListener('scroll', () => {
+        if (frameRequested) return;
+        frameRequested = true;
+        requestAnimationFrame(() => {
+            frameRequested = false;
+            if (!slideHeight || !items.length) return;
+
+            const now = performance.now();
+            const top = container.scrollTop;
+            const dt = now - lastScroll.time;
+            if (dt > 0) {
+                const instant = ((top - lastScroll.top) / slideHeight) / (dt / 1000);
+                velocity = 0.7 * velocity + 0.3 * instant;
+            }
+            if (top !== lastScroll.top) direction = top > lastScroll.top ? 1 : -1;
+            lastScroll = { top, time: now };
+
+            const index = Math.min(items.length - 1, Math.max(0, Math.round(top / slideHeight)));
+            if (index !== currentIndex) {
+                currentIndex = index;
+                updateWindow();
+            }
+        });
+    }, { passive: true });
+
+    window.addEventListener('resize', () => {
+        if (modal.classList.contains('hidden')) return;
+        layout();
+        container.scrollTop = currentIndex * slideHeight;
+    });
+
+    // --- Public API ---
+    const open = (videos, startIndex) => {
+        mounted.forEach(slot => recycle(slot));
+        mounted.clear();
+
+        items = videos;
+        modal.classList.remove('hidden');
+        layout();
+
+        currentIndex = Math.min(Math.max(0, startIndex), items.length - 1);
+        direction = 1;
+        velocity = 0;
+        container.scrollTop = currentIndex * slideHeight;
+        lastScroll = { top: container.scrollTop, time: performance.now() };
+        updateWindow();
+    };
+
+    const close = () => {
+        modal.classList.add('hidden');
+        mounted.forEach(slot => recycle(slot));
+        mounted.clear();
+    };
+
+    const goTo = (index) => {
+        if (index < 0 || index >= items.length) return;
+        container.scrollTo({ top: index * slideHeight, behavior: 'smooth' });
+    };
+
+    const next = () => goTo(currentIndex + 1);
+    const prev = () => goTo(currentIndex - 1);
+
+    const toggleCurrent = () => {
+        const slot = mounted.get(currentIndex);
+        if (slot && slot.isVideo) togglePlayPause(slot.video, slot.wrapper);
+    };
+
+    const isOpen = () => !modal.classList.contains('hidden');
+
+    closeBtn.onclick = close;
+    prevBtn.onclick = prev;
+    nextBtn.onclick = next;
+
+    // --- Hijack Scroll for One-at-a-time (TikTok style) ---
+    let isScrolling = false;
+    container.addEventListener('wheel', (e) => {
+        if (!isOpen()) return;
+        e.preventDefault(); // Stop native scrolling
+
+        if (isScrolling) return;
+
+        if (Math.abs(e.deltaY) > 20) { // Threshold
+            isScrolling = true;
+            if (e.deltaY > 0) next();
+            else prev();
+            setTimeout(() => { isScrolling = false; }, 800); // Lock for 800ms
+        }
+    }, { passive: false });
+
+    return { open, close, next, prev, toggleCurrent, isOpen };
+};
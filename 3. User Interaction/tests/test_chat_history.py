@@ -0,0 +1,79 @@
+import os
+import queue
+import tempfile
+import unittest
+from unittest import mock
+
+import app
+import chat_db
+
+# Run from "3. User Interaction": python -m pytest tests  (or python -m unittest)
+
+
+class ChatHistoryTest(unittest.TestCase):
+    """
+    chat_db pointed at a scratch database.
+    """
+
+    def setUp(self):
+        self.workspace = tempfile.TemporaryDirectory()
+        self.saved = (chat_db.DB_PATH, chat_db._pool, chat_db._schema_ready)
+        chat_db.DB_PATH = os.path.join(self.workspace.name, "chat_history.db")
+        chat_db._pool = queue.LifoQueue()
+        chat_db._schema_ready = False
+        chat_db.create_session("s1")
+        for i in range(45):
+            chat_db.add_message("s1", "user" if i % 2 == 0 else "agent", f"message {i}")
+
+    def tearDown(self):
+        while not chat_db._pool.empty():
+            chat_db._pool.get_nowait().close()
+        chat_db.DB_PATH, chat_db._pool, chat_db._schema_ready = self.saved
+        self.workspace.cleanup()
+
+    def contents(self, messages):
+        return [m["content"] for m in messages]
+
+    def test_latest_page_and_before_cursor(self):
+        latest = chat_db.get_chat_history("s1", limit=10)
+        self.assertEqual(self.contents(latest), [f"message {i}" for i in range(35, 45)])
+        older = chat_db.get_chat_history("s1", limit=10, before_id=latest[0]["id"])
+        self.assertEqual(self.contents(older), [f"message {i}" for i in range(25, 35)])
+
+    def test_after_cursor_returns_next_messages(self):
+        first = chat_db.get_chat_history("s1", limit=20, after_id=0)
+        self.assertEqual(self.contents(first), [f"message {i}" for i in range(20)])
+        second = chat_db.get_chat_history("s1", limit=20, after_id=first[-1]["id"])
+        self.assertEqual(self.contents(second), [f"message {i}" for i in range(20, 40)])
+
+    def test_summary_folds_every_pending_message(self):
+        folded = []
+
+        def summarize(previous, new_messages):
+            folded.extend(self.contents(new_messages))
+            return f"{previous} +{len(new_messages)}"
+
+        with mock.patch.object(app.agent_logic, "run_summary_agent", side_effect=summarize):
+            for _ in range(3):  # 45 pending messages, SUMMARY_BATCH_MESSAGES per update
+                app.update_session_summary("s1")
+
+        self.assertEqual(folded, [f"message {i}" for i in range(45)])
+        summary, last_id = chat_db.get_session_summary("s1")
+        self.assertEqual(summary, " +20 +20 +5")
+        self.assertEqual(last_id, chat_db.get_chat_history("s1", limit=1)[0]["id"])
+
+    def test_history_endpoint_clamps_bad_params(self):
+        client = app.app.test_client()
+        cases = {"limit=0": 1, "limit=-5": 1, "limit=abc": app.HISTORY_PAGE_SIZE,
+                 "limit=100000": app.MAX_HISTORY_PAGE_SIZE, "before=-3": app.HISTORY_PAGE_SIZE,
+                 "before=xyz&limit=10": 10}
+        with mock.patch.object(app.chat_db, "get_chat_history", return_value=[]) as history:
+            for query, limit in cases.items():
+                with self.subTest(query=query):
+                    response = client.get(f"/api/sessions/s1/history?{query}")
+                    self.assertEqual(response.status_code, 200)
+                    history.assert_called_with("s1", limit=limit, before_id=None)
+
+
+if __name__ == "__main__":
+    unittest.main()
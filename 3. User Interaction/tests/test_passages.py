@@ -0,0 +1,26 @@
+import unittest
+
+import agent_logic
+import app
+
+# Run from "3. User Interaction": python -m pytest tests  (or python -m unittest)
+
+
+def passage(seq, tokens=10):
+    return {'seq': seq, 'text': f"P{seq}.", 'tokens': tokens}
+
+
+class PassageTest(unittest.TestCase):
+
+    def test_gap_marker_only_between_non_adjacent_passages(self):
+        joined = agent_logic._join_passages([passage(0), passage(1), passage(4), passage(5)])
+        self.assertEqual(joined, "P0. P1.\n[...]\nP4. P5.")
+
+    def test_pack_passages_round_robin_in_document_order(self):
+        passages = {"a": [passage(3), passage(0)], "b": [passage(1, tokens=25)]}
+        packed = app.pack_passages(["a", "b"], passages, budget=45)
+        self.assertEqual(packed, {"a": [passage(0), passage(3)], "b": [passage(1, tokens=25)]})
+
+
+if __name__ == "__main__":
+    unittest.main()
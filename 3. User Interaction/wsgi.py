@@ -0,0 +1,21 @@
+import argparse
+
+from app import app
+
+# Production entry point (`python app.py` is Flask's single-process debug server).
+#   gunicorn -c gunicorn.conf.py wsgi:application   Linux/macOS, several worker processes
+#   python wsgi.py                                  waitress, one process with a thread pool (any OS)
+application = app
+
+DEFAULT_THREADS = 16
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the app with waitress.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS, help="Requests handled at once")
+    args = parser.parse_args()
+
+    from waitress import serve
+    print(f"Serving on http://{args.host}:{args.port} ({args.threads} threads)")
+    serve(application, host=args.host, port=args.port, threads=args.threads)